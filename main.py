@@ -12,24 +12,63 @@ import logging
 import os
 import sys
 import re
+import weakref
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any, Iterator
 from dataclasses import dataclass, field
+from copy import copy
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from functools import partial
+from functools import partial, lru_cache
+from itertools import groupby
+from operator import itemgetter
 
+import numpy as np
 import pandas as pd
 
 # Попытка импортировать openpyxl для форматирования (обычно доступен в Anaconda)
 try:
     from openpyxl import load_workbook
-    from openpyxl.styles import Font, Alignment, PatternFill
+    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+    from openpyxl.styles.fonts import DEFAULT_FONT
+    from openpyxl.styles.borders import DEFAULT_BORDER
+    from openpyxl.styles.fills import DEFAULT_EMPTY_FILL
     from openpyxl.utils import get_column_letter
     OPENPYXL_AVAILABLE = True
 except ImportError:
     OPENPYXL_AVAILABLE = False
 
+# Проверка наличия lxml: если он установлен, openpyxl сам использует быстрый C-сериализатор XML при сохранении
+# (иначе - стандартный xml.etree, запись книги заметно медленнее). Вызовы openpyxl от этого не меняются
+try:
+    from openpyxl.xml import LXML as LXML_AVAILABLE
+except ImportError:
+    LXML_AVAILABLE = False
+
+# Попытка импортировать pyexcelerate для быстрой записи Excel без форматирования (опционально)
+# Используется только в резервном режиме без форматирования; если не установлен - pandas ExcelWriter
+try:
+    import pyexcelerate
+    PYEXCELERATE_AVAILABLE = True
+except ImportError:
+    PYEXCELERATE_AVAILABLE = False
+
+# Попытка импортировать polars для быстрого построения сводных таблиц (опционально)
+# Если polars не установлен, используется pandas.pivot_table
+try:
+    import polars as pl
+    POLARS_AVAILABLE = True
+except ImportError:
+    POLARS_AVAILABLE = False
+
+# Попытка импортировать numba для JIT-компиляции горячих циклов агрегации (опционально)
+# Если numba не установлен, используется группировка pandas
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 # xlsxwriter удален - используется только openpyxl
 
 
@@ -57,6 +96,9 @@ MAX_WORKERS = 16  # Количество потоков для параллел
 ENABLE_CHUNKING = False  # True - использовать chunking для больших файлов, False - загружать целиком (chunking медленный, отключен)
 CHUNK_SIZE = 50000  # Размер chunk для чтения больших файлов (строк)
 CHUNKING_THRESHOLD_MB = 200  # Порог размера файла для chunking (МБ) - если файл больше, используем chunking
+ENABLE_PARALLEL_INDEXING = True  # True - индексы по табельным номерам для листа "Данные" строятся параллельно, False - последовательно (детерминированный порядок для отладки)
+NUMBA_MIN_ROWS = 50000  # Минимальное число строк, начиная с которого горячие циклы (суммирование по ТН, прирост, ранги месяцев) выполняются numba-ядрами (если numba доступен)
+SCORE_FLOAT_DTYPE = np.float64  # Тип чисел для нормализации и Score: np.float64 - точно, np.float32 - вдвое меньше памяти и трафика (близкие Score могут стать равными)
 
 # Параметры детального логирования
 DEBUG_TAB_NUMBER: Optional[List[str]] = ["08346532", "01378623", "00406092", "00755745", "01778882"]  # Список табельных номеров для детального логирования (например, ["12345678", "87654321"] или None для отключения)
@@ -81,6 +123,81 @@ ENABLE_RAW_SHEETS: bool = False  # True - формировать RAW листы,
 # "simple" - упрощенное форматирование (только ТН, ИНН, ФИО, ТБ, ГОСБ и заголовок, не форматируем данные показателей и расчетов)
 FORMATTING_MODE: str = "simple"  # "full", "off", "simple"
 
+# Названия типов расчета для листа "Расчет" (используются в логах)
+CALC_TYPE_NAMES: Dict[int, str] = {1: "Как есть (факт)", 2: "Прирост по 2 месяцам", 3: "Прирост по трем периодам"}
+
+# Скомпилированный паттерн номера месяца в имени файла формата M-{номер}_{группа}.xlsx
+_MONTH_RE = re.compile(r'M-(\d{1,2})_')
+# Скомпилированный паттерн колонки показателя: "ГРУППА (M-номер)" с возможными символами после
+_COL_RE = re.compile(r'^([A-Z]+)\s+\(M-(\d{1,2})\)')
+
+# Месяцы и строки-шаблоны листа "Статистика" (колонки: Параметр + M-1..M-12)
+STATISTICS_MONTHS: List[int] = list(range(1, 13))
+STATISTICS_MONTH_HEADER: Tuple[str, ...] = ("Параметр",) + tuple(f"M-{m}" for m in STATISTICS_MONTHS)
+_STATISTICS_EMPTY_TAIL: Tuple[str, ...] = ("",) * (len(STATISTICS_MONTHS) - 1)
+
+
+# ============================================================================
+# NUMBA-ЯДРА ДЛЯ ГОРЯЧИХ ЦИКЛОВ
+# ============================================================================
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _sum_by_code_numba(codes: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+        """
+        Суммирует значения по плотным кодам групп (результат pd.factorize).
+        
+        Args:
+            codes: Коды групп (int64, от 0 до n_groups - 1)
+            values: Значения для суммирования (float64)
+            n_groups: Количество групп
+            
+        Returns:
+            np.ndarray: Суммы по группам (float64), индекс - код группы
+        """
+        out = np.zeros(n_groups, dtype=np.float64)
+        for i in range(codes.shape[0]):
+            out[codes[i]] += values[i]
+        return out
+    
+    @njit(parallel=True, cache=True)
+    def _three_period_diff_numba(curr: np.ndarray, prev1: np.ndarray, prev2: np.ndarray, out: np.ndarray) -> None:
+        """
+        Прирост по трем периодам (curr - 2 * prev1 + prev2) за один проход без промежуточных массивов.
+        
+        Args:
+            curr: Значения текущего месяца (float64)
+            prev1: Значения предыдущего месяца (float64)
+            prev2: Значения пред-предыдущего месяца (float64)
+            out: Массив для результата (float64, той же длины)
+        """
+        for i in prange(curr.shape[0]):
+            out[i] = curr[i] - 2.0 * prev1[i] + prev2[i]
+    
+    @njit(parallel=True, cache=True)
+    def _row_rank_desc_numba(scores: np.ndarray, out: np.ndarray) -> None:
+        """
+        Горизонтальный ранг по строкам как rank(method='min', ascending=False, na_option='keep').
+        
+        Строки независимы, поэтому обрабатываются параллельно (prange) без промежуточной матрицы N x M x M.
+        
+        Args:
+            scores: Матрица Score (N КМ x M месяцев)
+            out: Матрица для результата (float64, N x M): 1 + число месяцев со строго большим Score, NaN для NaN
+        """
+        n_months = scores.shape[1]
+        for i in prange(scores.shape[0]):
+            for j in range(n_months):
+                value = scores[i, j]
+                if np.isnan(value):
+                    out[i, j] = np.nan
+                else:
+                    greater = 0
+                    for k in range(n_months):
+                        if scores[i, k] > value:
+                            greater += 1
+                    out[i, j] = greater + 1.0
+
 
 # ============================================================================
 # КОНФИГУРАЦИЯ МАППИНГА ТЕРРИТОРИАЛЬНЫХ БАНКОВ (ТБ)
@@ -189,7 +306,7 @@ def normalize_tb_value(value: Any) -> Optional[str]:
         normalize_tb_value("BB") -> "ББ" (если "BB" есть в алиасах)
         normalize_tb_value("Неизвестный") -> None
     """
-    if value is None or pd.isna(value):
+    if is_missing_value(value):
         return None
     
     # Преобразуем в строку и очищаем
@@ -240,6 +357,41 @@ def get_tb_aliases(short_name: str) -> Optional[List[str]]:
     return None
 
 
+def sorted_by_value_desc(values: Dict[Any, Any]) -> List[Tuple[Any, Any]]:
+    """
+    Возвращает пары (ключ, значение) словаря, отсортированные по значению по убыванию.
+    
+    Сортировка выполняется одним стабильным argsort в pandas/NumPy вместо sorted() с lambda-ключом;
+    порядок равных значений сохраняется как в исходном словаре (как у sorted(..., reverse=True)).
+    
+    Args:
+        values: Словарь {ключ: числовое значение} (например, количество КМ по ТБ)
+    
+    Returns:
+        List[Tuple[Any, Any]]: Список пар (ключ, значение) по убыванию значения
+    """
+    if not values:
+        return []
+    sorted_series = pd.Series(values).sort_values(ascending=False, kind="stable")
+    return list(zip(sorted_series.index.tolist(), sorted_series.tolist()))
+
+
+def is_missing_value(value: Any) -> bool:
+    """
+    Проверяет скалярное значение на пустоту (None, NaN, NaT, pd.NA).
+    
+    ОПТИМИЗАЦИЯ: Дешевая замена pd.isna для скаляров в поэлементных функциях (apply/map) -
+    без диспетчеризации по типам внутри pandas. NaN и NaT не равны сами себе.
+    
+    Args:
+        value: Скалярное значение
+    
+    Returns:
+        bool: True, если значение пустое
+    """
+    return value is None or value is pd.NA or value != value
+
+
 # ============================================================================
 # КОНФИГУРАЦИЯ ЗАГРУЗКИ ФАЙЛОВ
 # ============================================================================
@@ -1171,7 +1323,7 @@ class Logger:
             str: Отформатированное значение (например, "1 234 567,89" или "0,00" для NaN)
         """
         try:
-            if pd.isna(value) or value == '' or value is None:
+            if is_missing_value(value) or value == '':
                 return "0,00"
             num_value = float(value)
             # Форматируем: разделитель тысяч - пробел, десятичный разделитель - запятая
@@ -1272,9 +1424,20 @@ class Logger:
                 formatted_message = f"[ДЕТАЛЬНОЕ ЛОГИРОВАНИЕ ТН] {masked_message} [def: {func_name}]"
         else:
             formatted_message = f"[ДЕТАЛЬНОЕ ЛОГИРОВАНИЕ ТН] {masked_message}"
-        
+
         self.logger.debug(formatted_message)
-    
+
+    def is_debug_enabled(self) -> bool:
+        """
+        Проверяет, включен ли уровень DEBUG для логгера.
+        Используется для пропуска дорогих вычислений (извлечение примеров из DataFrame,
+        построение f-строк), результат которых нужен только для отладочных сообщений.
+
+        Returns:
+            bool: True, если сообщения уровня DEBUG будут записаны
+        """
+        return self.logger.isEnabledFor(logging.DEBUG)
+
     def info(self, message: str, class_name: Optional[str] = None, func_name: Optional[str] = None) -> None:
         """
         Логирует сообщение уровня INFO.
@@ -1724,6 +1887,9 @@ class FileProcessor:
             "tab_selection": {},  # Статистика выбора табельных: {group: {file_name: {total_variants, selected_count}}}
             "summary": {}  # Итоговая статистика: {total_km, total_clients, by_tb: {tb: count}}
         }
+        
+        # Кэш номеров месяцев по именам файлов (заполняется в _get_month_map)
+        self._month_by_file: Dict[str, int] = {}
     
     def load_all_files(self) -> None:
         """
@@ -1969,7 +2135,7 @@ class FileProcessor:
         Returns:
             str: Нормализованный табельный номер
         """
-        if pd.isna(value):
+        if is_missing_value(value):
             return ""
         value_str = str(value).strip()
         if not value_str or value_str.lower() == 'nan':
@@ -1990,7 +2156,7 @@ class FileProcessor:
         Returns:
             str: Нормализованный ИНН
         """
-        if pd.isna(value):
+        if is_missing_value(value):
             return ""
         value_str = str(value).strip()
         if not value_str or value_str.lower() == 'nan':
@@ -1999,6 +2165,25 @@ class FileProcessor:
         value_clean = value_str.lstrip('0') if value_str.lstrip('0') else '0'
         return value_clean.zfill(length)
     
+    def _normalize_column_unique(self, series: pd.Series, normalizer, length: int, fill_char: str) -> pd.Series:
+        """
+        Применяет нормализатор (_normalize_tab_number / _normalize_inn) к колонке через уникальные значения.
+        
+        ОПТИМИЗАЦИЯ: Нормализатор вызывается один раз на уникальное значение, затем результат
+        раскладывается по строкам через Series.map (вместо вызова Python-функции на каждую строку).
+        
+        Args:
+            series: Колонка для нормализации
+            normalizer: Функция нормализации (value, length, fill_char) -> str
+            length: Длина строки
+            fill_char: Символ для заполнения
+            
+        Returns:
+            pd.Series: Нормализованная колонка
+        """
+        mapping = {value: normalizer(value, length, fill_char) for value in series.unique()}
+        return series.map(mapping)
+    
     def _load_file(self, file_path: Path, group_name: str) -> Optional[pd.DataFrame]:
         """
         Загружает один файл с применением конфигурации.
@@ -2510,7 +2695,7 @@ class FileProcessor:
             
             def check_value(value: Any) -> bool:
                 """Проверяет значение по условию."""
-                if pd.isna(value):
+                if is_missing_value(value):
                     return False
                 value_str = str(value).strip().lower()
                 if rule.condition == "in":
@@ -2573,6 +2758,9 @@ class FileProcessor:
         # Порядок приоритета групп
         group_priority = {"OD": 1, "RA": 2, "PS": 3}
 
+        # ОПТИМИЗАЦИЯ: Уровень логирования проверяем один раз (не для каждой строки)
+        debug_enabled = self.logger.is_debug_enabled()
+
         # ОПТИМИЗАЦИЯ: Кэш для номеров месяцев
         month_cache = {}
         
@@ -2597,7 +2785,7 @@ class FileProcessor:
                 return month_cache[file_name]
             
             # Паттерн для формата M-{номер}_{группа}.xlsx
-            match = re.search(r'M-(\d{1,2})_', file_name)
+            match = _MONTH_RE.search(file_name)
             if match:
                 month = int(match.group(1))
                 if 1 <= month <= 12:
@@ -2648,17 +2836,18 @@ class FileProcessor:
             fio_col = defaults.fio_column
             
             # Сортируем файлы по номеру месяца (от большего к меньшему)
-            files_sorted = sorted(
-                self.processed_files[group].items(),
-                key=lambda x: extract_month_number(x[0]),
-                reverse=True
-            )
+            # ОПТИМИЗАЦИЯ: Номер месяца вычисляется один раз на файл (decorate-sort), сортировка по itemgetter
+            files_sorted = [
+                (extract_month_number(file_name), file_name, df)
+                for file_name, df in self.processed_files[group].items()
+            ]
+            files_sorted.sort(key=itemgetter(0), reverse=True)
             
             # Логируем начало обработки группы
             group_start_time = time_func()
             self.logger.info(f"Обработка группы {group}: {len(files_sorted)} файлов", "FileProcessor", "collect_unique_tab_numbers")
             
-            for file_idx, (file_name, df) in enumerate(files_sorted, 1):
+            for file_idx, (month, file_name, df) in enumerate(files_sorted, 1):
                 processed_files_count += 1
                 
                 # Периодически логируем прогресс
@@ -2671,7 +2860,6 @@ class FileProcessor:
                         "FileProcessor", "collect_unique_tab_numbers"
                     )
                     last_log_time = current_time
-                month = extract_month_number(file_name)
                 self.logger.debug(f"Обработка файла {file_name} группы {group}, месяц {month}", "FileProcessor", "collect_unique_tab_numbers")
                 
                 if tab_col not in df.columns:
@@ -2869,11 +3057,12 @@ class FileProcessor:
                     
                     if missing_cols:
                         self.logger.error(f"КРИТИЧЕСКАЯ ОШИБКА: Колонки {missing_cols} не найдены в df_unique после merge для файла {file_name}. Доступные колонки: {list(df_unique.columns)}. merge_cols={merge_cols}, max_rows.columns={list(max_rows.columns)}", "FileProcessor", "collect_unique_tab_numbers")
-                    else:
+                    elif self.logger.is_debug_enabled():
+                        # ОПТИМИЗАЦИЯ: Примеры значений извлекаем только при включенном DEBUG (.iat - быстрый скалярный доступ)
                         # Проверяем, что данные не пустые
                         if len(df_unique) > 0:
-                            sample_tb = df_unique[tb_col].iloc[0] if tb_col in df_unique.columns else None
-                            sample_fio = df_unique[fio_col].iloc[0] if fio_col in df_unique.columns else None
+                            sample_tb = df_unique[tb_col].iat[0] if tb_col in df_unique.columns else None
+                            sample_fio = df_unique[fio_col].iat[0] if fio_col in df_unique.columns else None
                             # ФИО будет замаскировано в _mask_sensitive_data
                             self.logger.debug(f"df_unique после merge для файла {file_name}: {len(df_unique)} строк. Пример: ТБ='{sample_tb}', fio: {sample_fio}", "FileProcessor", "collect_unique_tab_numbers")
                 else:
@@ -2936,7 +3125,9 @@ class FileProcessor:
                         fio_val = row_tuple[fio_col_idx] if fio_col_idx >= 0 and fio_col_idx < len(row_tuple) else None
                         
                         # РАСШИРЕННОЕ ЛОГИРОВАНИЕ: Логируем первые несколько записей с детальной информацией
-                        if len(all_tab_data) < 5:
+                        # ОПТИМИЗАЦИЯ: f-строки строим только при включенном DEBUG
+                        log_sample = debug_enabled and len(all_tab_data) < 5
+                        if log_sample:
                             # Табельный номер будет замаскирован в _mask_sensitive_data
                             self.logger.debug(f"Извлечение данных для табельного: {tab_number}, tb_col_idx={tb_col_idx}, fio_col_idx={fio_col_idx}, len(row_tuple)={len(row_tuple)}, tb_val={tb_val}, fio_val={fio_val}", "FileProcessor", "collect_unique_tab_numbers")
                         
@@ -2956,7 +3147,7 @@ class FileProcessor:
                             fio_str = ""
                         
                         # Логируем первые несколько записей для отладки
-                        if len(all_tab_data) < 5:
+                        if log_sample:
                             # Табельный номер будет замаскирован в _mask_sensitive_data
                             self.logger.debug(f"Добавлен табельный: {tab_number}, ТБ='{tb_str}', fio: {fio_str} (из файла {file_name})", "FileProcessor", "collect_unique_tab_numbers")
                         
@@ -3164,22 +3355,6 @@ class FileProcessor:
         
         raw_data_list = []
         
-        # ОПТИМИЗАЦИЯ: Кэш для номеров месяцев
-        month_cache = {}
-        
-        def extract_month_number(file_name: str) -> int:
-            """Извлекает номер месяца из имени файла."""
-            if file_name in month_cache:
-                return month_cache[file_name]
-            match = re.search(r'M-(\d{1,2})_', file_name)
-            if match:
-                month = int(match.group(1))
-                if 1 <= month <= 12:
-                    month_cache[file_name] = month
-                    return month
-            month_cache[file_name] = 0
-            return 0
-        
         # ОПТИМИЗАЦИЯ: Параллельная обработка всех файлов (независимо от группы)
         # Подготавливаем список всех файлов для обработки
         files_to_process = []
@@ -3191,13 +3366,12 @@ class FileProcessor:
             defaults = group_config.defaults
             
             # Сортируем файлы по номеру месяца
-            files_sorted = sorted(
-                self.processed_files[group].items(),
-                key=lambda x: extract_month_number(x[0])
-            )
+            # ОПТИМИЗАЦИЯ: Номера месяцев - из общего кэша, сортировка по готовому ключу (decorate-sort)
+            month_map = self._get_month_map(list(self.processed_files[group].keys()))
+            files_sorted = [(month_map[file_name], file_name, df) for file_name, df in self.processed_files[group].items()]
+            files_sorted.sort(key=itemgetter(0))
             
-            for file_name, df in files_sorted:
-                month = extract_month_number(file_name)
+            for month, file_name, df in files_sorted:
                 files_to_process.append((group, file_name, df, defaults, month))
         
         # ОПТИМИЗАЦИЯ: Обрабатываем все файлы параллельно
@@ -3227,82 +3401,75 @@ class FileProcessor:
         
         # ОПТИМИЗАЦИЯ: Используем pivot_table для создания сводной таблицы (быстрее чем циклы)
         base_cols = ["Табельный", "ФИО", "ТБ", "ИНН"]
+        base_cols_set = set(base_cols)
+        
+        # ОПТИМИЗАЦИЯ: Порядок колонок-файлов известен заранее - files_to_process уже отсортирован
+        # по группе (OD -> RA -> PS) и номеру месяца, поэтому разбирать имена колонок регулярным выражением не нужно
+        file_column_order = list(dict.fromkeys(f"{group} (M-{month})" for group, _, _, _, month in files_to_process))
+        file_column_position = {col_name: idx for idx, col_name in enumerate(file_column_order)}
         
         # Функция для сортировки колонок: сначала по группе (OD, RA, PS), затем по номеру месяца
-        def sort_column_key(col_name: str) -> tuple:
+        def sort_column_key(col_name: str) -> int:
             """
-            Функция для сортировки колонок: сначала по группе (OD, RA, PS), затем по номеру месяца.
+            Функция для сортировки колонок: позиция колонки в file_column_order (неизвестные - в конец).
             
             Returns:
-                tuple: (приоритет_группы, номер_месяца) для сортировки
+                int: Позиция колонки для сортировки
             """
-            # Базовые колонки идут первыми
-            if col_name in base_cols:
-                return (-1, 0)
-            
-            # Парсим название колонки: "OD (M-1)", "RA (M-12)" и т.д.
-            match = re.search(r'^([A-Z]+)\s+\(M-(\d{1,2})\)', col_name)
-            if match:
-                group = match.group(1)
-                month = int(match.group(2))
-                
-                # Приоритет групп: OD=1, RA=2, PS=3
-                group_priority = {"OD": 1, "RA": 2, "PS": 3}.get(group, 999)
-                
-                return (group_priority, month)
-            
-            # Если не удалось распарсить, идем в конец
-            return (999, 999)
+            return file_column_position.get(col_name, len(file_column_position))
         
         # Используем pivot_table для создания сводной таблицы
         # Индекс - базовые колонки, колонки - файлы, значения - показатели
         try:
-            pivot_df = raw_df.pivot_table(
-                index=base_cols,
-                columns="Файл_колонка",
-                values="Показатель",
-                aggfunc='sum',
-                fill_value=0
-            )
-            
-            # Сбрасываем индекс для получения плоской таблицы
-            raw_pivot_df = pivot_df.reset_index()
-            
-            # Переименовываем колонки (убираем иерархию если есть)
-            if isinstance(raw_pivot_df.columns, pd.MultiIndex):
-                raw_pivot_df.columns = [col[1] if col[1] else col[0] for col in raw_pivot_df.columns.values]
+            if POLARS_AVAILABLE:
+                # ОПТИМИЗАЦИЯ: Pivot в polars (колоночное хранение, параллельный group-by) - в разы быстрее
+                # pandas.pivot_table на большом числе комбинаций; в pandas конвертируем только результат
+                pl_df = pl.from_pandas(raw_df[base_cols + ["Файл_колонка", "Показатель"]])
+                # ВАЖНО: pl.pivot сохраняет порядок первого появления ключей, а raw_df собран в порядке
+                # завершения потоков (as_completed) - сортируем строки по базовым колонкам, как pivot_table
+                raw_pivot_df = pl_df.pivot(
+                    on="Файл_колонка",
+                    index=base_cols,
+                    values="Показатель",
+                    aggregate_function="sum"
+                ).fill_null(0).to_pandas().sort_values(base_cols, kind="stable", ignore_index=True)
+                self.logger.debug(f"Сводная таблица RAW построена через polars: {len(raw_pivot_df)} строк", "FileProcessor", "prepare_raw_data")
+            else:
+                # ОПТИМИЗАЦИЯ: Категориальная колонка файлов - группировка pivot идет по целочисленным кодам
+                raw_df["Файл_колонка"] = pd.Categorical(raw_df["Файл_колонка"], categories=file_column_order, ordered=True)
+                pivot_df = raw_df.pivot_table(
+                    index=base_cols,
+                    columns="Файл_колонка",
+                    values="Показатель",
+                    aggfunc='sum',
+                    fill_value=0,
+                    observed=True
+                )
+                
+                # Сбрасываем индекс для получения плоской таблицы
+                raw_pivot_df = pivot_df.reset_index()
+                
+                # Переименовываем колонки (убираем иерархию если есть)
+                if isinstance(raw_pivot_df.columns, pd.MultiIndex):
+                    raw_pivot_df.columns = [col[1] if col[1] else col[0] for col in raw_pivot_df.columns.values]
         except Exception as e:
             # Если pivot_table не сработал, используем альтернативный метод
             self.logger.warning(f"Ошибка при создании pivot_table, используем альтернативный метод: {str(e)}", "FileProcessor", "prepare_raw_data")
             
-            # Альтернативный метод: группируем и создаем колонки вручную
-            unique_combinations = raw_df[base_cols].drop_duplicates()
-            file_data_dict = {}
-            for _, row in raw_df.iterrows():
-                key = tuple(row[col] for col in base_cols)
-                file_col = row["Файл_колонка"]
-                if key not in file_data_dict:
-                    file_data_dict[key] = {}
-                file_data_dict[key][file_col] = row["Показатель"]
-            
-            result_data = []
-            for _, combo_row in unique_combinations.iterrows():
-                key = tuple(combo_row[col] for col in base_cols)
-                row = {col: combo_row[col] for col in base_cols}
-                if key in file_data_dict:
-                    row.update(file_data_dict[key])
-                result_data.append(row)
-            
-            raw_pivot_df = pd.DataFrame(result_data)
+            # Альтернативный метод: группировка + unstack (без построчных циклов iterrows)
+            pivot_keys = base_cols + ["Файл_колонка"]
+            grouped_raw = raw_df.groupby(pivot_keys, as_index=False, sort=False, dropna=False, observed=True)["Показатель"].sum()
+            raw_pivot_df = grouped_raw.set_index(pivot_keys)["Показатель"].unstack(fill_value=0).reset_index()
+            raw_pivot_df.columns.name = None
             
             # Применяем правильную сортировку колонок и для альтернативного метода
-            indicator_cols_alt = [col for col in raw_pivot_df.columns if col not in base_cols]
+            indicator_cols_alt = [col for col in raw_pivot_df.columns if col not in base_cols_set]
             indicator_cols_sorted_alt = sorted(indicator_cols_alt, key=sort_column_key)
             all_cols_alt = base_cols + indicator_cols_sorted_alt
             raw_pivot_df = raw_pivot_df[all_cols_alt]
         
         # Заполняем NaN нулями
-        indicator_cols = [col for col in raw_pivot_df.columns if col not in base_cols]
+        indicator_cols = [col for col in raw_pivot_df.columns if col not in base_cols_set]
         if indicator_cols:
             raw_pivot_df[indicator_cols] = raw_pivot_df[indicator_cols].fillna(0)
         
@@ -3316,39 +3483,118 @@ class FileProcessor:
         
         return raw_pivot_df
     
-    def _create_file_index(self, group: str, file_name: str, full_name: str, df: pd.DataFrame, defaults) -> Dict[str, float]:
+    def _create_file_index(self, group: str, file_name: str, full_name: str, df: pd.DataFrame, defaults,
+                           tab_dtype: pd.CategoricalDtype) -> np.ndarray:
         """
-        Создает индекс (словарь) для одного файла: {tab_number: sum}.
+        Создает индекс для одного файла: массив сумм показателя по табельным номерам.
         
         ВАЖНО: Работает с уже загруженными данными из self.processed_files, которые уже содержат
         правильные колонки в зависимости от DATA_MODE (TEST/PROM). Алиасы колонок (tab_number_column,
         indicator_column) одинаковые для обоих режимов.
         
+        ОПТИМИЗАЦИЯ: Табельные номера переводятся в коды общего категориального типа tab_dtype
+        (одинакового для всех файлов), поэтому результат - плотный массив float64, позиция в котором
+        совпадает с позицией табельного номера в tab_dtype.categories. Вместо словаря
+        {tab_number: sum} по каждому файлу - один непрерывный массив.
+        
         Args:
             group: Название группы (OD, RA, PS)
             file_name: Имя файла
             full_name: Полное имя файла (group_file_name)
             df: DataFrame с данными файла (уже загружен с правильными колонками)
             defaults: Конфигурация по умолчанию для группы (содержит алиасы колонок)
+            tab_dtype: Общий категориальный тип табельных номеров (категории - уникальные ТН)
         
         Returns:
-            Словарь {tab_number: sum} с суммами показателей по табельным номерам
+            np.ndarray: Суммы показателей по табельным номерам (длина - число категорий tab_dtype)
         """
         tab_col = defaults.tab_number_column
         indicator_col = defaults.indicator_column
+        n_tabs = len(tab_dtype.categories)
         
         if tab_col not in df.columns or indicator_col not in df.columns:
-            return {}
+            return np.zeros(n_tabs, dtype=np.float64)
+        
+        # ОПТИМИЗАЦИЯ: Работаем только с двумя нужными колонками (без копии всего DataFrame)
+        keys = df[tab_col].astype(str).str.strip()
+        values = pd.to_numeric(df[indicator_col], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+        
+        # Коды категорий: пустые значения, 'nan' и ТН вне списка уникальных получают код -1
+        codes = pd.Categorical(keys, dtype=tab_dtype).codes
+        mask = codes >= 0
+        if not mask.all():
+            codes = codes[mask]
+            values = values[mask]
+        codes = codes.astype(np.int64, copy=False)
+        
+        # ОПТИМИЗАЦИЯ: Суммирование без словарей - результат сразу плотный массив по кодам ТН.
+        # Коды категорий плотные (0..n_tabs-1), поэтому вместо сортировки + np.add.reduceat
+        # достаточно одного линейного прохода: numba-ядро для больших файлов, иначе - np.bincount
+        if NUMBA_AVAILABLE and len(codes) > NUMBA_MIN_ROWS:
+            return _sum_by_code_numba(codes, values, n_tabs)
+        return np.bincount(codes, weights=values, minlength=n_tabs)
+    
+    def _get_month_map(self, file_names: List[str]) -> Dict[str, int]:
+        """
+        Возвращает номера месяцев для списка имен файлов формата M-{номер}_{группа}.xlsx.
+        
+        ОПТИМИЗАЦИЯ: Номера месяцев извлекаются одним векторным вызовом str.extract
+        для всех еще не известных файлов и кэшируются в self._month_by_file.
+        
+        Args:
+            file_names: Список имен файлов
+            
+        Returns:
+            Dict[str, int]: Словарь {имя_файла: номер_месяца} (0, если месяц не определен)
+        """
+        new_names = [name for name in file_names if name not in self._month_by_file]
+        if new_names:
+            months = pd.Series(new_names, dtype=object).str.extract(_MONTH_RE)[0]
+            months = pd.to_numeric(months, errors='coerce').fillna(0).astype(int)
+            # Номера вне диапазона 1-12 считаем неопределенными
+            months = months.where((months >= 1) & (months <= 12), 0)
+            self._month_by_file.update(zip(new_names, months.tolist()))
+        return {name: self._month_by_file[name] for name in file_names}
+    
+    def _make_base_frame(self, df: pd.DataFrame, columns: List[str], index: Optional[pd.Index] = None) -> pd.DataFrame:
+        """
+        Создает DataFrame из базовых колонок без копирования данных.
+        
+        ОПТИМИЗАЦИЯ: Колонки берутся как массивы numpy без копии (copy=False), поэтому производные
+        фреймы (нормализация, места, итог) разделяют массивы ТН, ТБ и ФИО с исходным фреймом.
+        ВАЖНО: Базовые колонки результата нельзя изменять на месте - только добавлять новые колонки.
+        
+        Args:
+            df: Исходный DataFrame
+            columns: Список базовых колонок
+            index: Индекс результата (по умолчанию - RangeIndex, как после reset_index(drop=True))
+            
+        Returns:
+            pd.DataFrame: DataFrame с базовыми колонками
+        """
+        return pd.DataFrame({col: df[col].to_numpy(copy=False) for col in columns}, index=index, copy=False)
+    
+    def _count_non_empty(self, df: pd.DataFrame, columns: List[str]) -> Dict[str, int]:
+        """
+        Считает количество заполненных (не NaN и не пустая строка) значений в колонках.
         
-        # ОПТИМИЗАЦИЯ: Нормализуем табельные номера один раз
-        df_normalized = df.copy()
-        df_normalized[tab_col] = df_normalized[tab_col].astype(str).str.strip()
-        df_normalized = df_normalized[df_normalized[tab_col] != 'nan']
-        df_normalized = df_normalized[df_normalized[tab_col] != '']
+        ОПТИМИЗАЦИЯ: Один проход numpy по матрице выбранных колонок вместо отдельных
+        notna() и сравнения со строкой для каждой колонки.
         
-        # ОПТИМИЗАЦИЯ: Группируем по табельным номерам и суммируем показатели один раз для всего файла
-        grouped = df_normalized.groupby(tab_col)[indicator_col].sum()
-        return grouped.to_dict()
+        Args:
+            df: DataFrame с данными
+            columns: Список колонок для проверки (отсутствующие в df считаются пустыми)
+            
+        Returns:
+            Dict[str, int]: Словарь {колонка: количество заполненных значений}
+        """
+        existing = [col for col in columns if col in df.columns]
+        counts = {col: 0 for col in columns}
+        if existing and len(df) > 0:
+            values = df[existing].to_numpy(dtype=object)
+            non_empty = pd.notna(values) & (values != "")
+            counts.update(zip(existing, non_empty.sum(axis=0).tolist()))
+        return counts
     
     def prepare_summary_data(self) -> pd.DataFrame:
         """
@@ -3361,27 +3607,14 @@ class FileProcessor:
         """
         self.logger.info("=== Начало подготовки сводных данных для листа 'Данные' ===", "FileProcessor", "prepare_summary_data")
         
+        # ОПТИМИЗАЦИЯ: Уровень логирования проверяем один раз - отладочные проверки (сканирование колонок)
+        # выполняются только при включенном DEBUG
+        debug_enabled = self.logger.is_debug_enabled()
+        
         if not self.unique_tab_numbers:
             self.logger.warning("Уникальные табельные номера не собраны", "FileProcessor", "prepare_summary_data")
             self.collect_unique_tab_numbers()
         
-        # ОПТИМИЗАЦИЯ: Кэш для номеров месяцев
-        month_cache = {}
-        
-        # Извлекаем номер месяца из имени файла для сортировки
-        def extract_month_number(file_name: str) -> int:
-            """Извлекает номер месяца из имени файла."""
-            if file_name in month_cache:
-                return month_cache[file_name]
-            match = re.search(r'M-(\d{1,2})_', file_name)
-            if match:
-                month = int(match.group(1))
-                if 1 <= month <= 12:
-                    month_cache[file_name] = month
-                    return month
-            month_cache[file_name] = 0
-            return 0
-        
         # Создаем список всех файлов в порядке обработки
         # Порядок: для каждой группы (OD, RA, PS) файлы сортируются по месяцам (M-1, M-2, ..., M-12)
         all_files: List[Tuple[str, str, str]] = []  # (group, file_name, full_name)
@@ -3389,12 +3622,11 @@ class FileProcessor:
         # Логируем информацию о группах и месяцах (DEBUG - детальная информация)
         for group in self.groups:
             if group in self.processed_files:
+                # ОПТИМИЗАЦИЯ: Номера месяцев для всех файлов группы извлекаются одним векторным вызовом
+                month_map = self._get_month_map(list(self.processed_files[group].keys()))
                 # Сортируем файлы по номеру месяца (1-12)
-                files_sorted = sorted(
-                    self.processed_files[group].keys(),
-                    key=lambda x: extract_month_number(x)
-                )
-                months_list = [extract_month_number(fn) for fn in files_sorted]
+                files_sorted = sorted(month_map, key=month_map.__getitem__)
+                months_list = [month_map[fn] for fn in files_sorted]
                 self.logger.debug(f"Лист 'Данные': Группа {group}, обрабатываем месяцы: {months_list} (M-{min(months_list)} ... M-{max(months_list)})", "FileProcessor", "prepare_summary_data")
                 for file_name in files_sorted:
                     full_name = f"{group}_{file_name}"
@@ -3405,9 +3637,14 @@ class FileProcessor:
         # ОПТИМИЗАЦИЯ: Предварительно создаем индексы для всех файлов параллельно
         # Кэшируем конфигурации групп
         self.logger.debug("Лист 'Данные': Параллельное создание индексов по табельным номерам для всех файлов", "FileProcessor", "prepare_summary_data")
-        file_indexes = {}  # {full_name: {tab_number: sum}}
+        file_indexes: Dict[str, np.ndarray] = {}  # {full_name: массив сумм по табельным номерам}
         group_configs_cache = {}  # Кэш конфигураций
         
+        # ОПТИМИЗАЦИЯ: Общий категориальный тип табельных номеров для всех файлов -
+        # индексы файлов строятся как массивы по кодам категорий вместо словарей по строкам
+        tab_numbers = list(self.unique_tab_numbers.keys())
+        tab_dtype = pd.CategoricalDtype(categories=tab_numbers)
+        
         # Подготавливаем список файлов для обработки
         files_to_index = []
         for group, file_name, full_name in all_files:
@@ -3421,11 +3658,19 @@ class FileProcessor:
                 defaults = group_configs_cache[group].defaults
                 files_to_index.append((group, file_name, full_name, df, defaults))
         
-        # ОПТИМИЗАЦИЯ: Создаем индексы параллельно для всех файлов
-        if files_to_index:
+        # ОПТИМИЗАЦИЯ: Создаем индексы параллельно для всех файлов (кэш конфигураций уже заполнен и только читается)
+        if files_to_index and not ENABLE_PARALLEL_INDEXING:
+            # Последовательный режим - файлы обрабатываются строго в порядке колонок (удобно для отладки)
+            for group, file_name, full_name, df, defaults in files_to_index:
+                try:
+                    file_indexes[full_name] = self._create_file_index(group, file_name, full_name, df, defaults, tab_dtype)
+                except Exception as e:
+                    self.logger.error(f"Ошибка при создании индекса для файла {full_name}: {str(e)}", "FileProcessor", "prepare_summary_data")
+                    file_indexes[full_name] = np.zeros(len(tab_numbers), dtype=np.float64)
+        elif files_to_index:
             with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
                 future_to_file = {
-                    executor.submit(self._create_file_index, group, file_name, full_name, df, defaults): (group, file_name, full_name)
+                    executor.submit(self._create_file_index, group, file_name, full_name, df, defaults, tab_dtype): (group, file_name, full_name)
                     for group, file_name, full_name, df, defaults in files_to_index
                 }
                 
@@ -3437,90 +3682,81 @@ class FileProcessor:
                         file_indexes[full_name] = file_index
                     except Exception as e:
                         self.logger.error(f"Ошибка при создании индекса для файла {full_name}: {str(e)}", "FileProcessor", "prepare_summary_data")
-                        file_indexes[full_name] = {}
+                        file_indexes[full_name] = np.zeros(len(tab_numbers), dtype=np.float64)
         
         self.logger.debug(f"Лист 'Данные': Индексы созданы для {len(file_indexes)} файлов", "FileProcessor", "prepare_summary_data")
         
         # Создаем структуру данных
-        result_data = []
         total_tab_numbers = len(self.unique_tab_numbers)
         self.logger.info(f"Лист 'Данные': Обработка {total_tab_numbers} уникальных табельных номеров", "FileProcessor", "prepare_summary_data")
         
-        processed_count = 0
-        for tab_number, tab_info in self.unique_tab_numbers.items():
-            processed_count += 1
-            # Логируем прогресс каждые 100 записей или в начале/конце (DEBUG - детальная информация)
-            if processed_count == 1 or processed_count % 100 == 0 or processed_count == total_tab_numbers:
-                self.logger.debug(f"Лист 'Данные': Обработано {processed_count} из {total_tab_numbers} табельных номеров ({processed_count * 100 // total_tab_numbers if total_tab_numbers > 0 else 0}%)", "FileProcessor", "prepare_summary_data")
-            # Форматируем табельный номер: 8 знаков с лидирующими нулями
-            tab_number_formatted = str(tab_number).zfill(8) if tab_number else "00000000"
-            
-            # ВАЖНО: Извлекаем значения напрямую из словаря (не через get с проверкой)
-            # ГОСБ не используется для вывода, но остается в tab_info для обратной совместимости
-            tb_value = tab_info.get("tb", "") or ""
-            fio_value = tab_info.get("fio", "") or ""
-            
-            # РАСШИРЕННОЕ ЛОГИРОВАНИЕ: Логируем первые несколько записей и каждую 100-ю для отладки
-            if processed_count <= 5 or processed_count % 100 == 0:
+        # Базовые колонки (Табельный, ТБ, ФИО)
+        # ОПТИМИЗАЦИЯ: ТБ и ФИО берем одним конструктором DataFrame.from_dict из словаря табельных номеров
+        # (порядок строк совпадает с tab_numbers) вместо построчного чтения tab_info
+        # ГОСБ не используется для вывода, но остается в tab_info для обратной совместимости
+        n_tabs = len(tab_numbers)
+        base_info_df = pd.DataFrame.from_dict(self.unique_tab_numbers, orient='index').reindex(columns=["tb", "fio"])
+        tb_values = base_info_df["tb"].fillna("").astype(str).to_numpy(dtype=object)
+        fio_values = base_info_df["fio"].fillna("").astype(str).to_numpy(dtype=object)
+        # Форматируем табельный номер: 8 знаков с лидирующими нулями
+        # ОПТИМИЗАЦИЯ: Один векторизованный str.zfill вместо вызова str(...).zfill(8) для каждого номера
+        tab_series = pd.Series(tab_numbers, dtype=object)
+        tab_values = tab_series.astype(str).str.zfill(8).where(tab_series.astype(bool), "00000000").to_numpy(dtype=object)
+        self.logger.debug(f"Лист 'Данные': Базовые колонки сформированы для {n_tabs} табельных номеров", "FileProcessor", "prepare_summary_data")
+        
+        # РАСШИРЕННОЕ ЛОГИРОВАНИЕ: Проверяем первые несколько записей и каждую 100-ю
+        sample_positions = sorted(set(range(min(5, n_tabs))) | set(range(99, n_tabs, 100)))
+        for pos in sample_positions:
+            tab_info = self.unique_tab_numbers[tab_numbers[pos]]
+            if debug_enabled:
                 # Табельный номер и ФИО будут замаскированы в _mask_sensitive_data
-                self.logger.debug(f"Подготовка строки для табельного: {tab_number_formatted}, ТБ='{tb_value}', fio: {fio_value} (из tab_info: {list(tab_info.keys())}, значения: {tab_info})", "FileProcessor", "prepare_summary_data")
-                
-                # Проверяем, что значения не пустые
-                if not tb_value and not fio_value:
-                    # Табельный номер будет замаскирован в _mask_sensitive_data
-                    self.logger.warning(f"ВНИМАНИЕ: Для табельного: {tab_number_formatted} все значения (ТБ, ФИО) пустые! tab_info={tab_info}", "FileProcessor", "prepare_summary_data")
-            
-            row = {
-                "Табельный": tab_number_formatted,
-                "ТБ": str(tb_value) if tb_value else "",
-                "ФИО": str(fio_value) if fio_value else ""
-            }
-            
-            # ОПТИМИЗАЦИЯ: Используем предварительно созданные индексы вместо фильтрации
-            for group, file_name, full_name in all_files:
-                if full_name in file_indexes:
-                    row[full_name] = file_indexes[full_name].get(tab_number, 0)
-                else:
-                    row[full_name] = 0
-            
-            # ДЕТАЛЬНОЕ ЛОГИРОВАНИЕ: Если это табельный номер для детального логирования
-            if self.logger._is_debug_tab_number(tab_number):
-                # Собираем информацию о всех значениях по месяцам
-                month_values = {}
-                for group, file_name, full_name in all_files:
-                    value = row.get(full_name, 0)
-                    if value != 0:
-                        month_values[full_name] = value
-                
-                self.logger.debug_tab(
-                    f"Подготовка сводных данных для ТН: ТБ='{tb_value}', ФИО='{fio_value}'. "
-                    f"Найдено значений по месяцам: {len(month_values)}. "
-                    f"Детали: {dict(list(month_values.items())[:10])}",
-                    tab_number=tab_number,
-                    class_name="FileProcessor",
-                    func_name="prepare_summary_data"
-                )
+                self.logger.debug(f"Подготовка строки для табельного: {tab_values[pos]}, ТБ='{tb_values[pos]}', fio: {fio_values[pos]} (из tab_info: {list(tab_info.keys())}, значения: {tab_info})", "FileProcessor", "prepare_summary_data")
             
-            result_data.append(row)
+            # Проверяем, что значения не пустые
+            if not tb_values[pos] and not fio_values[pos]:
+                # Табельный номер будет замаскирован в _mask_sensitive_data
+                self.logger.warning(f"ВНИМАНИЕ: Для табельного: {tab_values[pos]} все значения (ТБ, ФИО) пустые! tab_info={tab_info}", "FileProcessor", "prepare_summary_data")
+        
+        # Позиции табельных номеров для детального логирования
+        debug_positions = [pos for pos, tab_number in enumerate(tab_numbers) if self.logger._is_debug_tab_number(tab_number)]
+        
+        # ОПТИМИЗАЦИЯ: Значения по файлам - это уже выровненные по tab_numbers массивы,
+        # таблица собирается из них по колонкам без поиска по словарям
+        # Файлы без индекса получают 0 (как и раньше)
+        data_columns = [full_name for _, _, full_name in all_files]
+        zero_column = np.zeros(n_tabs, dtype=np.float64)
+        data_arrays = {full_name: file_indexes.get(full_name, zero_column) for full_name in data_columns}
+        
+        # ДЕТАЛЬНОЕ ЛОГИРОВАНИЕ: Для табельных номеров из DEBUG_TAB_NUMBER
+        for pos in debug_positions:
+            tab_number = tab_numbers[pos]
+            # Собираем информацию о всех значениях по месяцам
+            month_values = {full_name: values[pos] for full_name, values in data_arrays.items() if values[pos] != 0}
+            
+            self.logger.debug_tab(
+                f"Подготовка сводных данных для ТН: ТБ='{tb_values[pos]}', ФИО='{fio_values[pos]}'. "
+                f"Найдено значений по месяцам: {len(month_values)}. "
+                f"Детали: {dict(list(month_values.items())[:10])}",
+                tab_number=tab_number,
+                class_name="FileProcessor",
+                func_name="prepare_summary_data"
+            )
         
-        self.logger.debug(f"Лист 'Данные': Завершена обработка всех табельных номеров, формирование DataFrame из {len(result_data)} строк", "FileProcessor", "prepare_summary_data")
-        result_df = pd.DataFrame(result_data)
+        self.logger.debug(f"Лист 'Данные': Завершена обработка всех табельных номеров, формирование DataFrame из {n_tabs} строк", "FileProcessor", "prepare_summary_data")
+        # Один конструктор DataFrame из словаря колонок (тип каждой колонки известен заранее)
+        result_df = pd.DataFrame(
+            {"Табельный": tab_values, "ТБ": tb_values, "ФИО": fio_values, **data_arrays},
+            columns=["Табельный", "ТБ", "ФИО"] + data_columns
+        )
         self.logger.debug(f"Лист 'Данные': DataFrame создан, размер: {len(result_df)} строк x {len(result_df.columns)} колонок", "FileProcessor", "prepare_summary_data")
         
         # ВАЖНО: Проверяем, что базовые колонки заполнены данными
-        if len(result_df) > 0:
-            sample_tb = result_df["ТБ"].iloc[0] if "ТБ" in result_df.columns else None
-            sample_fio = result_df["ФИО"].iloc[0] if "ФИО" in result_df.columns else None
+        # (предупреждение о пустых ТБ/ФИО выдается финальной проверкой ниже независимо от уровня логирования)
+        if debug_enabled and len(result_df) > 0:
+            sample_tb = result_df["ТБ"].iat[0] if "ТБ" in result_df.columns else None
+            sample_fio = result_df["ФИО"].iat[0] if "ФИО" in result_df.columns else None
             # ФИО будет замаскировано в _mask_sensitive_data
             self.logger.debug(f"summary_df (result_df) создан: {len(result_df)} строк. Пример: ТБ='{sample_tb}', fio: {sample_fio}", "FileProcessor", "prepare_summary_data")
-            
-            # Проверяем, что не все значения пустые
-            if "ТБ" in result_df.columns:
-                non_empty_tb = result_df["ТБ"].notna() & (result_df["ТБ"] != "")
-                if non_empty_tb.sum() == 0:
-                    self.logger.warning(f"В summary_df все значения ТБ пустые!", "FileProcessor", "prepare_summary_data")
-                else:
-                    self.logger.debug(f"В summary_df заполнено ТБ: {non_empty_tb.sum()}/{len(result_df)} строк", "FileProcessor", "prepare_summary_data")
         
         # Собираем итоговую статистику
         if ENABLE_STATISTICS:
@@ -3538,8 +3774,11 @@ class FileProcessor:
                     self.statistics["summary"]["total_clients"] = unique_clients
             
             # Количество КМ по ТБ
+            # ОПТИМИЗАЦИЯ: np.unique с подсчетом вместо value_counts().to_dict() - без сортировки по частоте
+            # и промежуточной Series (порядок по количеству задается при выводе статистики)
             if "ТБ" in result_df.columns:
-                by_tb = result_df["ТБ"].value_counts().to_dict()
+                tb_unique, tb_counts = np.unique(result_df["ТБ"].astype(str).to_numpy(), return_counts=True)
+                by_tb = dict(zip(tb_unique.tolist(), tb_counts.tolist()))
                 self.statistics["summary"]["by_tb"] = by_tb
             
             # Количество КМ по ГОСБ - убрано по требованию (считаем только по ТБ)
@@ -3549,30 +3788,34 @@ class FileProcessor:
         first_group = list(config_manager.groups.keys())[0] if config_manager.groups else None
         if first_group:
             defaults = config_manager.get_group_config(first_group).defaults
+            # ОПТИМИЗАЦИЯ: Нормализация через уникальные значения + map (без вызова функции на каждую строку)
             if "Табельный" in result_df.columns:
-                result_df["Табельный"] = result_df["Табельный"].apply(
-                    lambda x: self._normalize_tab_number(x, defaults.tab_number_length, defaults.tab_number_fill_char)
+                result_df["Табельный"] = self._normalize_column_unique(
+                    result_df["Табельный"], self._normalize_tab_number, defaults.tab_number_length, defaults.tab_number_fill_char
                 )
             if "ID_Clients" in result_df.columns:
-                result_df["ID_Clients"] = result_df["ID_Clients"].apply(
-                    lambda x: self._normalize_inn(x, defaults.inn_length, defaults.inn_fill_char)
+                result_df["ID_Clients"] = self._normalize_column_unique(
+                    result_df["ID_Clients"], self._normalize_inn, defaults.inn_length, defaults.inn_fill_char
                 )
 
         # ВАЖНО: Проверяем на дубликаты табельных номеров в итоговом результате
         if "Табельный" in result_df.columns:
-            duplicates = result_df[result_df.duplicated(subset=["Табельный"], keep=False)]
-            if len(duplicates) > 0:
-                duplicate_tabs = duplicates["Табельный"].unique()
+            # ОПТИМИЗАЦИЯ: Один проход хеширования - маска повторов (keep='first') используется
+            # и для подсчета/примеров в логе, и для удаления дубликатов
+            duplicate_mask = result_df.duplicated(subset=["Табельный"], keep='first')
+            removed_count = int(duplicate_mask.sum())
+            if removed_count > 0:
+                duplicate_tabs = result_df.loc[duplicate_mask, "Табельный"].unique()
                 self.logger.warning(f"Лист 'Данные': Обнаружено {len(duplicate_tabs)} дубликатов табельных номеров в итоговом результате! Примеры: {list(duplicate_tabs[:5])}", "FileProcessor", "prepare_summary_data")
                 # Удаляем дубликаты, оставляя первую запись
                 # ВАЖНО: Сохраняем базовые колонки при удалении дубликатов
-                result_df = result_df.drop_duplicates(subset=["Табельный"], keep='first')
-                self.logger.warning(f"Лист 'Данные': Дубликаты удалены, осталось {len(result_df)} уникальных табельных номеров", "FileProcessor", "prepare_summary_data")
+                result_df = result_df[~duplicate_mask]
+                self.logger.warning(f"Лист 'Данные': Дубликаты удалены ({removed_count} строк), осталось {len(result_df)} уникальных табельных номеров", "FileProcessor", "prepare_summary_data")
                 
-                # Проверяем, что базовые колонки не потерялись после drop_duplicates
-                if len(result_df) > 0:
-                    sample_tb = result_df["ТБ"].iloc[0] if "ТБ" in result_df.columns else None
-                    sample_fio = result_df["ФИО"].iloc[0] if "ФИО" in result_df.columns else None
+                # Проверяем, что базовые колонки не потерялись после удаления дубликатов
+                if debug_enabled and len(result_df) > 0:
+                    sample_tb = result_df["ТБ"].iat[0] if "ТБ" in result_df.columns else None
+                    sample_fio = result_df["ФИО"].iat[0] if "ФИО" in result_df.columns else None
                     self.logger.debug(f"После drop_duplicates: ТБ='{sample_tb}', ФИО='{sample_fio}'", "FileProcessor", "prepare_summary_data")
         
         # Упорядочиваем колонки: сначала базовые, потом по группам и месяцам
@@ -3581,10 +3824,13 @@ class FileProcessor:
         data_columns = [full_name for _, _, full_name in all_files]
         ordered_columns = base_columns + data_columns
         
+        # ОПТИМИЗАЦИЯ: Проверки принадлежности через множества (O(K) вместо O(K^2) для сотен колонок)
+        result_columns_set = set(result_df.columns)
         # Оставляем только существующие колонки
-        existing_columns = [col for col in ordered_columns if col in result_df.columns]
+        existing_columns = [col for col in ordered_columns if col in result_columns_set]
+        existing_columns_set = set(existing_columns)
         # Добавляем колонки, которых нет в списке (на случай если что-то пропущено)
-        other_columns = [col for col in result_df.columns if col not in existing_columns]
+        other_columns = [col for col in result_df.columns if col not in existing_columns_set]
         final_columns = existing_columns + other_columns
         
         result_df = result_df[final_columns]
@@ -3600,20 +3846,23 @@ class FileProcessor:
             else:
                 self.logger.debug(f"Проверка базовых колонок: все базовые колонки присутствуют в summary_df", "FileProcessor", "prepare_summary_data")
             
-            sample_tb = result_df["ТБ"].iloc[0] if "ТБ" in result_df.columns else None
-            sample_fio = result_df["ФИО"].iloc[0] if "ФИО" in result_df.columns else None
-            # ФИО будет замаскировано в _mask_sensitive_data
-            self.logger.debug(f"Финальный summary_df: {len(result_df)} строк x {len(result_df.columns)} колонок. Пример первой строки: ТБ='{sample_tb}', fio: {sample_fio}", "FileProcessor", "prepare_summary_data")
+            if debug_enabled:
+                sample_tb = result_df["ТБ"].iat[0] if "ТБ" in result_df.columns else None
+                sample_fio = result_df["ФИО"].iat[0] if "ФИО" in result_df.columns else None
+                # ФИО будет замаскировано в _mask_sensitive_data
+                self.logger.debug(f"Финальный summary_df: {len(result_df)} строк x {len(result_df.columns)} колонок. Пример первой строки: ТБ='{sample_tb}', fio: {sample_fio}", "FileProcessor", "prepare_summary_data")
             
-            # Проверяем, что не все значения пустые
+            # Проверяем, что не все значения пустые (предупреждение выдается при любом уровне логирования)
             if "ТБ" in result_df.columns:
-                non_empty_tb = result_df["ТБ"].notna() & (result_df["ТБ"] != "")
-                non_empty_fio = result_df["ФИО"].notna() & (result_df["ФИО"] != "") if "ФИО" in result_df.columns else pd.Series([False] * len(result_df))
-                self.logger.debug(f"Финальная проверка заполненности: ТБ={non_empty_tb.sum()}/{len(result_df)}, ФИО={non_empty_fio.sum()}/{len(result_df)}", "FileProcessor", "prepare_summary_data")
-                
-                if non_empty_tb.sum() == 0:
+                # ОПТИМИЗАЦИЯ: Заполненность ТБ и ФИО считаем одним проходом
+                non_empty = self._count_non_empty(result_df, ["ТБ", "ФИО"])
+                # ОПТИМИЗАЦИЯ: Строка со статистикой заполненности формируется только при уровне DEBUG
+                if debug_enabled:
+                    self.logger.debug(f"Финальная проверка заполненности: ТБ={non_empty['ТБ']}/{len(result_df)}, ФИО={non_empty['ФИО']}/{len(result_df)}", "FileProcessor", "prepare_summary_data")
+
+                if non_empty["ТБ"] == 0:
                     self.logger.warning(f"ВНИМАНИЕ: В summary_df все значения ТБ пустые!", "FileProcessor", "prepare_summary_data")
-                if non_empty_fio.sum() == 0:
+                if non_empty["ФИО"] == 0:
                     self.logger.warning(f"ВНИМАНИЕ: В summary_df все значения ФИО пустые!", "FileProcessor", "prepare_summary_data")
         
         self.logger.info(f"Лист 'Данные': Подготовлено {len(result_df)} строк сводных данных, колонок: {len(result_df.columns)}", "FileProcessor", "prepare_summary_data")
@@ -3637,27 +3886,13 @@ class FileProcessor:
             pd.DataFrame: DataFrame с расчетными данными
         """
         self.logger.info("=== Начало подготовки расчетных данных для листа 'Расчеты' ===", "FileProcessor", "prepare_calculated_data")
+        
+        # ОПТИМИЗАЦИЯ: Отладочные проверки (примеры строк, заполненность колонок) - только при включенном DEBUG
+        debug_enabled = self.logger.is_debug_enabled()
 
         # ВАЖНО: Базовые текстовые колонки, которые НЕ должны конвертироваться в числа
         base_text_columns = ['Табельный', 'ТБ', 'ФИО', 'ИНН']
 
-        # ОПТИМИЗАЦИЯ: Кэш для номеров месяцев
-        month_cache = {}
-        
-        # Извлекаем номер месяца из имени файла
-        def extract_month_number(file_name: str) -> int:
-            """Извлекает номер месяца из имени файла."""
-            if file_name in month_cache:
-                return month_cache[file_name]
-            match = re.search(r'M-(\d{1,2})_', file_name)
-            if match:
-                month = int(match.group(1))
-                if 1 <= month <= 12:
-                    month_cache[file_name] = month
-                    return month
-            month_cache[file_name] = 0
-            return 0
-        
         # Функция для генерации понятного имени колонки на основе типа расчета
         def generate_column_name(group: str, month: int, calc_type: int, 
                                  prev_month: Optional[int] = None, 
@@ -3716,19 +3951,49 @@ class FileProcessor:
         else:
             self.logger.debug(f"Проверка summary_df: все базовые колонки присутствуют перед копированием", "FileProcessor", "prepare_calculated_data")
         
-        # ВАЖНО: Создаем копию ПЕРЕД конвертацией, чтобы не испортить исходные данные
+        # ВАЖНО: summary_df не изменяется - calculated_df собирается из отдельно выбранных текстовых колонок
+        # и нового числового блока, поэтому полная копия широкого фрейма не нужна
+        # ОПТИМИЗАЦИЯ: Без summary_df.copy() пиковое потребление памяти примерно вдвое ниже
         # Сбрасываем индекс, чтобы гарантировать совпадение строк
-        calculated_df = summary_df.copy().reset_index(drop=True)
+        text_columns = [col for col in summary_df.columns if col in base_text_columns]
+        numeric_columns = [col for col in summary_df.columns if col not in base_text_columns]
+        text_part = summary_df[text_columns].reset_index(drop=True)
+        numeric_part = summary_df[numeric_columns].reset_index(drop=True)
         
-        # ВАЖНО: Конвертируем числовые колонки ТОЛЬКО в calculated_df, а не в summary_df
-        # Это нужно делать ПОСЛЕ копирования, чтобы не испортить исходные данные
+        # ОПТИМИЗАЦИЯ: Конвертируем все числовые колонки в числовой тип перед вычислениями
+        # Это исправляет ошибку "unsupported operand type(s) for -: 'str' and 'float'"
+        # ВАЖНО: Исключаем базовые текстовые колонки из конвертации!
+        # ОПТИМИЗАЦИЯ: Колонки, которые уже числовые (prepare_summary_data пишет float64), не трогаем;
+        # остальные конвертируем одним вызовом на срез вместо присваивания по одной колонке
+        columns_to_convert = [
+            col for col in numeric_columns
+            if not pd.api.types.is_numeric_dtype(numeric_part[col].dtype)
+        ]
+        if columns_to_convert:
+            try:
+                numeric_part[columns_to_convert] = numeric_part[columns_to_convert].apply(pd.to_numeric, errors='coerce')
+            except Exception:
+                pass  # Если не получилось, оставляем как есть
         
-        # РАСШИРЕННОЕ ЛОГИРОВАНИЕ: Проверяем данные сразу после копирования, ДО конвертации
-        if len(calculated_df) > 0:
-            sample_tb_before = calculated_df["ТБ"].iloc[0] if "ТБ" in calculated_df.columns else None
-            sample_fio_before = calculated_df["ФИО"].iloc[0] if "ФИО" in calculated_df.columns else None
+        # ОПТИМИЗАЦИЯ: Собираем все числовые колонки в один непрерывный блок float64 (одно приведение типа
+        # для 2D-массива вместо поколоночных преобразований) - последующая арифметика по месяцам идет по одному блоку
+        if numeric_columns:
+            try:
+                numeric_part = pd.DataFrame(
+                    numeric_part.to_numpy(dtype=np.float64, na_value=np.nan),
+                    columns=numeric_columns,
+                    index=numeric_part.index
+                )
+            except (ValueError, TypeError):
+                pass  # Если в колонках остались нечисловые значения, оставляем как есть
+        calculated_df = pd.concat([text_part, numeric_part], axis=1)[list(summary_df.columns)]
+        
+        # РАСШИРЕННОЕ ЛОГИРОВАНИЕ: Проверяем данные сразу после сборки
+        if debug_enabled and len(calculated_df) > 0:
+            sample_tb_before = calculated_df["ТБ"].iat[0] if "ТБ" in calculated_df.columns else None
+            sample_fio_before = calculated_df["ФИО"].iat[0] if "ФИО" in calculated_df.columns else None
             # ФИО будет замаскировано в _mask_sensitive_data
-            self.logger.debug(f"calculated_df сразу после копирования (ДО конвертации): ТБ='{sample_tb_before}', fio: {sample_fio_before}", "FileProcessor", "prepare_calculated_data")
+            self.logger.debug(f"calculated_df сразу после сборки из summary_df: ТБ='{sample_tb_before}', fio: {sample_fio_before}", "FileProcessor", "prepare_calculated_data")
         
         # ВАЖНО: Проверяем, что базовые колонки есть и не пустые в calculated_df
         if not all(col in calculated_df.columns for col in base_columns):
@@ -3736,29 +4001,17 @@ class FileProcessor:
             self.logger.error(f"КРИТИЧЕСКАЯ ОШИБКА: После копирования в calculated_df отсутствуют базовые колонки: {missing_cols}. Доступные колонки: {list(calculated_df.columns)[:10]}", "FileProcessor", "prepare_calculated_data")
             raise ValueError(f"Отсутствуют базовые колонки после копирования: {missing_cols}")
         
-        # ОПТИМИЗАЦИЯ: Конвертируем все числовые колонки в числовой тип перед вычислениями
-        # Это исправляет ошибку "unsupported operand type(s) for -: 'str' and 'float'"
-        # ВАЖНО: Исключаем базовые текстовые колонки из конвертации!
-        for col in calculated_df.columns:
-            if col not in base_text_columns:  # Пропускаем текстовые колонки
-                try:
-                    # Пробуем конвертировать в числовой тип только если колонка не текстовая
-                    calculated_df[col] = pd.to_numeric(calculated_df[col], errors='coerce')
-                except Exception:
-                    pass  # Если не получилось, оставляем как есть
-        
         # РАСШИРЕННОЕ ЛОГИРОВАНИЕ: Проверяем, что данные не пустые
-        if len(calculated_df) > 0:
-            sample_tb = calculated_df["ТБ"].iloc[0] if "ТБ" in calculated_df.columns else None
-            sample_fio = calculated_df["ФИО"].iloc[0] if "ФИО" in calculated_df.columns else None
+        if debug_enabled and len(calculated_df) > 0:
+            sample_tb = calculated_df["ТБ"].iat[0] if "ТБ" in calculated_df.columns else None
+            sample_fio = calculated_df["ФИО"].iat[0] if "ФИО" in calculated_df.columns else None
             # ФИО будет замаскировано в _mask_sensitive_data
             self.logger.debug(f"calculated_df создан из summary_df: {len(calculated_df)} строк x {len(calculated_df.columns)} колонок. Пример: ТБ='{sample_tb}', fio: {sample_fio}", "FileProcessor", "prepare_calculated_data")
             
-            # Проверяем заполненность базовых колонок
-            non_empty_tb = calculated_df["ТБ"].notna() & (calculated_df["ТБ"] != "") if "ТБ" in calculated_df.columns else pd.Series([False] * len(calculated_df))
-            non_empty_fio = calculated_df["ФИО"].notna() & (calculated_df["ФИО"] != "") if "ФИО" in calculated_df.columns else pd.Series([False] * len(calculated_df))
+            # Проверяем заполненность базовых колонок (один проход по ТБ и ФИО)
+            non_empty = self._count_non_empty(calculated_df, ["ТБ", "ФИО"])
             # ФИО будет замаскировано в _mask_sensitive_data
-            self.logger.debug(f"Заполненность базовых колонок в calculated_df: ТБ={non_empty_tb.sum()}/{len(calculated_df)}, fio заполнено={non_empty_fio.sum()}/{len(calculated_df)}", "FileProcessor", "prepare_calculated_data")
+            self.logger.debug(f"Заполненность базовых колонок в calculated_df: ТБ={non_empty['ТБ']}/{len(calculated_df)}, fio заполнено={non_empty['ФИО']}/{len(calculated_df)}", "FileProcessor", "prepare_calculated_data")
         
         # Словарь для переименования колонок
         rename_dict = {}
@@ -3768,33 +4021,74 @@ class FileProcessor:
         
         for group in self.groups:
             if group in self.processed_files:
-                files_sorted = sorted(
-                    self.processed_files[group].keys(),
-                    key=lambda x: extract_month_number(x)
-                )
-                for file_name in files_sorted:
-                    month = extract_month_number(file_name)
+                # ОПТИМИЗАЦИЯ: Номера месяцев берем из общего кэша (один векторный str.extract на группу)
+                month_map = self._get_month_map(list(self.processed_files[group].keys()))
+                files_sorted = sorted(month_map.items(), key=itemgetter(1))
+                for file_name, month in files_sorted:
                     full_name = f"{group}_{file_name}"
                     all_files.append((group, file_name, full_name, month))
         
         # Сортируем по группе и месяцу
         all_files_sorted = sorted(all_files, key=lambda x: (x[0], x[3]))
         
+        # ОПТИМИЗАЦИЯ: Каждую колонку summary_df приводим к числовому массиву ровно один раз -
+        # колонка предыдущего месяца используется повторно без нового pd.to_numeric на каждой итерации
+        # ОПТИМИЗАЦИЯ: Проверки наличия колонок в циклах - по множествам, а не по pandas Index
+        summary_cols = set(summary_df.columns)
+        calculated_cols = set(calculated_df.columns)
+        # ОПТИМИЗАЦИЯ: Уже числовые колонки (prepare_summary_data пишет float64) берем напрямую без разбора строк,
+        # pd.to_numeric вызывается только для нечисловых колонок
+        def to_numeric_array(series: pd.Series) -> np.ndarray:
+            """Возвращает значения колонки как float64-массив (нечисловые и пустые значения - 0)."""
+            if pd.api.types.is_numeric_dtype(series.dtype):
+                values = series.to_numpy(dtype=np.float64)
+                return np.where(np.isnan(values), 0.0, values)
+            return pd.to_numeric(series, errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+        
+        numeric_cache: Dict[str, np.ndarray] = {
+            fname: to_numeric_array(summary_df[fname])
+            for _, _, fname, _ in all_files_sorted
+            if fname in summary_cols
+        }
+        n_rows = len(calculated_df)
+        # ОПТИМИЗАЦИЯ: Результаты расчетов собираем в словарь и записываем в calculated_df одним блоком в конце,
+        # вместо поколоночных присваиваний calculated_df[col] = ...
+        computed_columns: Dict[str, np.ndarray] = {}
+        
+        # Позиция строки для детального логирования (маска строится один раз, а не на каждой итерации)
+        debug_pos = None
+        if DEBUG_TAB_NUMBER and len(DEBUG_TAB_NUMBER) > 0 and "Табельный" in summary_df.columns:
+            debug_positions = np.flatnonzero(self._create_debug_tab_mask(summary_df, "Табельный").to_numpy())
+            if len(debug_positions) > 0:
+                debug_pos = int(debug_positions[0])
+        
+        # ОПТИМИЗАЦИЯ: all_files_sorted отсортирован по группе - разбиваем на группы за один проход
+        files_by_group = {group: list(group_iter) for group, group_iter in groupby(all_files_sorted, key=itemgetter(0))}
+        
         # Для каждой группы обрабатываем файлы по порядку
         for group in self.groups:
-            group_files = [(g, fn, fname, m) for g, fn, fname, m in all_files_sorted if g == group]
+            group_files = files_by_group.get(group, [])
             if not group_files:
                 continue
             
             self.logger.debug(f"Лист 'Расчеты': Обработка группы {group}, файлов: {len(group_files)}", "FileProcessor", "prepare_calculated_data")
             group_config = config_manager.get_group_config(group)
-            
-            for idx, (g, file_name, full_name, month) in enumerate(group_files):
-                if full_name not in calculated_df.columns:
+            # ОПТИМИЗАЦИЯ: Конфигурации файлов группы получаем один раз до цикла
+            file_configs = {fn: config_manager.get_config_for_file(group, fn) for _, fn, _, _ in group_files}
+            
+            # ОПТИМИЗАЦИЯ: Предыдущий и пред-предыдущий файлы группы ведем скользящими ссылками
+            # вместо повторной индексации group_files[idx - 1] / group_files[idx - 2]
+            prev_entry = None  # (group, file_name, full_name, month) предыдущего файла
+            prev2_entry = None  # (group, file_name, full_name, month) пред-предыдущего файла
+            for idx, entry in enumerate(group_files):
+                g, file_name, full_name, month = entry
+                prev1_file, prev2_file = prev_entry, prev2_entry
+                prev2_entry, prev_entry = prev_entry, entry
+                if full_name not in calculated_cols:
                     continue
                 
                 # Получаем конфигурацию для файла
-                file_config = config_manager.get_config_for_file(group, file_name)
+                file_config = file_configs[file_name]
                 calc_type = file_config.get("calculation_type", 1)
                 first_month_val = file_config.get("first_month_value", "self")
                 three_periods_mode = file_config.get("three_periods_first_months", "zero_both")
@@ -3803,149 +4097,147 @@ class FileProcessor:
                 prev_month = None
                 prev2_month = None
                 
-                if calc_type == 2 and idx > 0:
-                    prev_month = group_files[idx - 1][3]
+                if calc_type == 2 and prev1_file is not None:
+                    prev_month = prev1_file[3]
                 elif calc_type == 3:
-                    if idx > 0:
-                        prev_month = group_files[idx - 1][3]
-                    if idx > 1:
-                        prev2_month = group_files[idx - 2][3]
+                    if prev1_file is not None:
+                        prev_month = prev1_file[3]
+                    if prev2_file is not None:
+                        prev2_month = prev2_file[3]
                 
                 # Генерируем понятное имя колонки
                 new_name = generate_column_name(group, month, calc_type, prev_month, prev2_month)
                 rename_dict[full_name] = new_name
                 
                 # Логируем информацию о типе расчета
-                calc_type_names = {1: "Как есть (факт)", 2: "Прирост по 2 месяцам", 3: "Прирост по трем периодам"}
-                calc_desc = calc_type_names.get(calc_type, f"Тип {calc_type}")
-                if calc_type == 2:
-                    if idx == 0:
-                        calc_desc += f", первый месяц: {first_month_val}"
-                    else:
-                        calc_desc += f", M-{month} - M-{prev_month}"
-                elif calc_type == 3:
-                    if idx == 0:
-                        calc_desc += f", режим: {three_periods_mode}"
-                    elif idx == 1:
-                        calc_desc += f", режим: {three_periods_mode}, M-{month} - M-{prev_month}"
-                    else:
-                        calc_desc += f", M-{month} - 2*M-{prev_month} + M-{prev2_month}"
+                # ОПТИМИЗАЦИЯ: Описание собирается только при уровне DEBUG
+                if debug_enabled:
+                    calc_desc = CALC_TYPE_NAMES.get(calc_type, f"Тип {calc_type}")
+                    if calc_type == 2:
+                        if idx == 0:
+                            calc_desc += f", первый месяц: {first_month_val}"
+                        else:
+                            calc_desc += f", M-{month} - M-{prev_month}"
+                    elif calc_type == 3:
+                        if idx == 0:
+                            calc_desc += f", режим: {three_periods_mode}"
+                        elif idx == 1:
+                            calc_desc += f", режим: {three_periods_mode}, M-{month} - M-{prev_month}"
+                        else:
+                            calc_desc += f", M-{month} - 2*M-{prev_month} + M-{prev2_month}"
+                    
+                    self.logger.debug(f"Лист 'Расчеты': Группа {group}, месяц M-{month}, тип расчета: {calc_desc}, колонка: {new_name}", "FileProcessor", "prepare_calculated_data")
                 
-                self.logger.debug(f"Лист 'Расчеты': Группа {group}, месяц M-{month}, тип расчета: {calc_desc}, колонка: {new_name}", "FileProcessor", "prepare_calculated_data")
+                # ОПТИМИЗАЦИЯ: Значения берем из numeric_cache - чистая арифметика numpy без повторного pd.to_numeric
+                curr_val = numeric_cache.get(full_name)
+                if curr_val is None:
+                    curr_val = np.zeros(n_rows, dtype=np.float64)
+                zero_val = np.zeros(n_rows, dtype=np.int64)
                 
                 if calc_type == 1:
                     # Вариант 1: Как есть - просто копируем значение
-                    # ОПТИМИЗАЦИЯ: Конвертируем в числовой тип
-                    calculated_df[full_name] = pd.to_numeric(summary_df[full_name], errors='coerce').fillna(0)
+                    computed_columns[full_name] = curr_val
                 
                 elif calc_type == 2:
                     # Вариант 2: Прирост по 2 месяцам
                     if idx == 0:
                         # Первый месяц
                         if first_month_val == "self":
-                            # ОПТИМИЗАЦИЯ: Конвертируем в числовой тип
-                            calculated_df[full_name] = pd.to_numeric(summary_df[full_name], errors='coerce').fillna(0)
+                            computed_columns[full_name] = curr_val
                         else:  # "zero"
-                            calculated_df[full_name] = 0
+                            computed_columns[full_name] = zero_val
                     else:
                         # Текущий месяц минус предыдущий
-                        prev_file_name = group_files[idx - 1][2]
-                        if prev_file_name in summary_df.columns:
-                            # ОПТИМИЗАЦИЯ: Конвертируем в числовой тип перед вычислением
-                            curr_val = pd.to_numeric(summary_df[full_name], errors='coerce').fillna(0)
-                            prev_val = pd.to_numeric(summary_df[prev_file_name], errors='coerce').fillna(0)
-                            calculated_df[full_name] = curr_val - prev_val
+                        prev_val = numeric_cache.get(prev1_file[2])
+                        if prev_val is not None:
+                            computed_columns[full_name] = curr_val - prev_val
                             
                             # ДЕТАЛЬНОЕ ЛОГИРОВАНИЕ: Логируем расчет для указанного табельного
-                            if DEBUG_TAB_NUMBER and len(DEBUG_TAB_NUMBER) > 0 and "Табельный" in summary_df.columns:
-                                debug_mask = self._create_debug_tab_mask(summary_df, "Табельный")
-                                if debug_mask.any():
-                                    debug_idx = summary_df[debug_mask].index[0]
-                                    curr_val_debug = curr_val.loc[debug_idx] if debug_idx in curr_val.index else 0
-                                    prev_val_debug = prev_val.loc[debug_idx] if debug_idx in prev_val.index else 0
-                                    result_debug = calculated_df.loc[debug_idx, full_name] if debug_idx in calculated_df.index else 0
-                                    
-                                    self.logger.debug_tab(
-                                        f"Расчет типа 2 для группы {group}, месяц M-{month}: "
-                                        f"текущее значение (M-{month})={curr_val_debug}, "
-                                        f"предыдущее значение (M-{prev_month})={prev_val_debug}, "
-                                        f"результат (прирост)={result_debug}",
-                                        tab_number=None,  # Проверка уже сделана через debug_mask
-                                        class_name="FileProcessor",
-                                        func_name="prepare_calculated_data"
-                                    )
+                            if debug_pos is not None:
+                                self.logger.debug_tab(
+                                    f"Расчет типа 2 для группы {group}, месяц M-{month}: "
+                                    f"текущее значение (M-{month})={curr_val[debug_pos]}, "
+                                    f"предыдущее значение (M-{prev_month})={prev_val[debug_pos]}, "
+                                    f"результат (прирост)={computed_columns[full_name][debug_pos]}",
+                                    tab_number=None,  # Проверка уже сделана через debug_mask
+                                    class_name="FileProcessor",
+                                    func_name="prepare_calculated_data"
+                                )
                         else:
-                            calculated_df[full_name] = pd.to_numeric(summary_df[full_name], errors='coerce').fillna(0)
+                            computed_columns[full_name] = curr_val
                 
                 elif calc_type == 3:
                     # Вариант 3: Прирост по трем периодам (М-3 - 2*М-2 + М-1)
                     if idx == 0:
                         # Первый месяц
                         if three_periods_mode == "self_first_diff_second":
-                            # ОПТИМИЗАЦИЯ: Конвертируем в числовой тип
-                            calculated_df[full_name] = pd.to_numeric(summary_df[full_name], errors='coerce').fillna(0)
+                            computed_columns[full_name] = curr_val
                         else:  # "zero_both" или "zero_first_diff_second"
-                            calculated_df[full_name] = 0
+                            computed_columns[full_name] = zero_val
                     elif idx == 1:
                         # Второй месяц
                         if three_periods_mode == "zero_both":
-                            calculated_df[full_name] = 0
+                            computed_columns[full_name] = zero_val
                         else:  # "zero_first_diff_second" или "self_first_diff_second"
-                            prev_file_name = group_files[0][2]
-                            if prev_file_name in summary_df.columns:
-                                # ОПТИМИЗАЦИЯ: Конвертируем в числовой тип перед вычислением
-                                curr_val = pd.to_numeric(summary_df[full_name], errors='coerce').fillna(0)
-                                prev_val = pd.to_numeric(summary_df[prev_file_name], errors='coerce').fillna(0)
-                                calculated_df[full_name] = curr_val - prev_val
+                            prev_val = numeric_cache.get(prev1_file[2])
+                            if prev_val is not None:
+                                computed_columns[full_name] = curr_val - prev_val
                             else:
-                                calculated_df[full_name] = pd.to_numeric(summary_df[full_name], errors='coerce').fillna(0)
+                                computed_columns[full_name] = curr_val
                     else:
                         # М-3 - 2*М-2 + М-1
-                        # ОПТИМИЗАЦИЯ: Конвертируем в числовой тип перед вычислением
-                        curr_val = pd.to_numeric(summary_df[full_name], errors='coerce').fillna(0)
-                        prev1_file_name = group_files[idx - 1][2]
-                        prev2_file_name = group_files[idx - 2][2]
-                        
-                        if prev1_file_name in summary_df.columns:
-                            prev1_val = pd.to_numeric(summary_df[prev1_file_name], errors='coerce').fillna(0)
+                        prev1_val = numeric_cache.get(prev1_file[2], 0)
+                        prev2_val = numeric_cache.get(prev2_file[2], 0)
+                        # ОПТИМИЗАЦИЯ: Результат пишется в заранее выделенный массив без промежуточного 2 * prev1:
+                        # numba-ядро для больших данных, иначе - numpy-операции с out=
+                        three_period_val = np.empty_like(curr_val)
+                        both_prev_known = isinstance(prev1_val, np.ndarray) and isinstance(prev2_val, np.ndarray)
+                        if NUMBA_AVAILABLE and both_prev_known and n_rows > NUMBA_MIN_ROWS:
+                            _three_period_diff_numba(curr_val, prev1_val, prev2_val, three_period_val)
                         else:
-                            prev1_val = 0
-                        
-                        if prev2_file_name in summary_df.columns:
-                            prev2_val = pd.to_numeric(summary_df[prev2_file_name], errors='coerce').fillna(0)
-                        else:
-                            prev2_val = 0
-                        
-                        calculated_df[full_name] = curr_val - 2 * prev1_val + prev2_val
+                            np.multiply(prev1_val, -2.0, out=three_period_val)
+                            three_period_val += curr_val
+                            three_period_val += prev2_val
+                        computed_columns[full_name] = three_period_val
                         
                         # ДЕТАЛЬНОЕ ЛОГИРОВАНИЕ: Логируем расчет для указанного табельного
-                        if DEBUG_TAB_NUMBER and "Табельный" in summary_df.columns:
-                            debug_mask = self._create_debug_tab_mask(summary_df, "Табельный")
-                            if debug_mask.any():
-                                debug_idx = summary_df[debug_mask].index[0]
-                                curr_val_debug = curr_val.loc[debug_idx] if debug_idx in curr_val.index else 0
-                                prev1_val_debug = prev1_val.loc[debug_idx] if debug_idx in prev1_val.index else 0
-                                prev2_val_debug = prev2_val.loc[debug_idx] if debug_idx in prev2_val.index else 0
-                                result_debug = calculated_df.loc[debug_idx, full_name] if debug_idx in calculated_df.index else 0
-                                
-                                # Получаем табельный номер из calculated_df для этого индекса
-                                tab_num_value = calculated_df.loc[debug_idx, "Табельный"] if "Табельный" in calculated_df.columns else None
-                                self.logger.debug_tab(
-                                    f"Расчет типа 3 для группы {group}, месяц M-{month}: "
-                                    f"текущее значение (M-{month})={curr_val_debug}, "
-                                    f"предыдущее значение (M-{prev_month})={prev1_val_debug}, "
-                                    f"пред-предыдущее значение (M-{prev2_month})={prev2_val_debug}, "
-                                    f"результат (M-{month} - 2*M-{prev_month} + M-{prev2_month})={result_debug}",
-                                    tab_number=tab_num_value,
-                                    class_name="FileProcessor",
-                                    func_name="prepare_calculated_data"
-                                )
+                        if debug_pos is not None:
+                            prev1_val_debug = prev1_val[debug_pos] if isinstance(prev1_val, np.ndarray) else prev1_val
+                            prev2_val_debug = prev2_val[debug_pos] if isinstance(prev2_val, np.ndarray) else prev2_val
+                            # Получаем табельный номер из calculated_df для этой строки
+                            tab_num_value = calculated_df["Табельный"].iat[debug_pos] if "Табельный" in calculated_df.columns else None
+                            self.logger.debug_tab(
+                                f"Расчет типа 3 для группы {group}, месяц M-{month}: "
+                                f"текущее значение (M-{month})={curr_val[debug_pos]}, "
+                                f"предыдущее значение (M-{prev_month})={prev1_val_debug}, "
+                                f"пред-предыдущее значение (M-{prev2_month})={prev2_val_debug}, "
+                                f"результат (M-{month} - 2*M-{prev_month} + M-{prev2_month})={computed_columns[full_name][debug_pos]}",
+                                tab_number=tab_num_value,
+                                class_name="FileProcessor",
+                                func_name="prepare_calculated_data"
+                            )
+        
+        # ОПТИМИЗАЦИЯ: Записываем все рассчитанные колонки одним блоком (один concat вместо N присваиваний).
+        # Понятные имена присваиваются блоку расчетов до concat, поэтому базовые колонки не затрагиваются
+        renamed_in_block = 0
+        if computed_columns:
+            calc_block = pd.DataFrame(computed_columns, index=calculated_df.index, copy=False)
+            block_rename_dict = {k: v for k, v in rename_dict.items() if k in computed_columns and k not in base_columns}
+            calc_block.rename(columns=block_rename_dict, inplace=True)
+            renamed_in_block = len(block_rename_dict)
+            column_order = [block_rename_dict.get(col, col) for col in calculated_df.columns]
+            calculated_df = pd.concat(
+                [calculated_df.drop(columns=list(computed_columns)), calc_block],
+                axis=1,
+                copy=False
+            )[column_order]
         
         # Переименовываем колонки на понятные имена (только те, которые существуют в DataFrame)
         # ВАЖНО: Исключаем базовые колонки из переименования
         existing_rename_dict = {k: v for k, v in rename_dict.items() if k in calculated_df.columns and k not in base_columns}
-        calculated_df = calculated_df.rename(columns=existing_rename_dict)
-        self.logger.debug(f"Лист 'Расчеты': Переименовано колонок: {len(existing_rename_dict)}", "FileProcessor", "prepare_calculated_data")
+        if existing_rename_dict:
+            calculated_df = calculated_df.rename(columns=existing_rename_dict)
+        self.logger.debug(f"Лист 'Расчеты': Переименовано колонок: {renamed_in_block + len(existing_rename_dict)}", "FileProcessor", "prepare_calculated_data")
         
         # ВАЖНО: Проверяем, что базовые колонки не потерялись после переименования
         if not all(col in calculated_df.columns for col in base_columns):
@@ -3956,17 +4248,16 @@ class FileProcessor:
             self.logger.debug(f"Проверка после переименования: все базовые колонки присутствуют в calculated_df", "FileProcessor", "prepare_calculated_data")
         
         # РАСШИРЕННОЕ ЛОГИРОВАНИЕ: Проверяем, что данные не пустые
-        if len(calculated_df) > 0:
-            sample_tb = calculated_df["ТБ"].iloc[0] if "ТБ" in calculated_df.columns else None
-            sample_fio = calculated_df["ФИО"].iloc[0] if "ФИО" in calculated_df.columns else None
+        if debug_enabled and len(calculated_df) > 0:
+            sample_tb = calculated_df["ТБ"].iat[0] if "ТБ" in calculated_df.columns else None
+            sample_fio = calculated_df["ФИО"].iat[0] if "ФИО" in calculated_df.columns else None
             # ФИО будет замаскировано в _mask_sensitive_data
             self.logger.debug(f"calculated_df после переименования: {len(calculated_df)} строк x {len(calculated_df.columns)} колонок. Пример: ТБ='{sample_tb}', fio: {sample_fio}", "FileProcessor", "prepare_calculated_data")
             
-            # Проверяем заполненность базовых колонок после переименования
-            non_empty_tb = calculated_df["ТБ"].notna() & (calculated_df["ТБ"] != "") if "ТБ" in calculated_df.columns else pd.Series([False] * len(calculated_df))
-            non_empty_fio = calculated_df["ФИО"].notna() & (calculated_df["ФИО"] != "") if "ФИО" in calculated_df.columns else pd.Series([False] * len(calculated_df))
+            # Проверяем заполненность базовых колонок после переименования (один проход по ТБ и ФИО)
+            non_empty = self._count_non_empty(calculated_df, ["ТБ", "ФИО"])
             # ФИО будет замаскировано в _mask_sensitive_data
-            self.logger.debug(f"Заполненность базовых колонок после переименования: ТБ={non_empty_tb.sum()}/{len(calculated_df)}, fio заполнено={non_empty_fio.sum()}/{len(calculated_df)}", "FileProcessor", "prepare_calculated_data")
+            self.logger.debug(f"Заполненность базовых колонок после переименования: ТБ={non_empty['ТБ']}/{len(calculated_df)}, fio заполнено={non_empty['ФИО']}/{len(calculated_df)}", "FileProcessor", "prepare_calculated_data")
         
         # НЕ рассчитываем вертикальные ранги (убрано для варианта 3)
         # calculated_df = self._calculate_ranks(calculated_df, all_files_sorted, config_manager)
@@ -3976,7 +4267,7 @@ class FileProcessor:
 
         return calculated_df
     
-    def _normalize_group(self, group_name: str, direction: str, month_data: Dict[int, Dict[str, str]], calculated_df: pd.DataFrame) -> Dict[str, pd.Series]:
+    def _normalize_group(self, group_name: str, direction: str, month_data: Dict[int, Dict[str, str]], calculated_df: pd.DataFrame) -> Tuple[List[str], np.ndarray]:
         """
         Нормализует показатели для одной группы (OD, RA или PS).
         
@@ -3987,13 +4278,18 @@ class FileProcessor:
             calculated_df: DataFrame с расчетными данными
         
         Returns:
-            Словарь {norm_col_name: normalized_series} с нормализованными значениями
+            Tuple[список имен нормализованных колонок, матрица значений (N КМ x M месяцев)]
+            Строки матрицы идут в порядке строк calculated_df
         """
+        # ОПТИМИЗАЦИЯ: Уровень DEBUG проверяем один раз для всех месяцев группы
+        debug_enabled = self.logger.is_debug_enabled()
+        
         # Собираем все колонки для данного показателя
         group_cols = {}
+        calculated_cols = set(calculated_df.columns)  # ОПТИМИЗАЦИЯ: Проверка наличия колонок по множеству
         for month in sorted(month_data.keys()):
             col = month_data[month].get(group_name)
-            if col and col in calculated_df.columns:
+            if col and col in calculated_cols:
                 group_cols[month] = col
             else:
                 if col:
@@ -4001,108 +4297,95 @@ class FileProcessor:
         
         if not group_cols:
             self.logger.warning(f"Группа {group_name}: не найдено ни одной колонки для нормализации. month_data содержит: {month_data}", "FileProcessor", "_normalize_group")
-            return {}
+            return [], np.empty((len(calculated_df), 0), dtype=SCORE_FLOAT_DTYPE)
         
         self.logger.debug(f"Группа {group_name}: найдено {len(group_cols)} колонок для нормализации: {list(group_cols.values())[:5]}...", "FileProcessor", "_normalize_group")
         
-        normalized_cols = {}
+        months_sorted = sorted(group_cols.keys())
         
-        # ОПТИМИЗАЦИЯ: Создаем временный DataFrame с данными показателя
-        group_data = pd.DataFrame(index=calculated_df.index)
-        for month, col in group_cols.items():
-            # Используем fillna(0) только для расчета, но сохраняем NaN для проверки
-            group_data[f"M-{month}"] = calculated_df[col]
+        # ОПТИМИЗАЦИЯ: Данные показателя берем одной матрицей numpy (N КМ x M месяцев) и нормализуем
+        # все месяцы одной операцией с broadcast вместо цепочек .where по Series для каждого месяца
+        # NaN сохраняются - они не участвуют в min/max и в подсчете месяцев с данными
+        # Тип чисел задается SCORE_FLOAT_DTYPE (float32 вдвое уменьшает объем данных в последующих операциях)
+        group_values = calculated_df[[group_cols[month] for month in months_sorted]].to_numpy(dtype=SCORE_FLOAT_DTYPE)
         
         # Нормализуем для каждого КМ (горизонтально по месяцам)
-        # Для каждого КМ находим min и max по месяцам (игнорируя NaN)
-        group_min = group_data.min(axis=1, skipna=True)
-        group_max = group_data.max(axis=1, skipna=True)
+        # Для каждого КМ находим min и max по месяцам (игнорируя NaN; fmin/fmax не выдают предупреждений для строк из одних NaN)
+        group_min = np.fmin.reduce(group_values, axis=1, keepdims=True)
+        group_max = np.fmax.reduce(group_values, axis=1, keepdims=True)
         group_range = group_max - group_min
         
         # ОПТИМИЗАЦИЯ: Обрабатываем деление на ноль и одинаковые значения
         # Проверяем количество месяцев с данными (не NaN и не 0) для каждого КМ
-        non_zero_count = (group_data.notna() & (group_data != 0)).sum(axis=1)
-        mask_zero_range = (group_range < 1e-10) | group_range.isna()  # Все значения одинаковы или разница очень мала или все NaN
+        non_zero_count = (~np.isnan(group_values) & (group_values != 0)).sum(axis=1, keepdims=True)
+        mask_zero_range = (group_range < 1e-10) | np.isnan(group_range)  # Все значения одинаковы или разница очень мала или все NaN
         mask_single_month = non_zero_count <= 1  # Только один месяц с данными или все нули/NaN
         
         # Защита от деления на ноль: заменяем нули в group_range на 1
-        group_range_safe = group_range.where(~mask_zero_range, 1.0)
-        
-        # Нормализуем
-        for month in sorted(group_cols.keys()):
-            norm_col_name = f"{group_name}_norm (M-{month})"
-            col_data = group_data[f"M-{month}"]
-            
-            # ОПТИМИЗАЦИЯ: Векторизованная нормализация с обработкой edge cases
-            if direction == "MAX":
-                # Больше = лучше: нормализуем к [0, 1]
-                normalized = (col_data - group_min) / group_range_safe
-            else:  # direction == "MIN"
-                # Меньше = лучше: инвертируем нормализацию
-                normalized = (group_max - col_data) / group_range_safe
-            
-            # Обрабатываем edge cases (векторизованно)
-            # ВАЖНО: Сначала обрабатываем случай "только один месяц с данными", 
-            # затем случай "все значения одинаковы"
-            
-            # Случай 1: Только один месяц с данными (не нулями)
-            # Месяц с данными получает 1.0, остальные (нули) получают 0.0
-            if direction == "MAX":
-                # Для MAX: месяц с максимальным значением (ненулевым) = 1.0, остальные = 0.0
-                # Проверяем, является ли текущий месяц максимальным и ненулевым
-                is_max_and_nonzero = (col_data == group_max) & (col_data != 0) & (non_zero_count == 1)
-                # Для КМ с одним месяцем данных: сначала всем 0, затем максимуму 1.0
-                normalized = normalized.where(~mask_single_month, 0.0)  # Сначала всем 0
-                normalized = normalized.where(~is_max_and_nonzero, 1.0)  # Затем максимуму 1.0
-            else:  # direction == "MIN"
-                # Для MIN: месяц с минимальным значением (ненулевым) = 1.0, остальные = 0.0
-                # Проверяем, является ли текущий месяц минимальным ненулевым
-                is_min_and_nonzero = (col_data == group_min) & (col_data != 0) & (non_zero_count == 1)
-                # Для КМ с одним месяцем данных: сначала всем 0, затем минимуму 1.0
-                normalized = normalized.where(~mask_single_month, 0.0)  # Сначала всем 0
-                normalized = normalized.where(~is_min_and_nonzero, 1.0)  # Затем минимуму 1.0
-            
-            # Случай 2: Все значения одинаковы (включая все нули) - всем 0.5
-            # Это применяется только если НЕ случай "один месяц с данными"
-            # (mask_zero_range может быть True и для случая "один месяц", поэтому проверяем ~mask_single_month)
-            mask_all_same_not_single = mask_zero_range & ~mask_single_month
-            normalized = normalized.where(~mask_all_same_not_single, 0.5)
-            
-            # Защита от выхода за границы [0, 1] (из-за погрешности вычислений)
-            normalized = normalized.clip(0.0, 1.0)
-            
-            # ВАЖНО: Убеждаемся, что normalized имеет правильный индекс (из calculated_df)
-            if normalized.index is None or len(normalized.index) == 0:
-                self.logger.error(f"Группа {group_name}, месяц {month}: normalized Series имеет пустой индекс!", "FileProcessor", "_normalize_group")
-                continue
-            
-            normalized_cols[norm_col_name] = normalized
-            self.logger.debug(f"Группа {group_name}, месяц {month}: создана нормализованная колонка {norm_col_name} (длина: {len(normalized)}, индекс: {list(normalized.index)[:3]}...)", "FileProcessor", "_normalize_group")
+        group_range_safe = np.where(mask_zero_range, 1.0, group_range)
+        
+        # ОПТИМИЗАЦИЯ: Векторизованная нормализация с обработкой edge cases сразу для всех месяцев
+        if direction == "MAX":
+            # Больше = лучше: нормализуем к [0, 1]
+            normalized_matrix = (group_values - group_min) / group_range_safe
+            # Месяц с максимальным значением (ненулевым) у КМ с одним месяцем данных
+            is_extreme_and_nonzero = (group_values == group_max) & (group_values != 0) & (non_zero_count == 1)
+        else:  # direction == "MIN"
+            # Меньше = лучше: инвертируем нормализацию
+            normalized_matrix = (group_max - group_values) / group_range_safe
+            # Месяц с минимальным значением (ненулевым) у КМ с одним месяцем данных
+            is_extreme_and_nonzero = (group_values == group_min) & (group_values != 0) & (non_zero_count == 1)
+        
+        # Обрабатываем edge cases (векторизованно)
+        # Случай 1: Только один месяц с данными (не нулями) - месяц с данными получает 1.0, остальные (нули) - 0.0
+        # Случай 2: Все значения одинаковы (включая все нули) - всем 0.5
+        # Случай 2 применяется только если НЕ случай "один месяц с данными"
+        # (mask_zero_range может быть True и для случая "один месяц", поэтому проверяем ~mask_single_month)
+        # ОПТИМИЗАЦИЯ: Все случаи обрабатываются одним np.select (один проход вместо цепочки np.where);
+        # условия проверяются по порядку, поэтому экстремум (подмножество случая 1) стоит первым
+        mask_all_same_not_single = mask_zero_range & ~mask_single_month
+        normalized_matrix = np.select(
+            [
+                is_extreme_and_nonzero,
+                np.broadcast_to(mask_single_month, normalized_matrix.shape),
+                np.broadcast_to(mask_all_same_not_single, normalized_matrix.shape)
+            ],
+            [1.0, 0.0, 0.5],
+            default=normalized_matrix
+        ).astype(normalized_matrix.dtype, copy=False)
+        
+        # Защита от выхода за границы [0, 1] (из-за погрешности вычислений)
+        np.clip(normalized_matrix, 0.0, 1.0, out=normalized_matrix)
+        
+        # Позиция строки для детального логирования (маска строится один раз для всех месяцев)
+        debug_pos = None
+        if DEBUG_TAB_NUMBER and len(DEBUG_TAB_NUMBER) > 0 and "Табельный" in calculated_df.columns:
+            debug_positions = np.flatnonzero(self._create_debug_tab_mask(calculated_df, "Табельный").to_numpy())
+            if len(debug_positions) > 0:
+                debug_pos = int(debug_positions[0])
+        
+        # ОПТИМИЗАЦИЯ: Возвращаем имена колонок и матрицу целиком - без обертки каждого месяца в Series
+        norm_col_names = [f"{group_name}_norm (M-{month})" for month in months_sorted]
+        for month_idx, month in enumerate(months_sorted):
+            norm_col_name = norm_col_names[month_idx]
+            if debug_enabled:
+                self.logger.debug(f"Группа {group_name}, месяц {month}: создана нормализованная колонка {norm_col_name} (длина: {normalized_matrix.shape[0]})", "FileProcessor", "_normalize_group")
             
             # ДЕТАЛЬНОЕ ЛОГИРОВАНИЕ: Логируем нормализацию для указанного табельного
-            if DEBUG_TAB_NUMBER and len(DEBUG_TAB_NUMBER) > 0 and "Табельный" in calculated_df.columns:
-                debug_mask = self._create_debug_tab_mask(calculated_df, "Табельный")
-                if debug_mask.any():
-                    debug_idx = calculated_df[debug_mask].index[0]
-                    col = group_cols[month]
-                    original_value = calculated_df.loc[debug_idx, col] if col in calculated_df.columns else None
-                    normalized_value = normalized.loc[debug_idx] if debug_idx in normalized.index else None
-                    min_val = group_min.loc[debug_idx] if debug_idx in group_min.index else None
-                    max_val = group_max.loc[debug_idx] if debug_idx in group_max.index else None
-                    
-                    # Получаем табельный номер из calculated_df для этого индекса
-                    tab_num_value = calculated_df.loc[debug_idx, "Табельный"] if "Табельный" in calculated_df.columns else None
-                    self.logger.debug_tab(
-                        f"Нормализация показателя {group_name} для месяца M-{month}: "
-                        f"исходное значение={original_value}, нормализованное={normalized_value}, "
-                        f"min={min_val}, max={max_val}, направление={direction}",
-                        tab_number=tab_num_value,
-                        class_name="FileProcessor",
-                    func_name="_normalize_group"
-                )
+            if debug_pos is not None:
+                # Получаем табельный номер из calculated_df для этой строки
+                tab_num_value = calculated_df["Табельный"].iat[debug_pos]
+                self.logger.debug_tab(
+                    f"Нормализация показателя {group_name} для месяца M-{month}: "
+                    f"исходное значение={group_values[debug_pos, month_idx]}, нормализованное={normalized_matrix[debug_pos, month_idx]}, "
+                    f"min={group_min[debug_pos, 0]}, max={group_max[debug_pos, 0]}, направление={direction}",
+                    tab_number=tab_num_value,
+                    class_name="FileProcessor",
+                    func_name="_normalize_group"
+                )
         
-        self.logger.debug(f"Группа {group_name}: возвращаем {len(normalized_cols)} нормализованных колонок: {list(normalized_cols.keys())}", "FileProcessor", "_normalize_group")
-        return normalized_cols
+        self.logger.debug(f"Группа {group_name}: возвращаем {len(norm_col_names)} нормализованных колонок: {norm_col_names}", "FileProcessor", "_normalize_group")
+        return norm_col_names, normalized_matrix
     
     def _normalize_indicators(self, calculated_df: pd.DataFrame, config_manager) -> pd.DataFrame:
         """
@@ -4119,6 +4402,9 @@ class FileProcessor:
         """
         self.logger.info("=== Начало нормализации показателей (вариант 3) ===", "FileProcessor", "_normalize_indicators")
         
+        # ОПТИМИЗАЦИЯ: Уровень DEBUG проверяем один раз - диагностические проходы по данным выполняются только при нем
+        debug_enabled = self.logger.is_debug_enabled()
+        
         # Базовые колонки
         base_columns = ["Табельный", "ТБ", "ФИО"]
         
@@ -4129,13 +4415,14 @@ class FileProcessor:
         all_cols = list(calculated_df.columns)
         self.logger.debug(f"Всего колонок в calculated_df: {len(all_cols)}. Первые 20: {all_cols[:20]}", "FileProcessor", "_normalize_indicators")
         
+        unmatched_cols: List[str] = []  # Колонки, не подходящие под паттерн нормализации
         for col in calculated_df.columns:
             if col in base_columns:
                 continue
             
             # Ищем паттерн: группа (M-номер) с возможными дополнительными символами после
             # Формат может быть: "OD (M-1)", "OD (M-1) [факт]", "OD (M-2) [M-2→M-1]" и т.д.
-            match = re.search(r'^([A-Z]+)\s+\(M-(\d{1,2})\)', col)
+            match = _COL_RE.match(col)
             if match:
                 group = match.group(1)
                 month = int(match.group(2))
@@ -4143,11 +4430,16 @@ class FileProcessor:
                 if month not in month_data:
                     month_data[month] = {}
                 month_data[month][group] = col
-                self.logger.debug(f"Найдена колонка для нормализации: {col} -> группа={group}, месяц={month}", "FileProcessor", "_normalize_indicators")
+                if debug_enabled:
+                    self.logger.debug(f"Найдена колонка для нормализации: {col} -> группа={group}, месяц={month}", "FileProcessor", "_normalize_indicators")
             else:
-                # Логируем колонки, которые не подходят под паттерн (только первые 10 для экономии места)
-                if len([c for c in calculated_df.columns if c not in base_columns and not re.search(r'^([A-Z]+)\s+\(M-(\d{1,2})\)', c)]) <= 10:
-                    self.logger.debug(f"Колонка '{col}' не подходит под паттерн нормализации (ожидается формат 'ГРУППА (M-номер)')", "FileProcessor", "_normalize_indicators")
+                unmatched_cols.append(col)
+        
+        # Логируем колонки, которые не подходят под паттерн (только если их не больше 10 для экономии места)
+        # ОПТИМИЗАЦИЯ: Список несовпавших колонок собирается за один проход, а не пересчитывается для каждой колонки
+        if debug_enabled and len(unmatched_cols) <= 10:
+            for col in unmatched_cols:
+                self.logger.debug(f"Колонка '{col}' не подходит под паттерн нормализации (ожидается формат 'ГРУППА (M-номер)')", "FileProcessor", "_normalize_indicators")
         
         # Логируем результат парсинга
         if month_data:
@@ -4164,7 +4456,8 @@ class FileProcessor:
         
         # ВАЖНО: НЕ сбрасываем индекс, чтобы индексы совпадали с calculated_df при присваивании
         # Это критично для правильного присваивания нормализованных значений
-        normalized_df = calculated_df[base_columns].copy()
+        # ОПТИМИЗАЦИЯ: Базовые колонки без копирования данных (индекс сохраняется)
+        normalized_df = self._make_base_frame(calculated_df, base_columns, index=calculated_df.index)
         
         # РАСШИРЕННОЕ ЛОГИРОВАНИЕ: Проверяем, что базовые колонки скопированы правильно
         if not all(col in normalized_df.columns for col in base_columns):
@@ -4175,17 +4468,17 @@ class FileProcessor:
             self.logger.debug(f"Проверка normalized_df: все базовые колонки присутствуют после копирования", "FileProcessor", "_normalize_indicators")
         
         # ВАЖНО: Проверяем, что данные не пустые
-        if len(normalized_df) > 0:
-            sample_tb = normalized_df["ТБ"].iloc[0] if "ТБ" in normalized_df.columns else None
-            sample_fio = normalized_df["ФИО"].iloc[0] if "ФИО" in normalized_df.columns else None
+        # ОПТИМИЗАЦИЯ: Диагностика только при уровне DEBUG, заполненность ТБ и ФИО - одним проходом
+        if debug_enabled and len(normalized_df) > 0:
+            sample_tb = normalized_df["ТБ"].iat[0] if "ТБ" in normalized_df.columns else None
+            sample_fio = normalized_df["ФИО"].iat[0] if "ФИО" in normalized_df.columns else None
             # ФИО будет замаскировано в _mask_sensitive_data
             self.logger.debug(f"normalized_df создан: {len(normalized_df)} строк x {len(normalized_df.columns)} колонок. Пример: ТБ='{sample_tb}', fio: {sample_fio}", "FileProcessor", "_normalize_indicators")
             
             # Проверяем заполненность базовых колонок
-            non_empty_tb = normalized_df["ТБ"].notna() & (normalized_df["ТБ"] != "") if "ТБ" in normalized_df.columns else pd.Series([False] * len(normalized_df))
-            non_empty_fio = normalized_df["ФИО"].notna() & (normalized_df["ФИО"] != "") if "ФИО" in normalized_df.columns else pd.Series([False] * len(normalized_df))
+            non_empty = self._count_non_empty(normalized_df, ["ТБ", "ФИО"])
             # ФИО будет замаскировано в _mask_sensitive_data
-            self.logger.debug(f"Заполненность базовых колонок в normalized_df: ТБ={non_empty_tb.sum()}/{len(normalized_df)}, fio заполнено={non_empty_fio.sum()}/{len(normalized_df)}", "FileProcessor", "_normalize_indicators")
+            self.logger.debug(f"Заполненность базовых колонок в normalized_df: ТБ={non_empty['ТБ']}/{len(normalized_df)}, fio заполнено={non_empty['ФИО']}/{len(normalized_df)}", "FileProcessor", "_normalize_indicators")
         
         # Получаем направления для каждого показателя
         od_config = config_manager.get_group_config("OD").defaults if "OD" in config_manager.groups else None
@@ -4205,40 +4498,27 @@ class FileProcessor:
             self.logger.error("КРИТИЧЕСКАЯ ОШИБКА: month_data пустой! Не найдено ни одной колонки для нормализации. Проверьте формат колонок в calculated_df.", "FileProcessor", "_normalize_indicators")
             return normalized_df
         
+        group_frames: Dict[str, pd.DataFrame] = {}  # Блоки нормализованных колонок по группам
+        group_names = ["OD", "RA", "PS"]
         with ThreadPoolExecutor(max_workers=3) as executor:
             futures = {
                 executor.submit(self._normalize_group, group_name, direction, month_data, calculated_df): group_name
-                for group_name, direction in [("OD", od_direction), ("RA", ra_direction), ("PS", ps_direction)]
+                for group_name, direction in zip(group_names, [od_direction, ra_direction, ps_direction])
             }
             
             # Обрабатываем результаты по мере завершения
             for future in as_completed(futures):
                 group_name = futures[future]
                 try:
-                    normalized_cols = future.result()
-                    self.logger.debug(f"Группа {group_name}: получено {len(normalized_cols)} нормализованных колонок: {list(normalized_cols.keys())[:5] if normalized_cols else 'пусто'}...", "FileProcessor", "_normalize_indicators")
+                    norm_col_names, normalized_matrix = future.result()
+                    self.logger.debug(f"Группа {group_name}: получено {len(norm_col_names)} нормализованных колонок: {norm_col_names[:5] if norm_col_names else 'пусто'}...", "FileProcessor", "_normalize_indicators")
                     
                     # Добавляем нормализованные колонки в normalized_df
-                    if normalized_cols:
-                        for norm_col_name, normalized in normalized_cols.items():
-                            # ВАЖНО: Убеждаемся, что индексы совпадают при присваивании
-                            # normalized - это Series с индексами из calculated_df.index
-                            # normalized_df имеет те же индексы (так как создан как копия calculated_df[base_columns])
-                            # Проверяем совпадение индексов
-                            indices_match = list(normalized.index) == list(normalized_df.index)
-                            if indices_match:
-                                # Индексы совпадают - простое присваивание
-                                normalized_df[norm_col_name] = normalized
-                                self.logger.debug(f"Добавлена колонка {norm_col_name} в normalized_df (простое присваивание, индексы совпадают)", "FileProcessor", "_normalize_indicators")
-                            else:
-                                # Индексы не совпадают - используем loc с индексами
-                                # Выравниваем по общим индексам
-                                common_indices = normalized.index.intersection(normalized_df.index)
-                                if len(common_indices) > 0:
-                                    normalized_df.loc[common_indices, norm_col_name] = normalized.loc[common_indices]
-                                    self.logger.debug(f"Добавлена колонка {norm_col_name} в normalized_df (loc с индексами, общих индексов: {len(common_indices)})", "FileProcessor", "_normalize_indicators")
-                                else:
-                                    self.logger.error(f"Группа {group_name}, колонка {norm_col_name}: нет общих индексов! normalized.index: {list(normalized.index)[:5]}, normalized_df.index: {list(normalized_df.index)[:5]}", "FileProcessor", "_normalize_indicators")
+                    # ОПТИМИЗАЦИЯ: Матрица группы становится одним блоком DataFrame без копирования;
+                    # строки матрицы идут в порядке calculated_df, а normalized_df имеет тот же индекс
+                    if norm_col_names:
+                        group_frames[group_name] = pd.DataFrame(normalized_matrix, columns=norm_col_names, index=normalized_df.index, copy=False)
+                        self.logger.debug(f"Группа {group_name}: добавлено {len(norm_col_names)} колонок в normalized_df", "FileProcessor", "_normalize_indicators")
                     else:
                         self.logger.warning(f"Группа {group_name}: normalized_cols пустой! Колонки не были созданы. Проверьте логи выше для диагностики.", "FileProcessor", "_normalize_indicators")
                 except Exception as e:
@@ -4246,6 +4526,14 @@ class FileProcessor:
                     import traceback
                     self.logger.error(f"Трассировка ошибки: {traceback.format_exc()}", "FileProcessor", "_normalize_indicators")
         
+        # Блоки добавляются в фиксированном порядке групп (OD, RA, PS), независимо от порядка завершения потоков
+        if group_frames:
+            normalized_df = pd.concat(
+                [normalized_df] + [group_frames[group_name] for group_name in group_names if group_name in group_frames],
+                axis=1,
+                copy=False
+            )
+        
         # ВАЖНО: Проверяем нормализованные колонки ПЕРЕД reset_index
         norm_cols_before_reset = [col for col in normalized_df.columns if col not in base_columns]
         self.logger.debug(f"Нормализованные колонки ПЕРЕД reset_index: {len(norm_cols_before_reset)} колонок. Первые 10: {norm_cols_before_reset[:10]}", "FileProcessor", "_normalize_indicators")
@@ -4255,10 +4543,11 @@ class FileProcessor:
         
         # ВАЖНО: Финальная проверка перед возвратом
         if len(normalized_df) > 0:
-            sample_tb = normalized_df["ТБ"].iloc[0] if "ТБ" in normalized_df.columns else None
-            sample_fio = normalized_df["ФИО"].iloc[0] if "ФИО" in normalized_df.columns else None
-            # ФИО будет замаскировано в _mask_sensitive_data
-            self.logger.debug(f"normalized_df финальный: {len(normalized_df)} строк. Пример: ТБ='{sample_tb}', fio: {sample_fio}", "FileProcessor", "_normalize_indicators")
+            if debug_enabled:
+                sample_tb = normalized_df["ТБ"].iat[0] if "ТБ" in normalized_df.columns else None
+                sample_fio = normalized_df["ФИО"].iat[0] if "ФИО" in normalized_df.columns else None
+                # ФИО будет замаскировано в _mask_sensitive_data
+                self.logger.debug(f"normalized_df финальный: {len(normalized_df)} строк. Пример: ТБ='{sample_tb}', fio: {sample_fio}", "FileProcessor", "_normalize_indicators")
             
             # ВАЖНО: Проверяем, что нормализованные колонки добавлены
             norm_cols = [col for col in normalized_df.columns if col not in base_columns]
@@ -4306,60 +4595,58 @@ class FileProcessor:
         
         return normalized
     
-    def _calculate_score_for_month(self, month: int, normalized_df: pd.DataFrame, weight_od: float, weight_ra: float, weight_ps: float) -> Tuple[str, pd.Series]:
+    def _calculate_scores(self, months: List[int], normalized_df: pd.DataFrame, weight_od: float, weight_ra: float, weight_ps: float) -> np.ndarray:
         """
-        Рассчитывает Score для одного месяца.
+        Рассчитывает Score для всех месяцев сразу.
+        
+        ОПТИМИЗАЦИЯ: Нормализованные значения каждой группы берутся одной матрицей (N КМ x M месяцев),
+        Score считается одной взвешенной суммой трех матриц вместо отдельных операций по Series для каждого месяца.
         
         Args:
-            month: Номер месяца
+            months: Отсортированный список номеров месяцев
             normalized_df: DataFrame с нормализованными данными
             weight_od: Вес для OD
             weight_ra: Вес для RA
             weight_ps: Вес для PS
         
         Returns:
-            Tuple[score_col_name, score_series] с именем колонки и значениями Score
+            np.ndarray: Матрица Score (N КМ x M месяцев), колонки в порядке months
         """
-        score = pd.Series(0.0, index=normalized_df.index)
-        
-        # ОПТИМИЗАЦИЯ: Векторизованный расчет Score
-        od_norm_col = f"OD_norm (M-{month})"
-        ra_norm_col = f"RA_norm (M-{month})"
-        ps_norm_col = f"PS_norm (M-{month})"
+        def get_norm_matrix(group_name: str) -> np.ndarray:
+            """Возвращает матрицу нормализованных значений группы (отсутствующие колонки и NaN - 0)."""
+            norm_cols = [f"{group_name}_norm (M-{month})" for month in months]
+            return normalized_df.reindex(columns=norm_cols).to_numpy(dtype=SCORE_FLOAT_DTYPE, na_value=0.0)
         
-        if od_norm_col in normalized_df.columns:
-            score += normalized_df[od_norm_col].fillna(0) * weight_od
+        od_matrix = get_norm_matrix("OD")
+        ra_matrix = get_norm_matrix("RA")
+        ps_matrix = get_norm_matrix("PS")
         
-        if ra_norm_col in normalized_df.columns:
-            score += normalized_df[ra_norm_col].fillna(0) * weight_ra
-        
-        if ps_norm_col in normalized_df.columns:
-            score += normalized_df[ps_norm_col].fillna(0) * weight_ps
-        
-        score_col_name = f"Score (M-{month})"
+        # ОПТИМИЗАЦИЯ: Векторизованный расчет Score
+        scores = od_matrix * weight_od
+        scores += ra_matrix * weight_ra
+        scores += ps_matrix * weight_ps
         
         # ДЕТАЛЬНОЕ ЛОГИРОВАНИЕ: Логируем расчет Score для указанного табельного
         if DEBUG_TAB_NUMBER and len(DEBUG_TAB_NUMBER) > 0 and "Табельный" in normalized_df.columns:
-            debug_mask = self._create_debug_tab_mask(normalized_df, "Табельный")
-            if debug_mask.any():
-                debug_idx = normalized_df[debug_mask].index[0]
-                od_val = normalized_df.loc[debug_idx, od_norm_col] if od_norm_col in normalized_df.columns and debug_idx in normalized_df.index else 0
-                ra_val = normalized_df.loc[debug_idx, ra_norm_col] if ra_norm_col in normalized_df.columns and debug_idx in normalized_df.index else 0
-                ps_val = normalized_df.loc[debug_idx, ps_norm_col] if ps_norm_col in normalized_df.columns and debug_idx in normalized_df.index else 0
-                score_val = score.loc[debug_idx] if debug_idx in score.index else 0
-                
-                self.logger.debug_tab(
-                    f"Расчет Score для месяца M-{month}: "
-                    f"OD_norm={od_val:.4f} × {weight_od} = {od_val * weight_od:.4f}, "
-                    f"RA_norm={ra_val:.4f} × {weight_ra} = {ra_val * weight_ra:.4f}, "
-                    f"PS_norm={ps_val:.4f} × {weight_ps} = {ps_val * weight_ps:.4f}, "
-                    f"Итого Score={score_val:.4f}",
-                    tab_number=None,  # Проверка уже сделана через debug_mask
-                    class_name="FileProcessor",
-                    func_name="_calculate_score_for_month"
-                )
+            debug_positions = np.flatnonzero(self._create_debug_tab_mask(normalized_df, "Табельный").to_numpy())
+            if len(debug_positions) > 0:
+                debug_pos = int(debug_positions[0])
+                for month_pos, month in enumerate(months):
+                    od_val = od_matrix[debug_pos, month_pos]
+                    ra_val = ra_matrix[debug_pos, month_pos]
+                    ps_val = ps_matrix[debug_pos, month_pos]
+                    self.logger.debug_tab(
+                        f"Расчет Score для месяца M-{month}: "
+                        f"OD_norm={od_val:.4f} × {weight_od} = {od_val * weight_od:.4f}, "
+                        f"RA_norm={ra_val:.4f} × {weight_ra} = {ra_val * weight_ra:.4f}, "
+                        f"PS_norm={ps_val:.4f} × {weight_ps} = {ps_val * weight_ps:.4f}, "
+                        f"Итого Score={scores[debug_pos, month_pos]:.4f}",
+                        tab_number=None,  # Проверка уже сделана через debug_mask
+                        class_name="FileProcessor",
+                        func_name="_calculate_scores"
+                    )
         
-        return (score_col_name, score)
+        return scores
     
     def _calculate_best_month_variant3(self, calculated_df: pd.DataFrame, normalized_df: pd.DataFrame, config_manager, raw_df: Optional[pd.DataFrame] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """
@@ -4397,14 +4684,9 @@ class FileProcessor:
             if col in base_columns:
                 continue
             
-            match = re.search(r'^([A-Z]+)\s+\(M-(\d{1,2})\)', col)
-            if match:
-                group = match.group(1)
-                month = int(match.group(2))
-                
-                if month not in month_data:
-                    month_data[month] = {}
-                month_data[month][group] = col
+            if (match := _COL_RE.match(col)):
+                group, month = match.group(1), int(match.group(2))
+                month_data.setdefault(month, {})[group] = col
         
         # Создаем DataFrame для "Места и выбор"
         # ВАЖНО: Убеждаемся, что базовые колонки существуют
@@ -4413,8 +4695,9 @@ class FileProcessor:
             self.logger.error(f"В normalized_df отсутствуют колонки: {missing_cols}. Доступные колонки: {list(normalized_df.columns)[:10]}", "FileProcessor", "_calculate_best_month_variant3")
             raise ValueError(f"Отсутствуют базовые колонки в normalized_df: {missing_cols}")
         
-        # ВАЖНО: Сбрасываем индекс перед копированием, чтобы гарантировать совпадение строк
-        places_df = normalized_df[base_columns].copy().reset_index(drop=True)
+        # ВАЖНО: Сбрасываем индекс, чтобы гарантировать совпадение строк
+        # ОПТИМИЗАЦИЯ: Базовые колонки без копирования данных
+        places_df = self._make_base_frame(normalized_df, base_columns)
         
         # Создаем DataFrame для "Итог"
         # ВАЖНО: Убеждаемся, что базовые колонки существуют в calculated_df
@@ -4423,8 +4706,9 @@ class FileProcessor:
             self.logger.error(f"В calculated_df отсутствуют колонки: {missing_cols}. Доступные колонки: {list(calculated_df.columns)[:10]}", "FileProcessor", "_calculate_best_month_variant3")
             raise ValueError(f"Отсутствуют базовые колонки в calculated_df: {missing_cols}")
         
-        # ВАЖНО: Сбрасываем индекс перед копированием, чтобы гарантировать совпадение строк
-        final_df = calculated_df[base_columns].copy().reset_index(drop=True)
+        # ВАЖНО: Сбрасываем индекс, чтобы гарантировать совпадение строк
+        # ОПТИМИЗАЦИЯ: Базовые колонки без копирования данных
+        final_df = self._make_base_frame(calculated_df, base_columns)
         
         # Добавляем колонку с числом уникальных ИНН для каждого табельного номера (из RAW)
         if raw_df is not None and "Табельный" in raw_df.columns and "ИНН" in raw_df.columns:
@@ -4433,8 +4717,9 @@ class FileProcessor:
             unique_inn_count = raw_df.groupby("Табельный")["ИНН"].nunique().to_dict()
             
             # Добавляем колонку в final_df (табельные номера в final_df тоже нормализованы)
-            final_df["Количество уникальных ИНН"] = final_df["Табельный"].apply(
-                lambda x: unique_inn_count.get(str(x), 0)
+            # ОПТИМИЗАЦИЯ: Колонка заполняется одним векторным map по словарю вместо поячеечного apply
+            final_df["Количество уникальных ИНН"] = (
+                final_df["Табельный"].astype(str).map(unique_inn_count).fillna(0).astype(np.int64)
             )
             
             # Собираем данные для трекера
@@ -4480,59 +4765,63 @@ class FileProcessor:
             # ФИО будет замаскировано в _mask_sensitive_data
             self.logger.debug(f"final_df создан: {len(final_df)} строк. Пример: ТБ='{sample_tb}', fio: {sample_fio}", "FileProcessor", "_calculate_best_month_variant3")
         
-        # ОПТИМИЗАЦИЯ: Параллельный расчет Score для всех месяцев
-        self.logger.debug(f"Параллельный расчет Score для всех месяцев (max_workers={MAX_WORKERS})", "FileProcessor", "_calculate_best_month_variant3")
-        
-        score_cols = {}
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            futures = {
-                executor.submit(self._calculate_score_for_month, month, normalized_df, weight_od, weight_ra, weight_ps): month
-                for month in sorted(month_data.keys())
-            }
-            
-            # Обрабатываем результаты по мере завершения
-            for future in as_completed(futures):
-                month = futures[future]
-                try:
-                    score_col_name, score = future.result()
-                    places_df[score_col_name] = score
-                    score_cols[month] = score_col_name
-                except Exception as e:
-                    self.logger.error(f"Ошибка при расчете Score для месяца M-{month}: {str(e)}", "FileProcessor", "_calculate_best_month_variant3")
+        # ОПТИМИЗАЦИЯ: Индекс и число строк берем один раз - дальше работаем с массивами numpy,
+        # в pandas оборачиваем только итоговые колонки
+        calc_index = calculated_df.index
+        n_rows = len(calc_index)
+        
+        # ОПТИМИЗАЦИЯ: Score для всех месяцев считается одной матричной операцией
+        months_sorted = sorted(month_data.keys())
+        self.logger.debug(f"Расчет Score для всех месяцев одной матричной операцией: {len(months_sorted)} месяцев", "FileProcessor", "_calculate_best_month_variant3")
+        scores = self._calculate_scores(months_sorted, normalized_df, weight_od, weight_ra, weight_ps)
+        
+        # Добавляем все колонки Score в places_df одним блоком
+        score_col_names = [f"Score (M-{month})" for month in months_sorted]
+        places_df = pd.concat(
+            [places_df, pd.DataFrame(scores, columns=score_col_names, index=places_df.index)],
+            axis=1
+        )
         
         # ОПТИМИЗАЦИЯ: Векторизованный расчет горизонтального ранга
-        # Создаем DataFrame со всеми Score для удобства работы
-        score_df = pd.DataFrame(index=calculated_df.index)
-        for month, col in score_cols.items():
-            score_df[f"M-{month}"] = places_df[col]
-        
         # Для каждого КМ рассчитываем ранг (горизонтально)
-        # Используем rank с method='min' и ascending=False (больше = лучше)
-        # na_option='keep' - NaN остаются NaN
-        rank_df = score_df.rank(axis=1, method='min', ascending=False, na_option='keep')
-        
-        # Добавляем ранги в places_df
-        for month in sorted(month_data.keys()):
-            rank_col_name = f"Место (M-{month})"
-            places_df[rank_col_name] = rank_df[f"M-{month}"].fillna(0).astype(int)
+        # Ранг как в rank(method='min', ascending=False): 1 + количество месяцев со строго большим Score
+        # NaN остаются NaN (как na_option='keep')
+        # ОПТИМИЗАЦИЯ: Одно сравнение матрицы Score с собой через broadcast (N x M x M, M <= 12 месяцев)
+        # вместо DataFrame.rank по строкам
+        # Для больших данных - параллельное numba-ядро по строкам (без временной матрицы N x M x M)
+        if NUMBA_AVAILABLE and len(scores) > NUMBA_MIN_ROWS:
+            rank_matrix = np.empty(scores.shape, dtype=np.float64)
+            _row_rank_desc_numba(scores, rank_matrix)
+        else:
+            greater_count = (scores[:, None, :] > scores[:, :, None]).sum(axis=2)
+            rank_matrix = np.where(np.isnan(scores), np.nan, greater_count + 1.0)
+        
+        # Добавляем ранги в places_df (одним блоком)
+        # ОПТИМИЗАЦИЯ: NaN -> 0 и приведение к целым одним проходом в непрерывный int32-блок (место <= 12)
+        rank_col_names = [f"Место (M-{month})" for month in months_sorted]
+        ranks_int = np.where(np.isnan(rank_matrix), 0, rank_matrix).astype(np.int32)
+        places_df = pd.concat(
+            [places_df, pd.DataFrame(ranks_int, columns=rank_col_names, index=places_df.index, copy=False)],
+            axis=1,
+            copy=False
+        )
         
         # ДЕТАЛЬНОЕ ЛОГИРОВАНИЕ: Логируем расчет рангов для указанного табельного
         if DEBUG_TAB_NUMBER and "Табельный" in calculated_df.columns:
-            debug_mask = self._create_debug_tab_mask(calculated_df, "Табельный")
-            if debug_mask.any():
-                debug_idx = calculated_df[debug_mask].index[0]
+            debug_positions = np.flatnonzero(self._create_debug_tab_mask(calculated_df, "Табельный").to_numpy())
+            if len(debug_positions) > 0:
+                debug_pos = int(debug_positions[0])
                 ranks_info = {}
                 scores_info = {}
-                for month in sorted(month_data.keys()):
-                    rank_val = rank_df.loc[debug_idx, f"M-{month}"] if debug_idx in rank_df.index and f"M-{month}" in rank_df.columns else None
-                    score_val = score_df.loc[debug_idx, f"M-{month}"] if debug_idx in score_df.index and f"M-{month}" in score_df.columns else None
-                    if rank_val is not None:
+                for month_pos, month in enumerate(months_sorted):
+                    rank_val = rank_matrix[debug_pos, month_pos]
+                    # У NaN-ранга нет номера места - в лог попадают только определенные ранги
+                    if not np.isnan(rank_val):
                         ranks_info[f"M-{month}"] = int(rank_val)
-                    if score_val is not None:
-                        scores_info[f"M-{month}"] = float(score_val)
+                    scores_info[f"M-{month}"] = float(scores[debug_pos, month_pos])
                 
-                # Получаем табельный номер из calculated_df для этого индекса
-                tab_num_value = calculated_df.loc[debug_idx, "Табельный"] if "Табельный" in calculated_df.columns else None
+                # Получаем табельный номер из calculated_df для этой строки
+                tab_num_value = calculated_df["Табельный"].iat[debug_pos]
                 self.logger.debug_tab(
                     f"Расчет рангов (мест): Score по месяцам: {scores_info}, Места по месяцам: {ranks_info}",
                     tab_number=tab_num_value,
@@ -4541,30 +4830,34 @@ class FileProcessor:
                 )
         
         # ОПТИМИЗАЦИЯ: Векторизованный поиск лучшего месяца
-        # Находим все месяцы с рангом 1 для каждого КМ
-        best_month_series = pd.Series("", index=calculated_df.index, dtype=str)
-        
-        # Создаем маску для месяцев с рангом 1 (заполняем NaN как False)
-        rank_1_mask = (rank_df == 1).fillna(False)
-        
-        def get_month_values(month: int, idx: int) -> tuple:
-            """Получает значения OD, RA, PS для указанного месяца и индекса."""
-            od_val = None
-            ra_val = None
-            ps_val = None
-            
-            od_col = month_data[month].get("OD")
-            ra_col = month_data[month].get("RA")
-            ps_col = month_data[month].get("PS")
-            
-            if od_col and od_col in calculated_df.columns:
-                od_val = calculated_df.loc[idx, od_col]
-            if ra_col and ra_col in calculated_df.columns:
-                ra_val = calculated_df.loc[idx, ra_col]
-            if ps_col and ps_col in calculated_df.columns:
-                ps_val = calculated_df.loc[idx, ps_col]
-            
-            return (od_val, ra_val, ps_val)
+        # Находим все месяцы с рангом 1 для каждого КМ (результат - заранее выделенный массив строк)
+        best_month_values = np.full(n_rows, "", dtype=object)
+        
+        # Создаем маску для месяцев с рангом 1 (NaN-ранг дает False)
+        # ОПТИМИЗАЦИЯ: Маска сразу в виде булевой матрицы numpy (N КМ x M месяцев) вместо поэлементного .loc
+        months_arr = np.array(months_sorted, dtype=np.int64)
+        # ОПТИМИЗАЦИЯ: Подписи месяцев создаются один раз (M строк) - строки с одним лучшим месяцем
+        # ссылаются на общие объекты вместо создания отдельной строки для каждого КМ
+        month_labels = np.array([str(month) for month in months_sorted], dtype=object)
+        rank_1_matrix = rank_matrix == 1
+        best_count = rank_1_matrix.sum(axis=1)
+        
+        # ОПТИМИЗАЦИЯ: Проверки наличия колонок в циклах - по множествам, а не по pandas Index
+        calculated_cols = set(calculated_df.columns)
+        normalized_cols_set = set(normalized_df.columns)
+        
+        # Значения OD, RA, PS по месяцам одной матрицей на группу (отсутствующая колонка - NaN)
+        def get_group_matrix(group_name: str) -> np.ndarray:
+            """Возвращает матрицу значений группы (N КМ x M месяцев) из calculated_df."""
+            cols = [month_data[month].get(group_name) for month in months_sorted]
+            cols = [col if col and col in calculated_cols else None for col in cols]
+            matrix = np.full((n_rows, len(months_sorted)), np.nan, dtype=np.float64)
+            for pos, col in enumerate(cols):
+                if col is not None:
+                    matrix[:, pos] = pd.to_numeric(calculated_df[col], errors='coerce').to_numpy(dtype=np.float64)
+            return matrix
+        
+        group_value_matrices = [get_group_matrix(group_name) for group_name in ("OD", "RA", "PS")]
         
         def find_consecutive_groups(months: List[int]) -> List[List[int]]:
             """Находит группы подряд идущих месяцев."""
@@ -4587,21 +4880,37 @@ class FileProcessor:
             groups.append(current_group)
             return groups
         
-        # Для каждого КМ собираем месяцы с рангом 1 и обрабатываем их
-        for idx in calculated_df.index:
-            best_months = []
-            for month in sorted(month_data.keys()):
-                col_name = f"M-{month}"
-                if col_name in rank_1_mask.columns:
-                    if rank_1_mask.loc[idx, col_name]:
-                        best_months.append(month)
-            
-            if not best_months:
-                continue
+        # ДЕТАЛЬНОЕ ЛОГИРОВАНИЕ: Строки с табельными номерами для детального логирования (одна векторная маска)
+        debug_rows = self._create_debug_tab_mask(calculated_df, "Табельный").to_numpy(dtype=bool)
+        tab_values = calculated_df["Табельный"].to_numpy() if "Табельный" in calculated_df.columns else None
+        
+        # ОПТИМИЗАЦИЯ: КМ с единственным месяцем ранга 1 обрабатываются векторно (argmax по строке)
+        single_rows = best_count == 1
+        if single_rows.any():
+            best_month_values[single_rows] = month_labels[rank_1_matrix[single_rows].argmax(axis=1)]
+            for pos in np.flatnonzero(single_rows & debug_rows):
+                best_months = months_arr[rank_1_matrix[pos]].tolist()
+                self.logger.debug_tab(
+                    f"Найдены месяцы с рангом 1: {best_months}",
+                    tab_number=tab_values[pos],
+                    class_name="FileProcessor",
+                    func_name="_calculate_best_month_variant3"
+                )
+                self.logger.debug_tab(
+                    f"Выбран единственный лучший месяц: {best_months[0]}",
+                    tab_number=tab_values[pos],
+                    class_name="FileProcessor",
+                    func_name="_calculate_best_month_variant3"
+                )
+        
+        # Для КМ с несколькими месяцами ранга 1 собираем месяцы и обрабатываем их (цикл только по таким строкам)
+        month_positions = {month: month_pos for month_pos, month in enumerate(months_sorted)}
+        for pos in np.flatnonzero(best_count > 1):
+            best_months = months_arr[rank_1_matrix[pos]].tolist()
             
             # ДЕТАЛЬНОЕ ЛОГИРОВАНИЕ: Логируем процесс выбора лучшего месяца
-            tab_number = calculated_df.loc[idx, "Табельный"] if "Табельный" in calculated_df.columns else None
-            is_debug_tab = self.logger._is_debug_tab_number(tab_number) if tab_number is not None else False
+            tab_number = tab_values[pos] if tab_values is not None else None
+            is_debug_tab = bool(debug_rows[pos])
             
             if is_debug_tab:
                 self.logger.debug_tab(
@@ -4611,24 +4920,6 @@ class FileProcessor:
                     func_name="_calculate_best_month_variant3"
                 )
             
-            # Если только один месяц - просто добавляем его
-            if len(best_months) == 1:
-                best_month_series.loc[idx] = str(best_months[0])
-                if is_debug_tab:
-                    self.logger.debug_tab(
-                        f"Выбран единственный лучший месяц: {best_months[0]}",
-                        tab_number=tab_number,
-                        class_name="FileProcessor",
-                        func_name="_calculate_best_month_variant3"
-                    )
-                continue
-            
-            # Если несколько месяцев - проверяем значения и группируем
-            # Создаем словарь: месяц -> (OD, RA, PS)
-            month_values = {}
-            for month in best_months:
-                month_values[month] = get_month_values(month, idx)
-            
             # Находим группы подряд идущих месяцев
             consecutive_groups = find_consecutive_groups(best_months)
             
@@ -4640,33 +4931,20 @@ class FileProcessor:
                     # Один месяц - добавляем его
                     selected_months.append(group[0])
                 else:
-                    # Несколько месяцев - проверяем, одинаковые ли значения
-                    first_month_values = month_values[group[0]]
+                    # Несколько месяцев - проверяем, одинаковые ли значения (OD, RA, PS)
+                    # Сравниваем значения с учетом NaN и float (численное сравнение)
+                    first_pos = month_positions[group[0]]
                     all_same = True
-                    
                     for month in group[1:]:
-                        current_values = month_values[month]
-                        # Сравниваем значения с учетом NaN и float (численное сравнение)
-                        try:
-                            # Проверяем OD
-                            od_eq = (pd.isna(first_month_values[0]) and pd.isna(current_values[0])) or \
-                                    (not pd.isna(first_month_values[0]) and not pd.isna(current_values[0]) and 
-                                     abs(float(first_month_values[0]) - float(current_values[0])) < 1e-10)
-                            # Проверяем RA
-                            ra_eq = (pd.isna(first_month_values[1]) and pd.isna(current_values[1])) or \
-                                    (not pd.isna(first_month_values[1]) and not pd.isna(current_values[1]) and 
-                                     abs(float(first_month_values[1]) - float(current_values[1])) < 1e-10)
-                            # Проверяем PS
-                            ps_eq = (pd.isna(first_month_values[2]) and pd.isna(current_values[2])) or \
-                                    (not pd.isna(first_month_values[2]) and not pd.isna(current_values[2]) and 
-                                     abs(float(first_month_values[2]) - float(current_values[2])) < 1e-10)
-                            
-                            if not (od_eq and ra_eq and ps_eq):
+                        month_pos = month_positions[month]
+                        for matrix in group_value_matrices:
+                            first_val = matrix[pos, first_pos]
+                            current_val = matrix[pos, month_pos]
+                            both_nan = np.isnan(first_val) and np.isnan(current_val)
+                            if not both_nan and not abs(first_val - current_val) < 1e-10:
                                 all_same = False
                                 break
-                        except (ValueError, TypeError):
-                            # Если не удалось сравнить как числа - считаем разными
-                            all_same = False
+                        if not all_same:
                             break
                     
                     if all_same:
@@ -4677,12 +4955,12 @@ class FileProcessor:
                         selected_months.extend(group)
             
             # Формируем строку с выбранными месяцами
-            best_month_series.loc[idx] = ", ".join([str(m) for m in sorted(selected_months)])
+            best_month_values[pos] = ", ".join([str(m) for m in sorted(selected_months)])
             
             # ДЕТАЛЬНОЕ ЛОГИРОВАНИЕ: Логируем финальный выбор лучшего месяца
             if is_debug_tab:
                 self.logger.debug_tab(
-                    f"Финальный выбор лучшего месяца: {best_month_series.loc[idx]}. "
+                    f"Финальный выбор лучшего месяца: {best_month_values[pos]}. "
                     f"Исходные месяцы с рангом 1: {best_months}, "
                     f"Группы подряд идущих: {consecutive_groups}, "
                     f"Выбранные месяцы: {selected_months}",
@@ -4691,12 +4969,48 @@ class FileProcessor:
                     func_name="_calculate_best_month_variant3"
                 )
         
+        # ОПТИМИЗАЦИЯ: Колонка "Лучший месяц" хранится как category - значений мало (месяцы и их сочетания),
+        # поэтому строки хранятся один раз в категориях, а по строкам - компактные коды
+        best_month_series = pd.Series(best_month_values, index=calc_index, dtype="category")
+        # ОПТИМИЗАЦИЯ: Маска КМ с определенным лучшим месяцем строится один раз по массиву значений
+        # и переиспользуется ниже (итоговый лог), без повторного сравнения строк Series
+        has_best_month = best_month_values != ""
+        
         # Добавляем колонку "Лучший месяц" в places_df и final_df
         places_df["Лучший месяц"] = best_month_series
         final_df["Лучший месяц"] = best_month_series
         
         # Собираем данные для трекера: Score и лучший месяц
         if "Табельный" in places_df.columns:
+            places_cols = set(places_df.columns)
+            # ОПТИМИЗАЦИЯ: Имена колонок Score, показателей и нормализации по месяцам определяются один раз
+            # для всех КМ трекера (вместо поиска в month_data и проверки наличия колонки для каждого КМ)
+            score_cols_by_month = [
+                (month, f"Score (M-{month})") for month in months_sorted if f"Score (M-{month})" in places_cols
+            ]
+            calc_cols_by_month = {
+                month: [
+                    col for col in (month_data[month].get(group_name) for group_name in ("OD", "RA", "PS"))
+                    if col and col in calculated_cols
+                ]
+                for month in months_sorted
+            }
+            norm_cols_by_month = {
+                month: {
+                    group_name: (f"{group_name} (M-{month})_norm" if f"{group_name} (M-{month})_norm" in normalized_cols_set else None)
+                    for group_name in ("OD", "RA", "PS")
+                }
+                for month in months_sorted
+            }
+            # ОПТИМИЗАЦИЯ: Значения берутся по позиции строки из массивов колонок (метка строки -> позиция
+            # один раз на КМ) вместо двойного поиска по меткам строки и колонки в каждом .loc
+            places_tab_values = places_df["Табельный"].to_numpy()
+            score_arrays = {score_col: places_df[score_col].to_numpy() for _, score_col in score_cols_by_month}
+            calc_arrays = {col: calculated_df[col].to_numpy() for cols in calc_cols_by_month.values() for col in cols}
+            norm_arrays = {
+                norm_col: normalized_df[norm_col].to_numpy()
+                for cols in norm_cols_by_month.values() for norm_col in cols.values() if norm_col
+            }
             for tab_num in self.debug_tracker.get_all_tab_numbers():
                 # Нормализуем табельный номер для поиска (используем ту же логику, что и в DataFrame)
                 # В DataFrame табельные номера нормализованы через _normalize_tab_number (8 знаков с лидирующими нулями)
@@ -4712,19 +5026,18 @@ class FileProcessor:
                     tab_mask = places_clean == tab_num_clean
                 
                 if tab_mask.any():
-                    tab_idx = places_df[tab_mask].index[0]
+                    tab_pos = int(np.flatnonzero(tab_mask.to_numpy())[0])
+                    tab_idx = places_df.index[tab_pos]
                     
                     # Собираем Score по месяцам
                     scores_dict = {}
-                    for month in sorted(month_data.keys()):
-                        score_col = score_cols.get(month)
-                        if score_col and score_col in places_df.columns:
-                            score_val = places_df.loc[tab_idx, score_col] if tab_idx in places_df.index else 0
-                            scores_dict[str(month)] = float(score_val) if pd.notna(score_val) else 0
+                    for month, score_col in score_cols_by_month:
+                        score_val = score_arrays[score_col][tab_pos]
+                        scores_dict[str(month)] = float(score_val) if pd.notna(score_val) else 0
                     
-                    best_month_val = best_month_series.loc[tab_idx] if tab_idx in best_month_series.index else ""
+                    best_month_val = best_month_values[calc_index.get_loc(tab_idx)] if tab_idx in calc_index else ""
                     # Используем нормализованный номер из DataFrame для добавления в трекер
-                    tab_num_from_df = str(places_df.loc[tab_idx, "Табельный"]).strip()
+                    tab_num_from_df = str(places_tab_values[tab_pos]).strip()
                     self.debug_tracker.add_scores(tab_num_from_df, scores_dict, str(best_month_val))
                     
                     # Логируем для диагностики
@@ -4736,45 +5049,31 @@ class FileProcessor:
                     )
                     
                     # Собираем данные расчетов
-                    if tab_idx in calculated_df.index:
+                    if tab_idx in calc_index:
+                        calc_pos = calc_index.get_loc(tab_idx)
                         calc_dict = {}
-                        for month in sorted(month_data.keys()):
-                            od_col = month_data[month].get("OD")
-                            ra_col = month_data[month].get("RA")
-                            ps_col = month_data[month].get("PS")
-                            
+                        for month in months_sorted:
                             fact = 0
-                            if od_col and od_col in calculated_df.columns:
-                                fact += float(calculated_df.loc[tab_idx, od_col]) if pd.notna(calculated_df.loc[tab_idx, od_col]) else 0
-                            if ra_col and ra_col in calculated_df.columns:
-                                fact += float(calculated_df.loc[tab_idx, ra_col]) if pd.notna(calculated_df.loc[tab_idx, ra_col]) else 0
-                            if ps_col and ps_col in calculated_df.columns:
-                                fact += float(calculated_df.loc[tab_idx, ps_col]) if pd.notna(calculated_df.loc[tab_idx, ps_col]) else 0
+                            for calc_col in calc_cols_by_month[month]:
+                                calc_val = calc_arrays[calc_col][calc_pos]
+                                fact += float(calc_val) if pd.notna(calc_val) else 0
                             
                             calc_dict[str(month)] = {
                                 "fact": fact,
                                 "growth_2m": 0,  # Упрощенно, можно расширить
                                 "growth_3m": 0  # Упрощенно, можно расширить
                             }
-                        # Используем нормализованный номер из DataFrame для добавления в трекер
-                        tab_num_from_df = str(places_df.loc[tab_idx, "Табельный"]).strip()
                         self.debug_tracker.add_calculations(tab_num_from_df, calc_dict)
                     
                     # Собираем данные нормализации
                     if tab_idx in normalized_df.index:
+                        norm_pos = normalized_df.index.get_loc(tab_idx)
                         norm_dict = {}
-                        for month in sorted(month_data.keys()):
-                            od_norm_col = f"OD (M-{month})_norm" if f"OD (M-{month})_norm" in normalized_df.columns else None
-                            ra_norm_col = f"RA (M-{month})_norm" if f"RA (M-{month})_norm" in normalized_df.columns else None
-                            ps_norm_col = f"PS (M-{month})_norm" if f"PS (M-{month})_norm" in normalized_df.columns else None
-                            
+                        for month in months_sorted:
                             norm_dict[str(month)] = {
-                                "OD": float(normalized_df.loc[tab_idx, od_norm_col]) if od_norm_col and pd.notna(normalized_df.loc[tab_idx, od_norm_col]) else 0,
-                                "RA": float(normalized_df.loc[tab_idx, ra_norm_col]) if ra_norm_col and pd.notna(normalized_df.loc[tab_idx, ra_norm_col]) else 0,
-                                "PS": float(normalized_df.loc[tab_idx, ps_norm_col]) if ps_norm_col and pd.notna(normalized_df.loc[tab_idx, ps_norm_col]) else 0
+                                group_name: float(norm_arrays[norm_col][norm_pos]) if norm_col and pd.notna(norm_arrays[norm_col][norm_pos]) else 0
+                                for group_name, norm_col in norm_cols_by_month[month].items()
                             }
-                        # Используем нормализованный номер из DataFrame для добавления в трекер
-                        tab_num_from_df = str(places_df.loc[tab_idx, "Табельный"]).strip()
                         self.debug_tracker.add_normalization(tab_num_from_df, norm_dict)
                         
                         # Логируем для диагностики
@@ -4785,7 +5084,9 @@ class FileProcessor:
                             "_calculate_best_month_variant3"
                         )
         
-        self.logger.info(f"Расчет лучшего месяца завершен: определен для {len(best_month_series[best_month_series != ''])} КМ", "FileProcessor", "_calculate_best_month_variant3")
+        # ОПТИМИЗАЦИЯ: Нужен только счетчик - считаем по готовой маске без фильтрации Series
+        best_month_count = int(np.count_nonzero(has_best_month))
+        self.logger.info(f"Расчет лучшего месяца завершен: определен для {best_month_count} КМ", "FileProcessor", "_calculate_best_month_variant3")
         
         return places_df, final_df
     
@@ -4793,6 +5094,8 @@ class FileProcessor:
         """
         Формирует лист со статистикой обработки данных.
         
+        Строки листа берутся из генератора iter_statistics_rows и собираются в DataFrame за один вызов.
+        
         Returns:
             Optional[pd.DataFrame]: DataFrame со статистикой или None, если статистика отключена
         """
@@ -4801,281 +5104,256 @@ class FileProcessor:
         
         self.logger.info("=== Начало формирования листа 'Статистика' ===", "FileProcessor", "prepare_statistics_sheet")
         
-        # Создаем список всех таблиц статистики
-        statistics_tables = []
+        sorted_files, sorted_tab_files = self._prepare_statistics_index()
         
-        # Таблица 1: Общая статистика
-        summary_data = []
-        summary_data.append(["Параметр", "Значение"])
-        summary_data.append(["Всего обработано КМ (табельных номеров)", self.statistics["summary"].get("total_km", 0)])
-        summary_data.append(["Всего уникальных клиентов", self.statistics["summary"].get("total_clients", 0)])
-        summary_data.append(["", ""])  # Пустая строка для разделения
+        # ОПТИМИЗАЦИЯ: Строки всех таблиц приходят из генератора уже полной ширины (Параметр + M-1..M-12),
+        # DataFrame строится один раз без промежуточных блоков и дополнения строк.
+        # Колонки листа смешанные (заголовки-строки и числа в одной колонке), поэтому тип object задается
+        # явно - pandas не выводит тип по каждой ячейке, числа остаются int и пишутся в Excel как числа
+        statistics_rows = list(self.iter_statistics_rows(sorted_files, sorted_tab_files))
+        if statistics_rows:
+            statistics_df = pd.DataFrame(statistics_rows, columns=range(len(STATISTICS_MONTHS) + 1), dtype=object)
+        else:
+            statistics_df = pd.DataFrame([["Статистика недоступна", ""]])
         
-        # Таблица 2: Количество КМ по ТБ
-        if "by_tb" in self.statistics["summary"]:
-            summary_data.append(["Количество КМ по ТБ", ""])
-            summary_data.append(["ТБ", "Количество КМ"])
-            for tb, count in sorted(self.statistics["summary"]["by_tb"].items(), key=lambda x: x[1], reverse=True):
-                summary_data.append([tb, count])
-            summary_data.append(["", ""])  # Пустая строка для разделения
-        
-        # Таблица 3: Статистика обработки файлов (разделена по группам OD, RA, PS)
-        # Функция для извлечения номера месяца из имени файла
-        def extract_month_number(file_name: str) -> int:
-            """Извлекает номер месяца из имени файла (M-1, M-2, ..., M-12)."""
-            match = re.search(r'M-(\d{1,2})_', file_name)
-            if match:
-                month = int(match.group(1))
-                if 1 <= month <= 12:
-                    return month
-            return 0
+        self.logger.info(f"Лист 'Статистика': Подготовлено {len(statistics_df)} строк статистики", "FileProcessor", "prepare_statistics_sheet")
+        self.logger.info("=== Завершена подготовка листа 'Статистика' ===", "FileProcessor", "prepare_statistics_sheet")
         
-        # Создаем развернутые таблицы для каждой группы
-        for group in ["OD", "RA", "PS"]:
-            if group not in self.statistics["files"]:
-                continue
-            
-            summary_data.append([f"Статистика обработки файлов - {group}", ""])
-            
-            # Собираем данные по месяцам
-            months = list(range(1, 13))  # M-1 до M-12
-            month_files = {}  # {month: file_name}
-            file_data = {}  # {file_name: {initial, dropped, kept, final, drop_rules: {}, in_rules: {}}}
-            
-            for file_name in sorted(self.statistics["files"][group].keys()):
-                month = extract_month_number(file_name)
-                if month > 0:
-                    month_files[month] = file_name
-                    file_stats = self.statistics["files"][group][file_name]
-                    file_data[file_name] = {
-                        "initial": file_stats.get("initial_rows", 0),
-                        "final": file_stats.get("final_rows", 0),
-                        "dropped": sum(file_stats.get("dropped_by_rule", {}).values()),
-                        "kept": sum(file_stats.get("kept_by_rule", {}).values()),
-                        "drop_rules": file_stats.get("dropped_by_rule", {}),
-                        "in_rules": file_stats.get("kept_by_rule", {})
-                    }
-            
-            # Создаем заголовки: строка данных, M-1, M-2, ..., M-12
-            header = ["Параметр"] + [f"M-{m}" for m in months]
-            summary_data.append(header)
-            
-            # Строка 1: Исходно строк
-            row = ["Исходно строк"]
-            for m in months:
-                file_name = month_files.get(m, "")
-                if file_name:
-                    row.append(file_data[file_name]["initial"])
-                else:
-                    row.append("")
-            summary_data.append(row)
-            
-            # Строка 2: Удалено по drop_rules (всего)
-            row = ["Удалено по drop_rules (всего)"]
-            for m in months:
-                file_name = month_files.get(m, "")
-                if file_name:
-                    row.append(file_data[file_name]["dropped"])
-                else:
-                    row.append("")
-            summary_data.append(row)
-            
-            # Строка 3: Оставлено по in_rules (всего)
-            row = ["Оставлено по in_rules (всего)"]
-            for m in months:
-                file_name = month_files.get(m, "")
-                if file_name:
-                    row.append(file_data[file_name]["kept"])
-                else:
-                    row.append("")
-            summary_data.append(row)
-            
-            # Строка 4: Итогово строк
-            row = ["Итогово строк"]
-            for m in months:
-                file_name = month_files.get(m, "")
-                if file_name:
-                    row.append(file_data[file_name]["final"])
-                else:
-                    row.append("")
-            summary_data.append(row)
-            
-            # Детальная статистика по drop_rules
-            # Собираем все уникальные правила drop_rules
-            all_drop_rules = set()
-            for file_name in file_data.keys():
-                all_drop_rules.update(file_data[file_name]["drop_rules"].keys())
-            
-            if all_drop_rules:
-                summary_data.append(["", ""])  # Пустая строка
-                summary_data.append(["Детальная статистика по drop_rules", ""])
-                summary_data.append(header)
-                
-                for rule in sorted(all_drop_rules):
-                    row = [f"Удалено: {rule}"]
-                    for m in months:
-                        file_name = month_files.get(m, "")
-                        if file_name and rule in file_data[file_name]["drop_rules"]:
-                            row.append(file_data[file_name]["drop_rules"][rule])
-                        else:
-                            row.append("")
-                    summary_data.append(row)
-            
-            # Детальная статистика по in_rules
-            # Собираем все уникальные правила in_rules
-            all_in_rules = set()
-            for file_name in file_data.keys():
-                all_in_rules.update(file_data[file_name]["in_rules"].keys())
-            
-            if all_in_rules:
-                summary_data.append(["", ""])  # Пустая строка
-                summary_data.append(["Детальная статистика по in_rules", ""])
-                summary_data.append(header)
-                
-                for rule in sorted(all_in_rules):
-                    row = [f"Оставлено: {rule}"]
-                    for m in months:
-                        file_name = month_files.get(m, "")
-                        if file_name and rule in file_data[file_name]["in_rules"]:
-                            row.append(file_data[file_name]["in_rules"][rule])
-                        else:
-                            row.append("")
-                    summary_data.append(row)
+        # Выводим статистику в лог
+        self._log_statistics(sorted_files, sorted_tab_files)
+        
+        return statistics_df
+    
+    def _prepare_statistics_index(self) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+        """
+        Подготавливает общие данные для таблиц статистики и лога.
+        
+        ОПТИМИЗАЦИЯ: Суммы удаленных/оставленных строк по правилам считаются один раз на файл и кэшируются
+        в самой статистике файла (_dropped_total, _kept_total); имена файлов каждой группы сортируются один раз.
+        Отсутствующие ключи статистики файла заполняются значениями по умолчанию, чтобы таблицы и лог
+        читали их прямым обращением по ключу.
+        
+        Returns:
+            Tuple[Dict[str, List[str]], Dict[str, List[str]]]: Отсортированные имена файлов по группам
+                для статистики обработки файлов и для статистики выбора табельных номеров
+        """
+        files_stats = self.statistics["files"]
+        for grp_files in files_stats.values():
+            for fs in grp_files.values():
+                fs.setdefault("initial_rows", 0)
+                fs.setdefault("final_rows", 0)
+                fs["_dropped_total"] = sum(fs.setdefault("dropped_by_rule", {}).values())
+                fs["_kept_total"] = sum(fs.setdefault("kept_by_rule", {}).values())
+        
+        sorted_files = {group: sorted(files) for group, files in files_stats.items()}
+        sorted_tab_files = {group: sorted(files) for group, files in self.statistics["tab_selection"].items()}
+        return sorted_files, sorted_tab_files
+    
+    def iter_statistics_rows(self, sorted_files: Optional[Dict[str, List[str]]] = None,
+                             sorted_tab_files: Optional[Dict[str, List[str]]] = None) -> Iterator[Tuple[Any, ...]]:
+        """
+        Лениво выдает строки листа "Статистика" таблица за таблицей.
+        
+        Каждая строка - кортеж одинаковой ширины: Параметр + M-1..M-12. Генератор можно писать
+        в лист построчно (ws.append) без построения DataFrame.
+        
+        Args:
+            sorted_files: Отсортированные имена файлов по группам (по умолчанию считаются здесь)
+            sorted_tab_files: Отсортированные имена файлов статистики выбора табельных по группам
             
-            summary_data.append(["", ""])  # Пустая строка для разделения
+        Yields:
+            Tuple[Any, ...]: Строка листа статистики
+        """
+        if sorted_files is None or sorted_tab_files is None:
+            sorted_files, sorted_tab_files = self._prepare_statistics_index()
         
-        # Таблица 4: Статистика выбора табельных номеров (разделена по группам)
+        files_stats = self.statistics["files"]
+        tab_selection = self.statistics["tab_selection"]
+        
+        yield from self._iter_summary_statistics_rows()
         for group in ["OD", "RA", "PS"]:
-            if group not in self.statistics["tab_selection"]:
-                continue
-            
-            summary_data.append([f"Статистика выбора табельных номеров - {group}", ""])
-            
-            # Собираем данные по месяцам
-            months = list(range(1, 13))  # M-1 до M-12
-            month_files = {}  # {month: file_name}
-            tab_data = {}  # {file_name: {total_variants, selected_count, variants_with_multiple}}
-            
-            for file_name in sorted(self.statistics["tab_selection"][group].keys()):
-                month = extract_month_number(file_name)
-                if month > 0:
-                    month_files[month] = file_name
-                    tab_stats = self.statistics["tab_selection"][group][file_name]
-                    tab_data[file_name] = {
-                        "total_variants": tab_stats.get("total_variants", 0),
-                        "selected_count": tab_stats.get("selected_count", 0),
-                        "variants_with_multiple": tab_stats.get("variants_with_multiple", 0)
-                    }
-            
-            # Создаем заголовки: строка данных, M-1, M-2, ..., M-12
-            header = ["Параметр"] + [f"M-{m}" for m in months]
-            summary_data.append(header)
-            
-            # Строка 1: Всего вариантов ТБ
-            row = ["Всего вариантов ТБ"]
-            for m in months:
-                file_name = month_files.get(m, "")
-                if file_name:
-                    row.append(tab_data[file_name]["total_variants"])
-                else:
-                    row.append("")
-            summary_data.append(row)
-            
-            # Строка 2: Выбрано уникальных
-            row = ["Выбрано уникальных"]
-            for m in months:
-                file_name = month_files.get(m, "")
-                if file_name:
-                    row.append(tab_data[file_name]["selected_count"])
-                else:
-                    row.append("")
-            summary_data.append(row)
-            
-            # Строка 3: Табельных с несколькими вариантами
-            row = ["Табельных с несколькими вариантами"]
-            for m in months:
-                file_name = month_files.get(m, "")
-                if file_name:
-                    row.append(tab_data[file_name]["variants_with_multiple"])
-                else:
-                    row.append("")
-            summary_data.append(row)
-            
-            summary_data.append(["", ""])  # Пустая строка для разделения
+            if group in files_stats:
+                yield from self._iter_file_statistics_rows(group, sorted_files[group])
+        for group in ["OD", "RA", "PS"]:
+            if group in tab_selection:
+                yield from self._iter_tab_selection_statistics_rows(group, sorted_tab_files[group])
+    
+    @staticmethod
+    def _statistics_text_row(label: Any, value: Any = "") -> Tuple[Any, ...]:
+        """Строка статистики из подписи и значения, остальные колонки пустые."""
+        return (label, value) + _STATISTICS_EMPTY_TAIL
+    
+    @staticmethod
+    def _statistics_month_row(label: str, values_by_month: Dict[int, Any]) -> Tuple[Any, ...]:
+        """Строка таблицы по месяцам: подпись + значения M-1..M-12 (пусто, если месяца нет)."""
+        return (label,) + tuple(values_by_month.get(m, "") for m in STATISTICS_MONTHS)
+    
+    def _iter_summary_statistics_rows(self) -> Iterator[Tuple[Any, ...]]:
+        """Таблицы 1-2: общая статистика и количество КМ по ТБ."""
+        text_row = self._statistics_text_row
+        summary = self.statistics["summary"]
+        
+        # Таблица 1: Общая статистика
+        yield text_row("Параметр", "Значение")
+        yield text_row("Всего обработано КМ (табельных номеров)", summary.get("total_km", 0))
+        yield text_row("Всего уникальных клиентов", summary.get("total_clients", 0))
+        yield text_row("")  # Пустая строка для разделения
         
-        # Создаем DataFrame
-        if len(summary_data) > 0:
-            # Находим максимальную длину строки для определения количества колонок
-            max_cols = max(len(row) for row in summary_data) if summary_data else 2
+        # Таблица 2: Количество КМ по ТБ
+        if "by_tb" in summary:
+            yield text_row("Количество КМ по ТБ")
+            yield text_row("ТБ", "Количество КМ")
+            for tb, count in sorted_by_value_desc(summary["by_tb"]):
+                yield text_row(tb, count)
+            yield text_row("")  # Пустая строка для разделения
+    
+    def _iter_file_statistics_rows(self, group: str, file_names: List[str]) -> Iterator[Tuple[Any, ...]]:
+        """Таблица 3: статистика обработки файлов группы по месяцам с детализацией по drop_rules и in_rules."""
+        text_row = self._statistics_text_row
+        month_row = self._statistics_month_row
+        group_files = self.statistics["files"][group]
+        
+        yield text_row(f"Статистика обработки файлов - {group}")
+        
+        # Собираем данные по месяцам
+        month_data = {}  # {month: file_stats} - при совпадении месяца берется последний файл
+        all_rules = {"dropped_by_rule": set(), "kept_by_rule": set()}  # Правила всех файлов группы с месяцем
+        # Номера месяцев берем из общего кэша (_get_month_map), без локальной функции извлечения
+        for file_name, month in self._get_month_map(file_names).items():
+            if month > 0:
+                file_stats = group_files[file_name]
+                month_data[month] = file_stats
+                for rules_key, rules in all_rules.items():
+                    rules.update(file_stats[rules_key].keys())
+        
+        # Заголовок (Параметр, M-1, ..., M-12) и итоговые строки по файлам
+        yield STATISTICS_MONTH_HEADER
+        yield month_row("Исходно строк", {m: d["initial_rows"] for m, d in month_data.items()})
+        yield month_row("Удалено по drop_rules (всего)", {m: d["_dropped_total"] for m, d in month_data.items()})
+        yield month_row("Оставлено по in_rules (всего)", {m: d["_kept_total"] for m, d in month_data.items()})
+        yield month_row("Итогово строк", {m: d["final_rows"] for m, d in month_data.items()})
+        
+        # Детальная статистика по drop_rules и in_rules
+        for rules_key, title, row_prefix in (
+            ("dropped_by_rule", "Детальная статистика по drop_rules", "Удалено"),
+            ("kept_by_rule", "Детальная статистика по in_rules", "Оставлено"),
+        ):
+            if not all_rules[rules_key]:
+                continue
             
-            # Дополняем все строки до максимальной длины
-            summary_data_padded = [row + [""] * (max_cols - len(row)) for row in summary_data]
+            # ОПТИМИЗАЦИЯ: Значения правил раскладываются по месяцам за один проход по словарям правил
+            # ({правило: {месяц: количество}}) вместо проверки каждого правила в каждом месяце
+            rule_months: Dict[str, Dict[int, Any]] = {}
+            for m, d in month_data.items():
+                for rule, count in d[rules_key].items():
+                    rule_months.setdefault(rule, {})[m] = count
             
-            statistics_df = pd.DataFrame(summary_data_padded)
-        else:
-            statistics_df = pd.DataFrame([["Статистика недоступна", ""]])
-        
-        self.logger.info(f"Лист 'Статистика': Подготовлено {len(statistics_df)} строк статистики", "FileProcessor", "prepare_statistics_sheet")
-        self.logger.info("=== Завершена подготовка листа 'Статистика' ===", "FileProcessor", "prepare_statistics_sheet")
+            yield text_row("")  # Пустая строка
+            yield text_row(title)
+            yield STATISTICS_MONTH_HEADER
+            for rule in sorted(all_rules[rules_key]):
+                yield month_row(f"{row_prefix}: {rule}", rule_months.get(rule, {}))
         
-        # Выводим статистику в лог
-        self._log_statistics()
+        yield text_row("")  # Пустая строка для разделения
+    
+    def _iter_tab_selection_statistics_rows(self, group: str, file_names: List[str]) -> Iterator[Tuple[Any, ...]]:
+        """Таблица 4: статистика выбора табельных номеров группы по месяцам."""
+        month_row = self._statistics_month_row
+        group_tabs = self.statistics["tab_selection"][group]
+        
+        yield self._statistics_text_row(f"Статистика выбора табельных номеров - {group}")
+        
+        # Собираем данные по месяцам: {month: tab_stats}
+        month_data = {}
+        for file_name, month in self._get_month_map(file_names).items():
+            if month > 0:
+                month_data[month] = group_tabs[file_name]
+        
+        yield STATISTICS_MONTH_HEADER
+        yield month_row("Всего вариантов ТБ", {m: d.get("total_variants", 0) for m, d in month_data.items()})
+        yield month_row("Выбрано уникальных", {m: d.get("selected_count", 0) for m, d in month_data.items()})
+        yield month_row(
+            "Табельных с несколькими вариантами",
+            {m: d.get("variants_with_multiple", 0) for m, d in month_data.items()}
+        )
         
-        return statistics_df
+        yield self._statistics_text_row("")  # Пустая строка для разделения
     
-    def _log_statistics(self) -> None:
-        """Выводит статистику в лог."""
-        if not ENABLE_STATISTICS:
-            return
+    def _log_statistics(self, sorted_files: Optional[Dict[str, List[str]]] = None,
+                        sorted_tab_files: Optional[Dict[str, List[str]]] = None) -> None:
+        """
+        Выводит статистику в лог.
         
-        self.logger.info("=" * 80, "FileProcessor", "_log_statistics")
-        self.logger.info("СТАТИСТИКА ОБРАБОТКИ ДАННЫХ", "FileProcessor", "_log_statistics")
-        self.logger.info("=" * 80, "FileProcessor", "_log_statistics")
+        Args:
+            sorted_files: Отсортированные имена файлов по группам (если уже посчитаны в prepare_statistics_sheet)
+            sorted_tab_files: Отсортированные имена файлов статистики выбора табельных по группам
+        
+        Вызывается из prepare_statistics_sheet, который уже проверил ENABLE_STATISTICS - повторной проверки нет.
+        """
+        if sorted_files is None or sorted_tab_files is None:
+            sorted_files, sorted_tab_files = self._prepare_statistics_index()
+        
+        # ОПТИМИЗАЦИЯ: Отчет собирается списком строк и выводится несколькими многострочными сообщениями
+        # (по log_chunk_size строк) вместо отдельного вызова логгера на каждую строку
+        lines: List[str] = []
+        log_chunk_size = 100
+        # ОПТИМИЗАЦИЯ: Разделы статистики привязаны к локальным переменным - без цепочек self.statistics[...] в циклах
+        summary = self.statistics["summary"]
+        files_stats = self.statistics["files"]
+        tab_selection = self.statistics["tab_selection"]
+        
+        lines.append("=" * 80)
+        lines.append("СТАТИСТИКА ОБРАБОТКИ ДАННЫХ")
+        lines.append("=" * 80)
         
         # Общая статистика
-        self.logger.info(f"Всего обработано КМ (табельных номеров): {self.statistics['summary'].get('total_km', 0)}", "FileProcessor", "_log_statistics")
-        self.logger.info(f"Всего уникальных клиентов: {self.statistics['summary'].get('total_clients', 0)}", "FileProcessor", "_log_statistics")
+        lines.append(f"Всего обработано КМ (табельных номеров): {summary.get('total_km', 0)}")
+        lines.append(f"Всего уникальных клиентов: {summary.get('total_clients', 0)}")
         
         # Статистика по ТБ
-        if "by_tb" in self.statistics["summary"]:
-            self.logger.info("Количество КМ по ТБ:", "FileProcessor", "_log_statistics")
-            for tb, count in sorted(self.statistics["summary"]["by_tb"].items(), key=lambda x: x[1], reverse=True):
-                self.logger.info(f"  {tb}: {count}", "FileProcessor", "_log_statistics")
+        if "by_tb" in summary:
+            lines.append("Количество КМ по ТБ:")
+            for tb, count in sorted_by_value_desc(summary["by_tb"]):
+                lines.append(f"  {tb}: {count}")
         
         # Статистика по файлам
-        total_initial = 0
-        total_dropped = 0
-        total_final = 0
-        
-        for group in sorted(self.statistics["files"].keys()):
-            self.logger.info(f"Группа {group}:", "FileProcessor", "_log_statistics")
-            for file_name in sorted(self.statistics["files"][group].keys()):
-                file_stats = self.statistics["files"][group][file_name]
-                initial = file_stats.get("initial_rows", 0)
-                final = file_stats.get("final_rows", 0)
-                dropped_count = sum(file_stats.get("dropped_by_rule", {}).values())
-                
-                self.logger.info(f"  {file_name}: исходно {initial}, удалено {dropped_count}, итого {final}", "FileProcessor", "_log_statistics")
+        file_counts = []  # (исходно, удалено, итого) по каждому файлу
+        for group in sorted(sorted_files):
+            lines.append(f"Группа {group}:")
+            group_files = files_stats[group]
+            for file_name in sorted_files[group]:
+                file_stats = group_files[file_name]
+                initial = file_stats["initial_rows"]
+                final = file_stats["final_rows"]
+                dropped_count = file_stats["_dropped_total"]
                 
-                total_initial += initial
-                total_dropped += dropped_count
-                total_final += final
+                lines.append(f"  {file_name}: исходно {initial}, удалено {dropped_count}, итого {final}")
+                file_counts.append((initial, dropped_count, final))
         
-        self.logger.info(f"ИТОГО: исходно {total_initial}, удалено {total_dropped}, итого {total_final}", "FileProcessor", "_log_statistics")
+        # ОПТИМИЗАЦИЯ: Итоги считаются одной векторной суммой по колонкам вместо накопления в цикле
+        total_initial, total_dropped, total_final = (
+            np.array(file_counts, dtype=np.int64).reshape(-1, 3).sum(axis=0).tolist()
+        )
+        
+        lines.append(f"ИТОГО: исходно {total_initial}, удалено {total_dropped}, итого {total_final}")
         
         # Статистика выбора табельных
-        for group in sorted(self.statistics["tab_selection"].keys()):
-            self.logger.info(f"Выбор табельных номеров - группа {group}:", "FileProcessor", "_log_statistics")
-            for file_name in sorted(self.statistics["tab_selection"][group].keys()):
-                tab_stats = self.statistics["tab_selection"][group][file_name]
-                self.logger.info(
+        for group in sorted(sorted_tab_files):
+            lines.append(f"Выбор табельных номеров - группа {group}:")
+            group_tabs = tab_selection[group]
+            for file_name in sorted_tab_files[group]:
+                tab_stats = group_tabs[file_name]
+                lines.append(
                     f"  {file_name}: всего вариантов {tab_stats.get('total_variants', 0)}, "
                     f"выбрано {tab_stats.get('selected_count', 0)}, "
-                    f"с несколькими вариантами {tab_stats.get('variants_with_multiple', 0)}",
-                    "FileProcessor", "_log_statistics"
+                    f"с несколькими вариантами {tab_stats.get('variants_with_multiple', 0)}"
                 )
         
-        self.logger.info("=" * 80, "FileProcessor", "_log_statistics")
+        lines.append("=" * 80)
+        
+        log_info = self.logger.info
+        for start in range(0, len(lines), log_chunk_size):
+            log_info("\n".join(lines[start:start + log_chunk_size]), "FileProcessor", "_log_statistics")
 
 
 # ============================================================================
@@ -5085,6 +5363,15 @@ class FileProcessor:
 class ExcelFormatter:
     """Класс для форматирования Excel файлов с использованием только базовых модулей Anaconda."""
     
+    # Именованные стили ячеек данных: имя -> (формат числа, параметры выравнивания)
+    CELL_STYLES = {
+        "spod_tab": ("@", {"horizontal": "left", "vertical": "center", "wrap_text": True}),
+        "spod_text": ("General", {"horizontal": "left", "vertical": "center", "wrap_text": True}),
+        "spod_right": ("General", {"horizontal": "right", "vertical": "center"}),
+        "spod_number": ("#,##0.00", {"horizontal": "right", "vertical": "center"}),
+        "spod_rank": ("#,##0", {"horizontal": "right", "vertical": "center"}),
+    }
+    
     def __init__(self, logger_instance: Optional[Logger] = None):
         """
         Инициализация форматтера.
@@ -5094,6 +5381,12 @@ class ExcelFormatter:
         """
         self.min_width = 15
         self.max_width = 150
+        # Сколько первых строк данных учитывать при расчете ширины колонок
+        # (широкие значения дальше по листу все равно упираются в max_width)
+        self.width_sample_rows = 32
+        # Именованные стили CELL_STYLES, зарегистрированные в каждой книге (книга -> {имя: NamedStyle});
+        # слабые ссылки не удерживают книгу в памяти после сохранения файла
+        self._cell_styles_by_book = weakref.WeakKeyDictionary()
         self.logger = logger_instance
     
     def _calculate_column_width(self, df: pd.DataFrame, col_name: str) -> float:
@@ -5110,19 +5403,169 @@ class ExcelFormatter:
         if col_name not in df.columns:
             return self.min_width
         
-        # Максимальная длина в заголовке
-        max_length = len(str(col_name))
+        # Заголовок и первые width_sample_rows строк данных, с ограничениями min_width/max_width
+        return self._compute_widths(df[[col_name]])[0]
+    
+    def _compute_widths(self, df: pd.DataFrame) -> List[int]:
+        """
+        Вычисляет ширину всех колонок листа одним векторным проходом по DataFrame.
+        
+        Учитываются длина заголовка и длины значений в первых width_sample_rows строках
+        (пустые значения пропускаются), к результату применяются ограничения
+        min_width/max_width.
+        
+        Args:
+            df: DataFrame с данными листа
+            
+        Returns:
+            List[int]: Ширины колонок в порядке df.columns
+        """
+        header_lengths = df.columns.astype(str).str.len().to_numpy(dtype=np.int64)
+        sample = df.head(self.width_sample_rows)
+        data_lengths = np.zeros(len(df.columns), dtype=np.int64)
+        if len(sample) > 0:
+            # ОПТИМИЗАЦИЯ: Длины строк всей выборки считаются C-вызовом np.char.str_len.
+            # Числовые колонки (и текстовые, если в них только ASCII) переводятся в байтовые строки
+            # фиксированной ширины ('S'), для остальных - юникодные строки ('U')
+            text = sample.astype(str)
+            lengths = np.zeros(sample.shape, dtype=np.int64)
+            is_numeric = np.array([pd.api.types.is_numeric_dtype(dtype) for dtype in sample.dtypes], dtype=bool)
+            if is_numeric.any():
+                lengths[:, is_numeric] = np.char.str_len(text.iloc[:, is_numeric].to_numpy(dtype=object).astype("S"))
+            if not is_numeric.all():
+                other_text = text.iloc[:, ~is_numeric]
+                try:
+                    other_lengths = np.char.str_len(other_text.to_numpy(dtype=object).astype("S"))
+                except UnicodeEncodeError:
+                    other_lengths = np.char.str_len(other_text.to_numpy(dtype=object).astype(str))
+                lengths[:, ~is_numeric] = other_lengths
+            data_lengths = np.where(sample.notna().to_numpy(), lengths, 0).max(axis=0)
+        
+        max_lengths = np.maximum(header_lengths, data_lengths)
+        return np.clip(max_lengths + 2, self.min_width, self.max_width).tolist()
+    
+    def _register_cell_styles(self, wb) -> Dict[str, NamedStyle]:
+        """
+        Регистрирует в книге именованные стили ячеек данных (CELL_STYLES).
+        
+        Ячейкам назначается стиль по имени (cell.style = "spod_number") - одно присваивание
+        вместо отдельных number_format и alignment, все ячейки ссылаются на общие стили.
+        Повторный вызов для той же книги возвращает уже зарегистрированные стили.
         
-        # Максимальная длина в данных (первые 100 строк для производительности)
-        sample_size = min(100, len(df))
-        for idx in range(sample_size):
-            value = df[col_name].iloc[idx]
-            if pd.notna(value):
-                max_length = max(max_length, len(str(value)))
+        Args:
+            wb: Книга openpyxl
+            
+        Returns:
+            Dict[str, NamedStyle]: {имя стиля: NamedStyle, привязанный к книге}
+        """
+        cell_styles = self._cell_styles_by_book.get(wb)
+        if cell_styles is not None:
+            return cell_styles
+        
+        cell_styles = {}
+        for style_name, (number_format, alignment) in self.CELL_STYLES.items():
+            named_style = NamedStyle(
+                name=style_name,
+                font=DEFAULT_FONT,
+                border=DEFAULT_BORDER,
+                fill=DEFAULT_EMPTY_FILL,
+                number_format=number_format,
+                alignment=Alignment(**alignment),
+            )
+            # add_named_style привязывает стиль к книге (bind) - после этого as_tuple() содержит индексы книги
+            wb.add_named_style(named_style)
+            cell_styles[style_name] = named_style
+        self._cell_styles_by_book[wb] = cell_styles
+        return cell_styles
+    
+    def _cell_style_arrays(self, wb) -> Dict[str, Any]:
+        """
+        Возвращает готовые индексы стилей (StyleArray) именованных стилей CELL_STYLES книги.
         
-        # Применяем ограничения
-        width = max(self.min_width, min(max_length + 2, self.max_width))
-        return width
+        ОПТИМИЗАЦИЯ: Присваивание cell._style = copy(style_array) - это то, что делает openpyxl
+        внутри cell.style = "имя", но без поиска стиля по имени в коллекции книги для каждой ячейки.
+        
+        Args:
+            wb: Книга openpyxl (стили регистрируются при первом обращении)
+            
+        Returns:
+            Dict[str, Any]: {имя стиля: StyleArray}
+        """
+        return {style_name: named_style.as_tuple() for style_name, named_style in self._register_cell_styles(wb).items()}
+    
+    @staticmethod
+    def _dataframe_rows(df: pd.DataFrame) -> List[List[Any]]:
+        """
+        Переводит DataFrame в список строк из Python-объектов для прямой записи в Excel.
+        
+        Пустые значения (NaN/inf) заменяются на None: записанные как число, они
+        делают файл ошибочным для Excel.
+        
+        Args:
+            df: DataFrame с данными (index не включается)
+            
+        Returns:
+            List[List[Any]]: Строки данных без заголовка
+        """
+        # ОПТИМИЗАЦИЯ: Все строки переводятся в Python-объекты одним вызовом to_numpy(dtype=object).tolist()
+        # (быстрее itertuples/dataframe_to_rows на широких листах)
+        values = df.to_numpy(dtype=object)
+        
+        missing = df.isna().to_numpy()
+        numeric_positions = [i for i, dtype in enumerate(df.dtypes) if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)]
+        if numeric_positions:
+            missing[:, numeric_positions] |= np.isinf(df.iloc[:, numeric_positions].to_numpy(dtype=np.float64, na_value=np.nan))
+        if missing.any():
+            values[missing] = None
+        return values.tolist()
+    
+    @staticmethod
+    def _append_dataframe_rows(ws, df: pd.DataFrame) -> None:
+        """
+        Записывает DataFrame в лист openpyxl построчно через ws.append.
+        
+        В отличие от DataFrame.to_excel не создает промежуточные объекты ячеек pandas
+        (ExcelCell и словари стилей для каждой ячейки). Пустые значения (NaN/inf)
+        записываются как пустые ячейки, заголовок получает ту же рамку, что и у pandas.
+        
+        Args:
+            ws: Рабочий лист openpyxl
+            df: DataFrame с данными (index не записывается)
+        """
+        ws.append(list(df.columns))
+        for row in ExcelFormatter._dataframe_rows(df):
+            ws.append(row)
+        
+        # pandas оформляет заголовок тонкой рамкой - сохраняем тот же вид
+        thin_side = Side(style="thin")
+        header_border = Border(left=thin_side, right=thin_side, top=thin_side, bottom=thin_side)
+        for cell in ws[1]:
+            cell.border = header_border
+    
+    @staticmethod
+    def _numeric_cell_mask(column: pd.Series) -> np.ndarray:
+        """
+        Определяет по колонке DataFrame, какие ячейки будут записаны в Excel как числа.
+        
+        Для числовых dtype достаточно исключить NaN/inf (pandas пишет их как пустые/текстовые
+        значения), для object-колонок проверяется тип каждого значения: строки с цифрами
+        (например, коды ГОСБ) остаются текстом, как и в листе Excel.
+        
+        Args:
+            column: Колонка DataFrame
+            
+        Returns:
+            np.ndarray: Булева маска длины len(column)
+        """
+        if pd.api.types.is_bool_dtype(column):
+            return column.notna().to_numpy(dtype=bool)
+        if pd.api.types.is_numeric_dtype(column):
+            values = column.to_numpy(dtype=np.float64, na_value=np.nan)
+            return np.isfinite(values)
+        values = column.astype(object)
+        is_number = values.map(pd.api.types.is_number).to_numpy(dtype=bool)
+        numeric_values = pd.to_numeric(values.where(is_number), errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        return is_number & np.isfinite(numeric_values)
     
     def create_formatted_excel(self, raw_df: pd.DataFrame, summary_df: pd.DataFrame, calculated_df: pd.DataFrame, 
                               normalized_df: pd.DataFrame, places_df: pd.DataFrame, final_df: pd.DataFrame,
@@ -5154,7 +5597,9 @@ class ExcelFormatter:
         self.logger.info(f"Создание форматированного Excel файла {output_path}")
         
         # РАСШИРЕННОЕ ЛОГИРОВАНИЕ: Проверяем наличие базовых колонок во всех DataFrame перед сохранением
+        # ОПТИМИЗАЦИЯ: Подсчет заполненности ТБ выполняется только при уровне DEBUG (результат пишется только в debug)
         base_columns = ["Табельный", "ТБ", "ФИО"]
+        debug_enabled = self.logger.is_debug_enabled()
         
         for df_name, df in [("summary_df (Исходник)", summary_df), 
                             ("calculated_df (Расчет)", calculated_df),
@@ -5167,10 +5612,11 @@ class ExcelFormatter:
                     self.logger.error(f"КРИТИЧЕСКАЯ ОШИБКА: В {df_name} отсутствуют базовые колонки: {missing_cols}. Доступные колонки: {list(df.columns)[:20]}", "ExcelFormatter", "create_formatted_excel")
                 else:
                     self.logger.debug(f"Проверка {df_name}: все базовые колонки присутствуют. Размер: {len(df)} строк x {len(df.columns)} колонок", "ExcelFormatter", "create_formatted_excel")
-                    # Проверяем заполненность
-                    if "ТБ" in df.columns:
-                        non_empty = df["ТБ"].notna() & (df["ТБ"] != "")
-                        self.logger.debug(f"Заполненность ТБ в {df_name}: {non_empty.sum()}/{len(df)} строк", "ExcelFormatter", "create_formatted_excel")
+                    # Проверяем заполненность (полный проход по колонке - только при включенном DEBUG)
+                    if debug_enabled and "ТБ" in df.columns:
+                        tb_values = df["ТБ"].to_numpy(dtype=object)
+                        non_empty_count = int(np.count_nonzero(pd.notna(tb_values) & (tb_values != "")))
+                        self.logger.debug(f"Заполненность ТБ в {df_name}: {non_empty_count}/{len(df)} строк", "ExcelFormatter", "create_formatted_excel")
         
         try:
             if OPENPYXL_AVAILABLE:
@@ -5179,75 +5625,79 @@ class ExcelFormatter:
             else:
                 # Используем pandas ExcelWriter без форматирования
                 self.logger.warning("openpyxl недоступен, создается файл без форматирования", "ExcelFormatter", "create_formatted_excel")
-                # Разбиваем raw_df на чанки (если больше 900 000 строк)
-                raw_chunks = self._split_raw_df(raw_df, chunk_size=900_000)
-                # Пробуем использовать доступный engine
-                try:
-                    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-                        # Сохраняем все чанки RAW
-                        for sheet_name, chunk_df in raw_chunks:
-                            if len(chunk_df) > 0:
-                                chunk_df.to_excel(writer, sheet_name=sheet_name, index=False)
-                        summary_df.to_excel(writer, sheet_name="Исходник", index=False)
-                        calculated_df.to_excel(writer, sheet_name="Расчет", index=False)
-                        normalized_df.to_excel(writer, sheet_name="Нормализация", index=False)
-                        places_df.to_excel(writer, sheet_name="Места и выбор", index=False)
-                        final_df.to_excel(writer, sheet_name="Итог", index=False)
-                        if statistics_df is not None:
-                            statistics_df.to_excel(writer, sheet_name="Статистика", index=False, header=False)
-                except Exception as e:
-                    try:
-                        with pd.ExcelWriter(output_path) as writer:
-                            # Сохраняем все чанки RAW
-                            for sheet_name, chunk_df in raw_chunks:
-                                if len(chunk_df) > 0:
-                                    chunk_df.to_excel(writer, sheet_name=sheet_name, index=False)
-                            summary_df.to_excel(writer, sheet_name="Исходник", index=False)
-                            calculated_df.to_excel(writer, sheet_name="Расчет", index=False)
-                            normalized_df.to_excel(writer, sheet_name="Нормализация", index=False)
-                            places_df.to_excel(writer, sheet_name="Места и выбор", index=False)
-                            final_df.to_excel(writer, sheet_name="Итог", index=False)
-                            if statistics_df is not None:
-                                statistics_df.to_excel(writer, sheet_name="Статистика", index=False, header=False)
-                    except Exception:
-                        # Если не получилось, используем любой доступный engine
-                        with pd.ExcelWriter(output_path) as writer:
-                            # Сохраняем все чанки RAW
-                            for sheet_name, chunk_df in raw_chunks:
-                                if len(chunk_df) > 0:
-                                    chunk_df.to_excel(writer, sheet_name=sheet_name, index=False)
-                            summary_df.to_excel(writer, sheet_name="Исходник", index=False)
-                            calculated_df.to_excel(writer, sheet_name="Расчет", index=False)
-                            normalized_df.to_excel(writer, sheet_name="Нормализация", index=False)
-                            places_df.to_excel(writer, sheet_name="Места и выбор", index=False)
-                            final_df.to_excel(writer, sheet_name="Итог", index=False)
-                            if statistics_df is not None:
-                                statistics_df.to_excel(writer, sheet_name="Статистика", index=False, header=False)
+                # Пробуем engine openpyxl, затем любой доступный engine
+                self._write_unformatted_excel(output_path, raw_df, summary_df, calculated_df, normalized_df, places_df, final_df,
+                                              statistics_df, engines=("openpyxl", None))
                 self.logger.info(f"Файл {output_path} создан без форматирования", "ExcelFormatter", "create_formatted_excel")
             
         except Exception as e:
             self.logger.error(f"Ошибка при создании Excel файла {output_path}: {str(e)}", "ExcelFormatter", "create_formatted_excel")
-            # Разбиваем raw_df на чанки (если больше 900 000 строк) для fallback режима
-            raw_chunks = self._split_raw_df(raw_df, chunk_size=900_000)
             # Пробуем создать без форматирования
             try:
-                with pd.ExcelWriter(output_path) as writer:
-                    # Сохраняем все чанки RAW
-                    for sheet_name, chunk_df in raw_chunks:
-                        if len(chunk_df) > 0:
-                            chunk_df.to_excel(writer, sheet_name=sheet_name, index=False)
-                    summary_df.to_excel(writer, sheet_name="Исходник", index=False)
-                    calculated_df.to_excel(writer, sheet_name="Расчет", index=False)
-                    normalized_df.to_excel(writer, sheet_name="Нормализация", index=False)
-                    places_df.to_excel(writer, sheet_name="Места и выбор", index=False)
-                    final_df.to_excel(writer, sheet_name="Итог", index=False)
-                    if statistics_df is not None:
-                        statistics_df.to_excel(writer, sheet_name="Статистика", index=False, header=False)
+                self._write_unformatted_excel(output_path, raw_df, summary_df, calculated_df, normalized_df, places_df, final_df, statistics_df)
                 self.logger.warning(f"Файл создан без форматирования из-за ошибки: {str(e)}", "ExcelFormatter", "create_formatted_excel")
             except Exception as e2:
                 self.logger.error(f"Критическая ошибка при создании файла: {str(e2)}", "ExcelFormatter", "create_formatted_excel")
                 raise
     
+    def _write_unformatted_excel(self, output_path: str, raw_df: pd.DataFrame, summary_df: pd.DataFrame, calculated_df: pd.DataFrame,
+                                 normalized_df: pd.DataFrame, places_df: pd.DataFrame, final_df: pd.DataFrame,
+                                 statistics_df: Optional[pd.DataFrame] = None, engines: Tuple[Optional[str], ...] = (None,)) -> None:
+        """
+        Записывает все листы в Excel без форматирования (резервный режим).
+        
+        Если установлен pyexcelerate (PYEXCELERATE_AVAILABLE), файл сначала пишется им - он формирует XML
+        листов напрямую, без объектов ячеек openpyxl. При ошибке engine ExcelWriter перебираются по порядку
+        до первой успешной записи (None - engine pandas по умолчанию); файл пишется один раз на каждую попытку.
+        
+        Args:
+            output_path: Путь для сохранения файла
+            raw_df: DataFrame с сырыми данными (разбивается на листы RAW, RAW_2, ...)
+            summary_df: DataFrame с исходными данными
+            calculated_df: DataFrame с расчетными данными
+            normalized_df: DataFrame с нормализованными данными
+            places_df: DataFrame с Score и рангами
+            final_df: DataFrame с итоговыми данными
+            statistics_df: DataFrame со статистикой (опционально, пишется без заголовка)
+            engines: Engine ExcelWriter в порядке попыток
+        """
+        # Разбиваем raw_df на чанки (если больше 900 000 строк)
+        sheets = [(sheet_name, chunk_df, True) for sheet_name, chunk_df in self._split_raw_df(raw_df, chunk_size=900_000) if len(chunk_df) > 0]
+        sheets.extend([
+            ("Исходник", summary_df, True),
+            ("Расчет", calculated_df, True),
+            ("Нормализация", normalized_df, True),
+            ("Места и выбор", places_df, True),
+            ("Итог", final_df, True),
+        ])
+        if statistics_df is not None:
+            sheets.append(("Статистика", statistics_df, False))
+        
+        if PYEXCELERATE_AVAILABLE:
+            try:
+                workbook = pyexcelerate.Workbook()
+                for sheet_name, df, header in sheets:
+                    rows = self._dataframe_rows(df)
+                    if header:
+                        rows.insert(0, list(df.columns))
+                    workbook.new_sheet(sheet_name, data=rows)
+                workbook.save(output_path)
+                return
+            except Exception as error:
+                self.logger.warning(f"Не удалось записать файл через pyexcelerate: {str(error)}", "ExcelFormatter", "_write_unformatted_excel")
+        
+        last_error = None
+        for engine in engines:
+            try:
+                with pd.ExcelWriter(output_path, **({"engine": engine} if engine else {})) as writer:
+                    for sheet_name, df, header in sheets:
+                        df.to_excel(writer, sheet_name=sheet_name, index=False, header=header)
+                return
+            except Exception as error:
+                last_error = error
+                self.logger.warning(f"Не удалось записать файл без форматирования (engine={engine or 'по умолчанию'}): {str(error)}", "ExcelFormatter", "_write_unformatted_excel")
+        raise last_error
+    
     def _split_raw_df(self, raw_df: pd.DataFrame, chunk_size: int = 900_000) -> list[tuple[str, pd.DataFrame]]:
         """
         Разбивает raw_df на несколько чанков для сохранения в отдельные листы Excel.
@@ -5282,7 +5732,9 @@ class ExcelFormatter:
             for i in range(num_chunks):
                 start_idx = i * chunk_size
                 end_idx = min((i + 1) * chunk_size, total_rows)
-                chunk_df = raw_df.iloc[start_idx:end_idx].copy()
+                # ОПТИМИЗАЦИЯ: Чанк - срез без копирования: листы RAW только читаются при записи,
+                # поэтому вторая полная копия RAW в памяти не нужна
+                chunk_df = raw_df.iloc[start_idx:end_idx]
                 
                 if i == 0:
                     sheet_name = "RAW"
@@ -5428,7 +5880,7 @@ class ExcelFormatter:
                     tb_variants = file_data.get("tb_variants", {})
                     if len(tb_variants) > 1:
                         source_rows.append(["", "", "", "Варианты ТБ:", "", "", "", ""])
-                        for tb, sum_val in sorted(tb_variants.items(), key=lambda x: x[1], reverse=True):
+                        for tb, sum_val in sorted_by_value_desc(tb_variants):
                             source_rows.append([
                                 "", "", "",
                                 tb,
@@ -5578,6 +6030,10 @@ class ExcelFormatter:
         """
         Создает Excel файл с форматированием используя openpyxl.
         
+        Данные записываются и форматируются в одной книге в памяти, файл сохраняется один раз.
+        ВАЖНО: Скорость сохранения сильно зависит от наличия lxml (LXML_AVAILABLE) - openpyxl автоматически
+        пишет XML через lxml, если он установлен. Без lxml используется медленный xml.etree.
+        
         Args:
             raw_df: DataFrame с сырыми данными (может быть разбит на несколько листов)
             summary_df: DataFrame с исходными данными
@@ -5589,6 +6045,8 @@ class ExcelFormatter:
             statistics_df: DataFrame со статистикой (опционально)
         """
         self.logger.info("Использование openpyxl для форматирования")
+        if not LXML_AVAILABLE:
+            self.logger.warning("lxml не установлен: openpyxl сохраняет XML через xml.etree (медленнее). Рекомендуется установить lxml", "ExcelFormatter", "_create_with_openpyxl")
         self.logger.info(f"Режим форматирования: {FORMATTING_MODE} (full=полное, off=выключено, simple=упрощенное)", "ExcelFormatter", "_create_with_openpyxl")
         
         # Разбиваем raw_df на чанки (если больше 900 000 строк) только если RAW листы включены
@@ -5599,15 +6057,22 @@ class ExcelFormatter:
             raw_chunks = []
             self.logger.info("RAW листы отключены (ENABLE_RAW_SHEETS=False), они не будут созданы", "ExcelFormatter", "_create_with_openpyxl")
         
-        # Сначала сохраняем DataFrame в Excel через pandas
+        # Сначала записываем DataFrame в книгу через pandas
         from time import time as time_func
         save_start_time = time_func()
         last_log_time = save_start_time
         LOG_INTERVAL = 15  # Логируем прогресс каждые 15 секунд для большей видимости
         
-        self.logger.info("Сохранение данных в Excel...")
-        try:
-            with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+        # ОПТИМИЗАЦИЯ: Данные пишутся в книгу openpyxl в памяти (writer.book), форматирование применяется к ней же,
+        # и файл сериализуется один раз при writer.close(). Промежуточное сохранение через pandas и повторная
+        # загрузка файла через load_workbook (лишний проход записи XML и полный разбор файла) больше не нужны.
+        self.logger.info("Запись данных в книгу Excel...")
+        # ВАЖНО: Файл открывается контекстным менеджером, а writer пишет в уже открытый поток - при любой ошибке
+        # записи или форматирования дескриптор закрывается без сериализации недописанной книги, и fallback в
+        # create_formatted_excel может перезаписать тот же output_path (на Windows открытый файл заблокирован)
+        with open(output_path, "wb") as output_file:
+            writer = pd.ExcelWriter(output_file, engine='openpyxl')
+            try:
                 # Сохраняем все чанки RAW (только если включены)
                 total_raw_chunks = len(raw_chunks)
                 for chunk_idx, (sheet_name, chunk_df) in enumerate(raw_chunks, 1):
@@ -5645,7 +6110,9 @@ class ExcelFormatter:
                         progress_thread.start()
                         
                         try:
-                            chunk_df.to_excel(writer, sheet_name=sheet_name, index=False)
+                            # ОПТИМИЗАЦИЯ: Крупные RAW листы пишутся напрямую в книгу через ws.append,
+                            # минуя построение объектов ячеек pandas в to_excel
+                            self._append_dataframe_rows(writer.book.create_sheet(sheet_name), chunk_df)
                         except KeyboardInterrupt:
                             save_logging_active.clear()
                             self.logger.warning(f"Прерывание при сохранении листа '{sheet_name}'", "ExcelFormatter", "_create_with_openpyxl")
@@ -5712,116 +6179,227 @@ class ExcelFormatter:
                         elapsed = current_time - save_start_time
                         self.logger.info(f"Сохранен лист '{sheet_name}' ({sheet_idx}/{len(other_sheets)}) (прошло {elapsed:.0f} сек)")
                         last_log_time = current_time
-        except KeyboardInterrupt:
-            self.logger.warning("Прерывание при сохранении данных в Excel", "ExcelFormatter", "_create_with_openpyxl")
-            raise
-        
-        save_elapsed = time_func() - save_start_time
-        self.logger.info(f"Данные сохранены в Excel за {save_elapsed:.0f} секунд")
-        
-        # Теперь форматируем файл
-        self.logger.info("Начало форматирования Excel файла...")
-        try:
-            wb = load_workbook(output_path)
-        except KeyboardInterrupt:
-            self.logger.warning("Прерывание при загрузке Excel файла для форматирования", "ExcelFormatter", "_create_with_openpyxl")
-            raise
-        
-        # Форматируем все листы
-        # Собираем все листы RAW для форматирования (только если включены)
-        sheet_data = {}
-        if ENABLE_RAW_SHEETS:
-            for sheet_name, chunk_df in raw_chunks:
-                sheet_data[sheet_name] = chunk_df
-        
-        # Добавляем остальные листы
-        sheet_data.update({
-            "Исходник": summary_df,
-            "Расчет": calculated_df,
-            "Нормализация": normalized_df,
-            "Места и выбор": places_df,
-            "Итог": final_df
-        })
-        
-        if statistics_df is not None:
-            sheet_data["Статистика"] = statistics_df
-        
-        # Добавляем детальные листы для форматирования (если есть)
-        debug_tab_sheets = []
-        if debug_tracker and len(debug_tracker.get_all_tab_numbers()) > 0:
-            for tab_number in debug_tracker.get_all_tab_numbers():
-                sheet_name = f"Детально_{tab_number}"
-                if len(sheet_name) > 31:
-                    sheet_name = f"Дет_{tab_number[-8:]}"
-                if sheet_name in wb.sheetnames:
-                    debug_tab_sheets.append(sheet_name)
-        
-        total_sheets = len(sheet_data)
-        from time import time
-        format_start_time = time()
-        last_progress_time = format_start_time
-        PROGRESS_INTERVAL = 30  # Логируем прогресс каждые 30 секунд (максимум раз в минуту)
-        
-        try:
-            for sheet_idx, (sheet_name, df) in enumerate(sheet_data.items(), 1):
-                if sheet_name not in wb.sheetnames:
-                    continue
+            except KeyboardInterrupt:
+                self.logger.warning("Прерывание при сохранении данных в Excel", "ExcelFormatter", "_create_with_openpyxl")
+                raise
+            
+            save_elapsed = time_func() - save_start_time
+            self.logger.info(f"Данные записаны в книгу Excel за {save_elapsed:.0f} секунд")
+            
+            # Теперь форматируем книгу в памяти (без повторной загрузки файла)
+            self.logger.info("Начало форматирования Excel файла...")
+            wb = writer.book
+            self._register_cell_styles(wb)
+            
+            # Форматируем все листы
+            # Собираем все листы RAW для форматирования (только если включены)
+            sheet_data = {}
+            if ENABLE_RAW_SHEETS:
+                for sheet_name, chunk_df in raw_chunks:
+                    sheet_data[sheet_name] = chunk_df
+            
+            # Добавляем остальные листы
+            sheet_data.update({
+                "Исходник": summary_df,
+                "Расчет": calculated_df,
+                "Нормализация": normalized_df,
+                "Места и выбор": places_df,
+                "Итог": final_df
+            })
+            
+            if statistics_df is not None:
+                sheet_data["Статистика"] = statistics_df
+            
+            # Добавляем детальные листы для форматирования (если есть)
+            debug_tab_sheets = []
+            if debug_tracker and len(debug_tracker.get_all_tab_numbers()) > 0:
+                for tab_number in debug_tracker.get_all_tab_numbers():
+                    sheet_name = f"Детально_{tab_number}"
+                    if len(sheet_name) > 31:
+                        sheet_name = f"Дет_{tab_number[-8:]}"
+                    if sheet_name in wb.sheetnames:
+                        debug_tab_sheets.append(sheet_name)
+            
+            total_sheets = len(sheet_data)
+            from time import time
+            format_start_time = time()
+            last_progress_time = format_start_time
+            PROGRESS_INTERVAL = 30  # Логируем прогресс каждые 30 секунд (максимум раз в минуту)
+            
+            # ОПТИМИЗАЦИЯ: Листы независимы - ширины колонок и маски «число» (зависят только от DataFrame)
+            # считаются в пуле потоков заранее, пока основной поток форматирует ячейки предыдущих листов.
+            # Сама книга openpyxl не потокобезопасна, поэтому работа с ячейками остается последовательной.
+            prepare_executor = ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(sheet_data))))
+            prepare_futures = {}
+            if FORMATTING_MODE != "off":
+                for sheet_name, df in sheet_data.items():
+                    if sheet_name != "Статистика" and sheet_name in wb.sheetnames:
+                        prepare_futures[sheet_name] = prepare_executor.submit(self._prepare_sheet_formatting, df, sheet_name)
+            
+            try:
+                for sheet_idx, (sheet_name, df) in enumerate(sheet_data.items(), 1):
+                    if sheet_name not in wb.sheetnames:
+                        continue
+                    
+                    # ВСЕГДА логируем начало форматирования каждого листа
+                    current_time = time()
+                    elapsed = current_time - format_start_time
+                    total_rows = len(df)
+                    self.logger.info(f"Начало форматирования листа '{sheet_name}' ({sheet_idx}/{total_sheets}, {total_rows} строк)... (прошло {elapsed:.0f} сек)")
+                    last_progress_time = current_time
+                    
+                    try:
+                        ws = wb[sheet_name]
+                        if FORMATTING_MODE == "off":
+                            # Форматирование выключено - форматируем только ТН и ИНН
+                            self._format_sheet_minimal(ws, df, sheet_name)
+                        elif sheet_name == "Статистика":
+                            # Для листа статистики используем специальное форматирование
+                            self._format_statistics_sheet_openpyxl(ws, df)
+                        elif sheet_name.startswith("RAW"):
+                            # Для всех листов RAW (RAW, RAW_2, RAW_3 и т.д.) используем стандартное форматирование
+                            self._format_sheet_openpyxl(ws, df, sheet_name, sheet_idx, total_sheets, prepare_futures[sheet_name].result())
+                        else:
+                            self._format_sheet_openpyxl(ws, df, sheet_name, sheet_idx, total_sheets, prepare_futures[sheet_name].result())
+                    except KeyboardInterrupt:
+                        self.logger.warning(f"Прерывание при форматировании листа '{sheet_name}'", "ExcelFormatter", "_create_with_openpyxl")
+                        raise
+                    
+                    # ВСЕГДА логируем завершение форматирования каждого листа
+                    current_time = time()
+                    elapsed = current_time - format_start_time
+                    sheet_elapsed = current_time - last_progress_time
+                    self.logger.info(f"Завершено форматирование листа '{sheet_name}' ({sheet_idx}/{total_sheets}) за {sheet_elapsed:.0f} сек (всего прошло {elapsed:.0f} сек)")
+                    last_progress_time = current_time
                 
-                # ВСЕГДА логируем начало форматирования каждого листа
-                current_time = time()
-                elapsed = current_time - format_start_time
-                total_rows = len(df)
-                self.logger.info(f"Начало форматирования листа '{sheet_name}' ({sheet_idx}/{total_sheets}, {total_rows} строк)... (прошло {elapsed:.0f} сек)")
-                last_progress_time = current_time
+                # Форматируем детальные листы
+                for debug_sheet_name in debug_tab_sheets:
+                    if debug_sheet_name in wb.sheetnames:
+                        try:
+                            ws = wb[debug_sheet_name]
+                            self._format_debug_tab_sheet(ws, debug_sheet_name)
+                        except KeyboardInterrupt:
+                            self.logger.warning(f"Прерывание при форматировании детального листа '{debug_sheet_name}'", "ExcelFormatter", "_create_with_openpyxl")
+                            raise
                 
+                # Сохраняем файл
+                format_elapsed = time() - format_start_time
+                self.logger.info(f"Сохранение форматированного файла... (форматирование заняло {format_elapsed:.0f} сек)")
                 try:
-                    ws = wb[sheet_name]
-                    if FORMATTING_MODE == "off":
-                        # Форматирование выключено - форматируем только ТН и ИНН
-                        self._format_sheet_minimal(ws, df, sheet_name)
-                    elif sheet_name == "Статистика":
-                        # Для листа статистики используем специальное форматирование
-                        self._format_statistics_sheet_openpyxl(ws, df)
-                    elif sheet_name.startswith("RAW"):
-                        # Для всех листов RAW (RAW, RAW_2, RAW_3 и т.д.) используем стандартное форматирование
-                        self._format_sheet_openpyxl(ws, df, sheet_name, sheet_idx, total_sheets)
-                    else:
-                        self._format_sheet_openpyxl(ws, df, sheet_name, sheet_idx, total_sheets)
+                    # Единственная сериализация книги в файл
+                    writer.close()
                 except KeyboardInterrupt:
-                    self.logger.warning(f"Прерывание при форматировании листа '{sheet_name}'", "ExcelFormatter", "_create_with_openpyxl")
+                    self.logger.warning("Прерывание при сохранении форматированного файла", "ExcelFormatter", "_create_with_openpyxl")
                     raise
-                
-                # ВСЕГДА логируем завершение форматирования каждого листа
-                current_time = time()
-                elapsed = current_time - format_start_time
-                sheet_elapsed = current_time - last_progress_time
-                self.logger.info(f"Завершено форматирование листа '{sheet_name}' ({sheet_idx}/{total_sheets}) за {sheet_elapsed:.0f} сек (всего прошло {elapsed:.0f} сек)")
-                last_progress_time = current_time
-            
-            # Форматируем детальные листы
-            for debug_sheet_name in debug_tab_sheets:
-                if debug_sheet_name in wb.sheetnames:
-                    try:
-                        ws = wb[debug_sheet_name]
-                        self._format_debug_tab_sheet(ws, debug_sheet_name)
-                    except KeyboardInterrupt:
-                        self.logger.warning(f"Прерывание при форматировании детального листа '{debug_sheet_name}'", "ExcelFormatter", "_create_with_openpyxl")
-                        raise
-            
-            # Сохраняем файл
-            format_elapsed = time() - format_start_time
-            self.logger.info(f"Сохранение форматированного файла... (форматирование заняло {format_elapsed:.0f} сек)")
-            try:
-                wb.save(output_path)
             except KeyboardInterrupt:
-                self.logger.warning("Прерывание при сохранении форматированного файла", "ExcelFormatter", "_create_with_openpyxl")
+                self.logger.warning("Прерывание при форматировании Excel файла", "ExcelFormatter", "_create_with_openpyxl")
                 raise
-        except KeyboardInterrupt:
-            self.logger.warning("Прерывание при форматировании Excel файла", "ExcelFormatter", "_create_with_openpyxl")
-            raise
+            finally:
+                prepare_executor.shutdown(wait=False, cancel_futures=True)
         self.logger.info(f"Файл {output_path} успешно создан с форматированием (openpyxl)")
     
-    def _format_sheet_openpyxl(self, ws, df: pd.DataFrame, sheet_name: str = "", sheet_idx: int = 0, total_sheets: int = 0) -> None:
+    @staticmethod
+    @lru_cache(maxsize=16)
+    def _classify_columns(columns: Tuple[Any, ...]) -> Tuple[str, ...]:
+        """
+        Определяет тип форматирования каждой колонки листа по ее заголовку.
+        
+        Результат кэшируется по кортежу заголовков: листы «Исходник», «Расчет» и т.д.
+        повторяют один и тот же набор колонок между запусками форматирования.
+        
+        Args:
+            columns: Заголовки колонок листа
+            
+        Returns:
+            Tuple[str, ...]: Типы колонок (tab, inn, text, inn_count, score, norm, rank, number)
+        """
+        # Определяем базовые колонки (текстовые)
+        base_columns = ["Табельный", "ТБ", "ФИО"]
+        
+        col_types = []
+        for col_name in columns:
+            if col_name == "Табельный":
+                col_types.append("tab")
+            elif col_name == "ИНН":
+                col_types.append("inn")
+            elif col_name in base_columns:
+                col_types.append("text")
+            elif col_name == "Количество уникальных ИНН":
+                # Целое число с разделителем разрядов без дробной части
+                col_types.append("inn_count")
+            elif col_name and col_name.startswith("Score"):
+                col_types.append("score")
+            elif col_name and "_norm" in col_name:
+                col_types.append("norm")
+            elif col_name and col_name.startswith("Место"):
+                col_types.append("rank")
+            elif col_name == "Лучший месяц":
+                col_types.append("text")
+            else:
+                col_types.append("number")
+        return tuple(col_types)
+    
+    def _prepare_sheet_formatting(self, df: pd.DataFrame, sheet_name: str) -> Tuple[List[int], List[Tuple[int, Optional[str], str, Optional[List[bool]]]]]:
+        """
+        Готовит данные для форматирования листа, которые зависят только от DataFrame.
+        
+        Не обращается к книге openpyxl, поэтому может выполняться в отдельном потоке
+        параллельно с форматированием других листов.
+        
+        Args:
+            df: DataFrame с данными листа
+            sheet_name: Имя листа (для RAW листов план форматирования ячеек не строится)
+            
+        Returns:
+            Tuple: (ширины колонок, план форматирования ячеек по колонкам)
+        """
+        widths = self._compute_widths(df)
+        if sheet_name.startswith("RAW") or len(df) == 0:
+            return widths, []
+        
+        simple_format_columns = ["Табельный", "ТБ", "ФИО", "ИНН", "ГОСБ"]  # Колонки для упрощенного форматирования
+        
+        # Именованные стили из CELL_STYLES (регистрируются в книге в _create_with_openpyxl):
+        # spod_number - разделитель разрядов и два знака после запятой,
+        # spod_rank - целое число с разделителем разрядов (без дробной части),
+        # spod_tab - текстовый формат для сохранения лидирующих нулей
+        
+        # ОПТИМИЗАЦИЯ: Типы колонок определяются по заголовкам DataFrame и кэшируются по набору колонок
+        col_types = dict(enumerate(self._classify_columns(tuple(df.columns)), start=1))
+        
+        # ОПТИМИЗАЦИЯ: План форматирования строится один раз на колонку:
+        # (номер колонки, стиль для чисел или None, стиль для прочих ячеек, маска «число» или None).
+        # Проверки режима и типа колонки вынесены из цикла по ячейкам, а признак «число»
+        # берется из маски по dtype колонки DataFrame вместо isinstance/pd.notna для каждой ячейки.
+        col_plan = []
+        for col_idx, col_type in col_types.items():
+            col_name = df.columns[col_idx - 1]
+            
+            # ТН и ИНН всегда форматируются (независимо от режима)
+            if col_type == "tab" or col_type == "inn":
+                col_plan.append((col_idx, None, "spod_tab", None))
+                continue
+            if FORMATTING_MODE == "off":
+                # В режиме выключено не форматируем остальные колонки
+                continue
+            if FORMATTING_MODE == "simple" and col_name not in simple_format_columns:
+                # В упрощенном режиме форматируем только ТН, ИНН, ФИО, ТБ, ГОСБ
+                continue
+            
+            if col_type == "text":
+                col_plan.append((col_idx, None, "spod_text", None))
+            elif col_type == "score" or col_type == "norm":
+                col_plan.append((col_idx, "spod_number", "spod_right", self._numeric_cell_mask(df.iloc[:, col_idx - 1]).tolist()))
+            elif col_type == "rank" or col_type == "inn_count":
+                # Ранги и количество уникальных ИНН: целое число с разделителем разрядов
+                col_plan.append((col_idx, "spod_rank", "spod_right", self._numeric_cell_mask(df.iloc[:, col_idx - 1]).tolist()))
+            else:  # number
+                col_plan.append((col_idx, "spod_number", "spod_text", self._numeric_cell_mask(df.iloc[:, col_idx - 1]).tolist()))
+        
+        return widths, col_plan
+    
+    def _format_sheet_openpyxl(self, ws, df: pd.DataFrame, sheet_name: str = "", sheet_idx: int = 0, total_sheets: int = 0,
+                               prepared: Optional[Tuple[List[int], List[Tuple[int, Optional[str], str, Optional[List[bool]]]]]] = None) -> None:
         """
         Форматирует лист Excel используя openpyxl (оптимизированная версия).
         
@@ -5831,6 +6409,7 @@ class ExcelFormatter:
             sheet_name: Имя листа (для логирования)
             sheet_idx: Номер листа (для логирования)
             total_sheets: Всего листов (для логирования)
+            prepared: Результат _prepare_sheet_formatting (если уже подготовлен заранее)
         """
         from time import time
         format_sheet_start_time = time()
@@ -5859,26 +6438,15 @@ class ExcelFormatter:
         
         self.logger.debug(f"Заголовки отформатированы для '{sheet_name}'", "ExcelFormatter", "_format_sheet_openpyxl")
         
-        # ОПТИМИЗАЦИЯ: Настраиваем ширину колонок
+        if prepared is None:
+            prepared = self._prepare_sheet_formatting(df, sheet_name)
+        widths, col_plan = prepared
+        
+        # ОПТИМИЗАЦИЯ: Настраиваем ширину колонок по самому DataFrame (векторно, первые width_sample_rows строк)
+        # без обхода ячеек листа через iter_cols/iter_rows
         self.logger.debug(f"Настройка ширины колонок для '{sheet_name}' ({total_cols} колонок)", "ExcelFormatter", "_format_sheet_openpyxl")
-        for col_idx, column in enumerate(ws.iter_cols(min_row=1, max_row=1), start=1):
-            col_letter = get_column_letter(col_idx)
-            
-            # Вычисляем оптимальную ширину на основе содержимого
-            max_length = 0
-            for cell in column:
-                if cell.value:
-                    max_length = max(max_length, len(str(cell.value)))
-            
-            # Учитываем содержимое всех ячеек в колонке (первые 100 строк для производительности)
-            for row in ws.iter_rows(min_row=2, max_row=min(102, ws.max_row), min_col=col_idx, max_col=col_idx):
-                for cell in row:
-                    if cell.value:
-                        max_length = max(max_length, len(str(cell.value)))
-            
-            # Применяем ограничения
-            width = max(self.min_width, min(max_length + 2, self.max_width))
-            ws.column_dimensions[col_letter].width = width
+        for col_idx, width in enumerate(widths, start=1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = width
             
             # Логируем прогресс для больших листов каждые 15 секунд
             if total_cols > 20 and col_idx % 10 == 0:
@@ -5890,129 +6458,44 @@ class ExcelFormatter:
         
         self.logger.debug(f"Ширина колонок настроена для '{sheet_name}'", "ExcelFormatter", "_format_sheet_openpyxl")
         
-        # ОПТИМИЗАЦИЯ: Настраиваем выравнивание и форматирование для всех ячеек (батчами)
-        # Определяем базовые колонки (текстовые)
-        base_columns = ["Табельный", "ТБ", "ФИО"]
-        simple_format_columns = ["Табельный", "ТБ", "ФИО", "ИНН", "ГОСБ"]  # Колонки для упрощенного форматирования
-        
-        # Формат для чисел: разделитель разрядов и два знака после запятой
-        number_format = "#,##0.00"
-        # Формат для рангов: целое число с разделителем разрядов (без дробной части)
-        rank_format = "#,##0"
-        # Текстовый формат для сохранения лидирующих нулей
-        text_format = "@"
+        # ОПТИМИЗАЦИЯ: Для всех RAW листов используем упрощенное форматирование (только заголовки)
+        # Это значительно ускоряет форматирование для больших листов (с 44 минут до ~1 минуты).
+        # Типы колонок и план форматирования ячеек для RAW не строятся вовсе - числа остаются в формате Excel по умолчанию
+        if sheet_name.startswith("RAW"):
+            self.logger.info(f"Форматирование листа '{sheet_name}': упрощенный режим (только заголовки, {total_rows} строк)")
+            ws.auto_filter.ref = ws.dimensions
+            return
         
-        # Создаем объекты выравнивания один раз (переиспользуем)
-        align_left = Alignment(horizontal="left", vertical="center", wrap_text=True)
-        align_right = Alignment(horizontal="right", vertical="center")
+        # Для остальных листов: полное форматирование
+        if total_rows == 0:
+            ws.auto_filter.ref = ws.dimensions
+            return
         
-        # ОПТИМИЗАЦИЯ: Определяем типы колонок заранее (один раз)
-        col_types = {}
-        for col_idx in range(1, len(df.columns) + 1):
-            col_name = ws.cell(row=1, column=col_idx).value
-            if col_name == "Табельный":
-                col_types[col_idx] = "tab"
-            elif col_name == "ИНН":
-                col_types[col_idx] = "inn"
-            elif col_name in base_columns:
-                col_types[col_idx] = "text"
-            elif col_name == "Количество уникальных ИНН":
-                # Целое число с разделителем разрядов без дробной части
-                col_types[col_idx] = "inn_count"
-            elif col_name and col_name.startswith("Score"):
-                col_types[col_idx] = "score"
-            elif col_name and "_norm" in col_name:
-                col_types[col_idx] = "norm"
-            elif col_name and col_name.startswith("Место"):
-                col_types[col_idx] = "rank"
-            elif col_name == "Лучший месяц":
-                col_types[col_idx] = "text"
+        self.logger.debug(f"Начало форматирования ячеек для '{sheet_name}' ({total_rows} строк)", "ExcelFormatter", "_format_sheet_openpyxl")
+        
+        # ОПТИМИЗАЦИЯ: Обход по колонкам (iter_rows с одной колонкой) вместо обхода каждой строки целиком,
+        # стиль назначается копией готового StyleArray именованного стиля
+        style_arrays = self._cell_style_arrays(ws.parent)
+        max_row = ws.max_row
+        for plan_idx, (col_idx, numeric_style, other_style, numeric_mask) in enumerate(col_plan, start=1):
+            column_cells = ws.iter_rows(min_row=2, max_row=max_row, min_col=col_idx, max_col=col_idx)
+            other_array = style_arrays[other_style]
+            if numeric_style is None:
+                for (cell,) in column_cells:
+                    cell._style = copy(other_array)
             else:
-                col_types[col_idx] = "number"
+                numeric_array = style_arrays[numeric_style]
+                for is_numeric, (cell,) in zip(numeric_mask, column_cells):
+                    cell._style = copy(numeric_array if is_numeric else other_array)
+            
+            # Логируем прогресс каждые 15 секунд
+            current_time = time()
+            if current_time - last_progress_time >= PROGRESS_INTERVAL:
+                elapsed = current_time - format_sheet_start_time
+                self.logger.info(f"Форматирование '{sheet_name}': обработано колонок {plan_idx}/{len(col_plan)} ({total_rows} строк, прошло {elapsed:.0f} сек)")
+                last_progress_time = current_time
         
-        # ОПТИМИЗАЦИЯ: Для всех RAW листов используем упрощенное форматирование (только заголовки)
-        # Для остальных листов - полное форматирование
-        if sheet_name.startswith("RAW"):
-            # Для всех RAW листов (RAW, RAW_2, RAW_3 и т.д.): форматируем только заголовки (без обработки каждой ячейки)
-            # Это значительно ускоряет форматирование для больших листов (с 44 минут до ~1 минуты)
-            self.logger.info(f"Форматирование листа '{sheet_name}': упрощенный режим (только заголовки, {total_rows} строк)")
-            # Для RAW листов не форматируем ячейки - только заголовки уже отформатированы выше
-        else:
-            # Для остальных листов: полное форматирование
-            if total_rows == 0:
-                ws.auto_filter.ref = ws.dimensions
-                return
-            
-            self.logger.debug(f"Начало форматирования ячеек для '{sheet_name}' ({total_rows} строк)", "ExcelFormatter", "_format_sheet_openpyxl")
-            batch_size = 1000  # Обрабатываем по 1000 строк за раз
-            processed_rows = 0
-            
-            for batch_start in range(2, ws.max_row + 1, batch_size):
-                batch_end = min(batch_start + batch_size, ws.max_row + 1)
-                
-                for row_idx in range(batch_start, batch_end):
-                    row = ws[row_idx]
-                    for col_idx, cell in enumerate(row, start=1):
-                        if col_idx not in col_types:
-                            continue
-                        
-                        col_type = col_types.get(col_idx, "number")
-                        col_name = ws.cell(row=1, column=col_idx).value
-                        
-                        # Определяем, нужно ли форматировать эту колонку в зависимости от режима
-                        should_format = True
-                        if FORMATTING_MODE == "simple":
-                            # В упрощенном режиме форматируем только ТН, ИНН, ФИО, ТБ, ГОСБ
-                            should_format = col_name in simple_format_columns
-                        elif FORMATTING_MODE == "off":
-                            # В режиме выключено форматируем только ТН и ИНН
-                            should_format = col_name in ["Табельный", "ИНН"]
-                        
-                        # ТН и ИНН всегда форматируются (независимо от режима)
-                        if col_type == "tab":
-                            cell.number_format = text_format
-                            cell.alignment = align_left
-                        elif col_type == "inn":
-                            cell.number_format = text_format
-                            cell.alignment = align_left
-                        elif FORMATTING_MODE == "off":
-                            # В режиме выключено не форматируем остальные колонки
-                            continue
-                        elif not should_format:
-                            # Не форматируем эту колонку (оставляем как есть)
-                            continue
-                        elif col_type == "text":
-                            cell.alignment = align_left
-                        elif col_type == "score" or col_type == "norm":
-                            if pd.notna(cell.value) and isinstance(cell.value, (int, float)):
-                                cell.number_format = number_format
-                                cell.alignment = align_right
-                            else:
-                                cell.alignment = align_right
-                        elif col_type == "rank" or col_type == "inn_count":
-                            # Ранги и количество уникальных ИНН: целое число с разделителем разрядов
-                            if pd.notna(cell.value) and isinstance(cell.value, (int, float)):
-                                cell.number_format = rank_format
-                                cell.alignment = align_right
-                            else:
-                                cell.alignment = align_right
-                        else:  # number
-                            if pd.notna(cell.value) and isinstance(cell.value, (int, float)):
-                                cell.number_format = number_format
-                                cell.alignment = align_right
-                            else:
-                                cell.alignment = align_left
-                
-                processed_rows = batch_end - 1
-                # Логируем прогресс каждые 15 секунд
-                current_time = time()
-                if current_time - last_progress_time >= PROGRESS_INTERVAL:
-                    elapsed = current_time - format_sheet_start_time
-                    progress_pct = (processed_rows / total_rows) * 100 if total_rows > 0 else 0
-                    self.logger.info(f"Форматирование '{sheet_name}': обработано {processed_rows}/{total_rows} строк ({progress_pct:.1f}%, прошло {elapsed:.0f} сек)")
-                    last_progress_time = current_time
-            
-            self.logger.debug(f"Форматирование ячеек завершено для '{sheet_name}'", "ExcelFormatter", "_format_sheet_openpyxl")
+        self.logger.debug(f"Форматирование ячеек завершено для '{sheet_name}'", "ExcelFormatter", "_format_sheet_openpyxl")
         
         # Включаем автофильтр
         ws.auto_filter.ref = ws.dimensions
@@ -6042,15 +6525,20 @@ class ExcelFormatter:
         text_alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
         number_alignment = Alignment(horizontal="right", vertical="center")
         
+        # ОПТИМИЗАЦИЯ: Размеры листа читаются один раз - openpyxl вычисляет max_row/max_column
+        # проходом по всем ячейкам листа при каждом обращении
+        max_row = ws.max_row
+        max_column = ws.max_column
+        
         current_row = 1
-        while current_row <= ws.max_row:
+        while current_row <= max_row:
             cell_value = ws.cell(row=current_row, column=1).value
             
             # Если это заголовок таблицы (первая колонка заполнена, остальные пустые или почти пустые)
             if cell_value and isinstance(cell_value, str) and len(cell_value) > 0:
                 # Проверяем, является ли это заголовком таблицы
                 is_table_header = True
-                for col in range(2, min(10, ws.max_column + 1)):
+                for col in range(2, min(10, max_column + 1)):
                     other_cell = ws.cell(row=current_row, column=col).value
                     if other_cell and str(other_cell).strip():
                         is_table_header = False
@@ -6058,15 +6546,15 @@ class ExcelFormatter:
                 
                 if is_table_header:
                     # Форматируем заголовок таблицы
-                    for col in range(1, ws.max_column + 1):
+                    for col in range(1, max_column + 1):
                         cell = ws.cell(row=current_row, column=col)
                         cell.font = section_font
                         cell.fill = section_fill
                         cell.alignment = section_alignment
                     
                     # Следующая строка - заголовки колонок
-                    if current_row + 1 <= ws.max_row:
-                        for col in range(1, ws.max_column + 1):
+                    if current_row + 1 <= max_row:
+                        for col in range(1, max_column + 1):
                             cell = ws.cell(row=current_row + 1, column=col)
                             if cell.value:
                                 cell.font = header_font
@@ -6076,7 +6564,7 @@ class ExcelFormatter:
                         continue
             
             # Форматируем обычные строки
-            for col in range(1, ws.max_column + 1):
+            for col in range(1, max_column + 1):
                 cell = ws.cell(row=current_row, column=col)
                 if cell.value is None:
                     continue
@@ -6092,7 +6580,7 @@ class ExcelFormatter:
             current_row += 1
         
         # Настраиваем ширину колонок
-        for col_idx, column in enumerate(ws.iter_cols(min_row=1, max_row=min(100, ws.max_row)), start=1):
+        for col_idx, column in enumerate(ws.iter_cols(min_row=1, max_row=min(100, max_row)), start=1):
             col_letter = get_column_letter(col_idx)
             max_length = 0
             for cell in column:
@@ -6125,36 +6613,49 @@ class ExcelFormatter:
             cell.fill = header_fill
             cell.alignment = header_alignment
         
-        # Настраиваем ширину колонок
-        for col_idx, column in enumerate(ws.iter_cols(min_row=1, max_row=1), start=1):
-            col_letter = get_column_letter(col_idx)
-            col_name = ws.cell(row=1, column=col_idx).value
-            
-            # Вычисляем оптимальную ширину
-            max_length = len(str(col_name)) if col_name else 0
-            for row in ws.iter_rows(min_row=2, max_row=min(102, ws.max_row), min_col=col_idx, max_col=col_idx):
-                for cell in row:
-                    if cell.value:
-                        max_length = max(max_length, len(str(cell.value)))
-            
-            width = max(self.min_width, min(max_length + 2, self.max_width))
-            ws.column_dimensions[col_letter].width = width
-        
-        # Форматируем только ТН и ИНН
-        text_format = "@"
-        align_left = Alignment(horizontal="left", vertical="center", wrap_text=True)
+        # Настраиваем ширину колонок (по DataFrame, без обхода ячеек листа)
+        for col_idx, width in enumerate(self._compute_widths(df), start=1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = width
         
+        # Форматируем только ТН и ИНН (именованный стиль spod_tab: текстовый формат, выравнивание влево)
+        tab_style_array = self._cell_style_arrays(ws.parent)["spod_tab"]
+        max_row = ws.max_row
         for col_idx in range(1, len(df.columns) + 1):
             col_name = ws.cell(row=1, column=col_idx).value
             if col_name in ["Табельный", "ИНН"]:
-                for row_idx in range(2, ws.max_row + 1):
+                for row_idx in range(2, max_row + 1):
                     cell = ws.cell(row=row_idx, column=col_idx)
                     if cell.value is not None:
-                        cell.number_format = text_format
-                        cell.alignment = align_left
+                        cell._style = copy(tab_style_array)
         
         self.logger.debug(f"Минимальное форматирование применено к '{sheet_name}' (только ТН и ИНН)", "ExcelFormatter", "_format_sheet_minimal")
     
+    @staticmethod
+    def _statistics_numeric_mask(df: pd.DataFrame) -> np.ndarray:
+        """
+        Строит маску ячеек листа статистики, значения которых читаются как число (float(str(value))).
+        
+        Разбор выполняется одним векторным pd.to_numeric по всем непустым значениям;
+        строки вида "nan" Python float() тоже принимает, поэтому они учитываются отдельно.
+        
+        Args:
+            df: DataFrame со статистикой
+            
+        Returns:
+            np.ndarray: Булева маска формы df.shape
+        """
+        values = df.to_numpy(dtype=object)
+        flat = pd.Series(values.ravel(), dtype=object)
+        present = flat.notna().to_numpy()
+        
+        text = flat[present].astype(str)
+        parsed = pd.to_numeric(text, errors="coerce")
+        is_numeric = parsed.notna() | text.str.strip().str.lower().isin(("nan", "+nan", "-nan"))
+        
+        mask = np.zeros(len(flat), dtype=bool)
+        mask[present] = is_numeric.to_numpy(dtype=bool)
+        return mask.reshape(values.shape)
+    
     def _format_statistics_sheet_openpyxl(self, ws, df: pd.DataFrame) -> None:
         """
         Форматирует лист статистики используя openpyxl.
@@ -6180,12 +6681,16 @@ class ExcelFormatter:
         text_alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
         number_alignment = Alignment(horizontal="right", vertical="center")
         
+        # ОПТИМИЗАЦИЯ: Признак «число» для всех ячеек считается заранее по DataFrame (лист записан без заголовка,
+        # строка листа row_idx соответствует строке DataFrame row_idx - 1) вместо float() с перехватом исключений
+        numeric_mask = self._statistics_numeric_mask(df)
+        mask_rows, mask_cols = numeric_mask.shape
+        
         for row_idx, row in enumerate(ws.iter_rows(min_row=1), start=1):
             for col_idx, cell in enumerate(row):
                 if cell.value is None:
                     continue
                 
-                value = str(cell.value)
                 # Проверяем, является ли это заголовком раздела (первая колонка заполнена, вторая пустая)
                 if col_idx == 0 and len(row) > 1:
                     next_cell_value = row[1].value if len(row) > 1 else None
@@ -6209,11 +6714,10 @@ class ExcelFormatter:
                     cell.alignment = table_header_alignment
                 else:
                     # Проверяем, является ли значение числом
-                    try:
-                        num_value = float(value)
+                    if row_idx <= mask_rows and col_idx < mask_cols and numeric_mask[row_idx - 1, col_idx]:
                         cell.alignment = number_alignment
                         cell.number_format = "#,##0"
-                    except (ValueError, TypeError):
+                    else:
                         cell.alignment = text_alignment
         
         # Настраиваем ширину колонок
@@ -6264,6 +6768,8 @@ def main():
     # Параметры оптимизации производительности
     logger.info(f"ENABLE_PARALLEL_LOADING = {ENABLE_PARALLEL_LOADING} - Параллельная загрузка файлов: True - параллельная загрузка, False - последовательная", "main", "main")
     logger.info(f"MAX_WORKERS = {MAX_WORKERS} - Количество потоков для параллельной загрузки (рекомендуется 8 по числу виртуальных ядер)", "main", "main")
+    logger.info(f"ENABLE_PARALLEL_INDEXING = {ENABLE_PARALLEL_INDEXING} - Параллельное построение индексов по табельным номерам", "main", "main")
+    logger.info(f"SCORE_FLOAT_DTYPE = {np.dtype(SCORE_FLOAT_DTYPE).name} - Тип чисел для нормализации и расчета Score", "main", "main")
     logger.info(f"ENABLE_CHUNKING = {ENABLE_CHUNKING} - Использование chunking для больших файлов: True - использовать chunking, False - загружать целиком (chunking медленный, отключен)", "main", "main")
     logger.info(f"CHUNK_SIZE = {CHUNK_SIZE} - Размер chunk для чтения больших файлов (строк)", "main", "main")
     logger.info(f"CHUNKING_THRESHOLD_MB = {CHUNKING_THRESHOLD_MB} - Порог размера файла для chunking (МБ) - если файл больше, используем chunking", "main", "main")
@@ -6302,6 +6808,10 @@ def main():
     
     # Информация о доступности openpyxl
     logger.info(f"OPENPYXL_AVAILABLE = {OPENPYXL_AVAILABLE} - Доступность openpyxl для форматирования Excel файлов", "main", "main")
+    logger.info(f"LXML_AVAILABLE = {LXML_AVAILABLE} - Доступность lxml для быстрой записи XML при сохранении Excel (иначе xml.etree)", "main", "main")
+    logger.info(f"PYEXCELERATE_AVAILABLE = {PYEXCELERATE_AVAILABLE} - Доступность pyexcelerate для быстрой записи Excel без форматирования (резервный режим)", "main", "main")
+    logger.info(f"NUMBA_AVAILABLE = {NUMBA_AVAILABLE} - Доступность numba для JIT-ядер (суммирование по табельным номерам, приросты, ранги месяцев) при числе строк больше NUMBA_MIN_ROWS={NUMBA_MIN_ROWS}", "main", "main")
+    logger.info(f"POLARS_AVAILABLE = {POLARS_AVAILABLE} - Доступность polars для построения сводной таблицы RAW (иначе pandas.pivot_table)", "main", "main")
     
     logger.info("-" * 80, "main", "main")
     logger.info("", "main", "main")